@@ -1,2 +1,3 @@
 from .declarai import Declarai, openai, azure_openai, magic
 from .operators.registry import register_operator, register_llm
+from .task import gather
@@ -0,0 +1,3 @@
+from declarai.cli import main
+
+main()
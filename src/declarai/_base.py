@@ -2,13 +2,82 @@
 Base classes for declarai tasks.
 """
 from abc import abstractmethod
-from typing import Any, TypeVar, Iterator
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+)
 
 from declarai.operators import (
     BaseOperator,
     LLMParamsType,
     LLMResponse,
 )
+from declarai.operators.llm import DeltaBuffer
+
+if TYPE_CHECKING:
+    from declarai.middleware.base import TaskMiddleware
+
+
+class ExecutionContext:
+    """
+    The state of a single execution of a task.
+    Every call to a task runs within its own context, so a single task can be called concurrently from many threads or
+    coroutines without the calls overriding each other's responses.
+
+    Args:
+        kwargs: the runtime keyword arguments of the call
+        compiled: the prompt of the call, when it was compiled ahead of the execution, e.g. by `plan`
+
+    Attributes:
+        kwargs: the runtime keyword arguments of the call
+        compiled: the prompt that was compiled ahead of the execution, reused instead of compiling it again
+        result: the result of the call, after parsing the result of the llm
+        llm_response: the response from the LLM. When streaming, it is set once the stream is exhausted.
+        llm_stream_response: the response from the LLM when streaming
+        stream_buffer: the most recent chunks of the stream of the call, when the `stream_buffer_size` of the task is set
+    """
+
+    __slots__ = (
+        "kwargs",
+        "compiled",
+        "result",
+        "llm_response",
+        "llm_stream_response",
+        "stream_buffer",
+    )
+
+    def __init__(self, kwargs: Dict[str, Any] = None, compiled: Any = None):
+        self.kwargs = kwargs or {}
+        self.compiled = compiled
+        self.result: Any = None
+        self.llm_response: Optional[LLMResponse] = None
+        self.llm_stream_response: Optional[Iterator[LLMResponse]] = None
+        self.stream_buffer: Optional[Deque[LLMResponse]] = None
+
+
+_execution_contexts: ContextVar[Dict[int, ExecutionContext]] = ContextVar(
+    "declarai_execution_contexts", default={}
+)
+"The contexts of the tasks that are executing in the current thread or coroutine, by the id of the task"
+
+
+def _exec_task(task: "BaseTask", kwargs: Dict[str, Any]) -> Any:
+    return task._exec(kwargs)
+
+
+async def _aexec_task(task: "BaseTask", kwargs: Dict[str, Any]) -> Any:
+    return await task._aexec(kwargs)
 
 
 class BaseTask:
@@ -19,11 +88,103 @@ class BaseTask:
     operator: BaseOperator
     "The operator to use for the task"
 
-    llm_response: LLMResponse
-    "The response from the LLM"
+    _middlewares: Optional[List[Type["TaskMiddleware"]]] = None
+    _middleware_chain = staticmethod(_exec_task)
+    _amiddleware_chain = staticmethod(_aexec_task)
+    _last_llm_response: Optional[LLMResponse] = None
+    _last_llm_stream_response: Optional[Iterator[LLMResponse]] = None
+    _last_stream_buffer: Optional[Deque[LLMResponse]] = None
+
+    stream_buffer_size: int = 0
+    "The number of most recent chunks of a stream kept in `stream_buffer`, for debugging. Disabled when 0"
+
+    @property
+    def middlewares(self) -> Optional[List[Type["TaskMiddleware"]]]:
+        """
+        The middlewares that wrap every execution of the task, the first one is the outermost.
+        """
+        return self._middlewares
+
+    @middlewares.setter
+    def middlewares(self, middlewares: Optional[List[Type["TaskMiddleware"]]]) -> None:
+        # Imported here, as middlewares depend on the task classes
+        from declarai.middleware.base import acompose_middlewares, compose_middlewares
+
+        self._middlewares = middlewares
+        # The chains are composed once, rather than on every execution
+        self._middleware_chain = compose_middlewares(middlewares, _exec_task)
+        self._amiddleware_chain = acompose_middlewares(middlewares, _aexec_task)
+
+    @property
+    def execution_context(self) -> Optional[ExecutionContext]:
+        """
+        The context of the execution of the task that is running in the current thread or coroutine, if any.
+        """
+        return _execution_contexts.get().get(id(self))
+
+    @contextmanager
+    def _execution(self, context: Optional[ExecutionContext]) -> Iterator[None]:
+        """
+        Runs the block within the given execution context of the task.
+        """
+        if context is None:
+            yield
+            return
+        token = _execution_contexts.set(
+            {**_execution_contexts.get(), id(self): context}
+        )
+        try:
+            yield
+        finally:
+            _execution_contexts.reset(token)
+
+    @property
+    def llm_response(self) -> LLMResponse:
+        """
+        The response from the LLM.
+        Within an execution, this is the response of that execution, otherwise it is the response of the last
+        execution that completed.
+        """
+        context = self.execution_context
+        if context is not None:
+            return context.llm_response
+        return self._last_llm_response
+
+    @llm_response.setter
+    def llm_response(self, llm_response: LLMResponse) -> None:
+        context = self.execution_context
+        if context is not None:
+            context.llm_response = llm_response
+        self._last_llm_response = llm_response
+
+    @property
+    def llm_stream_response(self) -> Iterator[LLMResponse]:
+        """
+        The response from the LLM when streaming. Resolved like `llm_response`.
+        """
+        context = self.execution_context
+        if context is not None:
+            return context.llm_stream_response
+        return self._last_llm_stream_response
+
+    @llm_stream_response.setter
+    def llm_stream_response(self, llm_stream_response: Iterator[LLMResponse]) -> None:
+        context = self.execution_context
+        if context is not None:
+            context.llm_stream_response = llm_stream_response
+        self._last_llm_stream_response = llm_stream_response
 
-    llm_stream_response: Iterator[LLMResponse] = None
-    "The response from the LLM when streaming"
+    @property
+    def stream_buffer(self) -> Optional[Deque[LLMResponse]]:
+        """
+        The most recent chunks of a stream, when `stream_buffer_size` is set. Resolved like `llm_response`.
+        Every stream has a buffer of its own, kept on the context of its execution, so concurrent streams of the task
+        never mix their chunks.
+        """
+        context = self.execution_context
+        if context is not None:
+            return context.stream_buffer
+        return self._last_stream_buffer
 
     @property
     def llm_params(self) -> LLMParamsType:
@@ -47,7 +208,6 @@ class BaseTask:
         """
         pass
 
-    @abstractmethod
     def _exec_middlewares(self, kwargs) -> Any:
         """
         Execute the task middlewares and the task itself
@@ -56,9 +216,32 @@ class BaseTask:
 
         Returns: The result of the task, which is the result of the operator. Same as `_exec`.
 
+        """
+        return self._middleware_chain(self, kwargs)
+
+    @abstractmethod
+    async def _aexec(self, kwargs: dict) -> Any:
+        """
+        Execute the task asynchronously
+        Args:
+            kwargs: the runtime keyword arguments that are used to compile the task prompt.
+
+        Returns: The result of the task, which is the result of the operator. Same as `_exec`.
+
         """
         pass
 
+    async def _aexec_middlewares(self, kwargs) -> Any:
+        """
+        Execute the task middlewares and the task itself asynchronously
+        Args:
+            kwargs: the runtime keyword arguments that are used to compile the task prompt.
+
+        Returns: The result of the task, which is the result of the operator. Same as `_exec`.
+
+        """
+        return await self._amiddleware_chain(self, kwargs)
+
     @abstractmethod
     def compile(self, **kwargs) -> str:
         """
@@ -85,19 +268,97 @@ class BaseTask:
 
     def stream_handler(self, stream: Iterator[LLMResponse]) -> Iterator[LLMResponse]:
         """
-        A generator that yields each chunk from the stream and collects them in a buffer.
-        After the stream is exhausted, it runs the cleanup logic.
+        Returns a generator that yields each chunk from the stream.
+        After the stream is exhausted, it runs the cleanup logic with the last chunk, within the execution context
+        the stream was created in.
+        Only the last chunk is kept while streaming, unless `stream_buffer_size` is set.
         """
-        response_buffer = []
+        return self._handle_stream(stream, self.execution_context)
+
+    def _handle_stream(
+        self, stream: Iterator[LLMResponse], context: Optional[ExecutionContext]
+    ) -> Iterator[LLMResponse]:
+        buffer = self._new_stream_buffer(context)
+        last_chunk = None
         for chunk in stream:
-            response_buffer.append(chunk)
+            last_chunk = chunk
+            if buffer is not None:
+                buffer.append(chunk)
+            yield chunk
+
+        # After the stream is exhausted, run the cleanup logic
+        with self._execution(context):
+            self._finish_stream(stream, last_chunk)
+
+    def astream_handler(
+        self, stream: AsyncIterator[LLMResponse]
+    ) -> AsyncIterator[LLMResponse]:
+        """
+        Asynchronous version of `stream_handler`.
+        Returns an async generator that yields each chunk from the stream and runs the cleanup logic once it is
+        exhausted.
+        """
+        return self._ahandle_stream(stream, self.execution_context)
+
+    async def _ahandle_stream(
+        self, stream: AsyncIterator[LLMResponse], context: Optional[ExecutionContext]
+    ) -> AsyncIterator[LLMResponse]:
+        buffer = self._new_stream_buffer(context)
+        last_chunk = None
+        async for chunk in stream:
+            last_chunk = chunk
+            if buffer is not None:
+                buffer.append(chunk)
             yield chunk
 
         # After the stream is exhausted, run the cleanup logic
-        self.stream_cleanup(response_buffer[-1])
+        with self._execution(context):
+            self._finish_stream(stream, last_chunk)
+
+    def _new_stream_buffer(
+        self, context: Optional[ExecutionContext]
+    ) -> Optional[Deque[LLMResponse]]:
+        if not self.stream_buffer_size:
+            return None
+        buffer = deque(maxlen=self.stream_buffer_size)
+        if context is not None:
+            context.stream_buffer = buffer
+        self._last_stream_buffer = buffer
+        return buffer
+
+    def _finish_stream(self, stream, last_chunk: Optional[LLMResponse]) -> None:
+        """
+        Streams of deltas build the full response once exhausted, other streams yield it as their last chunk.
+        """
+        if isinstance(stream, DeltaBuffer):
+            self.stream_cleanup(stream.response)
+        elif last_chunk is not None:
+            self.stream_cleanup(last_chunk)
 
     def stream_cleanup(self, last_chunk: LLMResponse):
         self.llm_response = last_chunk
 
+    def parse_stream(
+        self, stream: Iterator[LLMResponse], items: bool = False
+    ) -> Iterator[Any]:
+        """
+        Parses the stream of a task with a structured return type while it arrives.
+        Args:
+            stream: the stream that was returned by the task
+            items: whether to yield each element of a list return type as soon as it is closed
+
+        Returns: An iterator of the progressively populated result, ending with the fully parsed result.
+         When `items` is set, an iterator of the parsed elements.
+        """
+        return self.operator.parse_output_stream(stream, items=items)
+
+    def aparse_stream(
+        self, stream: AsyncIterator[LLMResponse], items: bool = False
+    ) -> AsyncIterator[Any]:
+        """
+        Asynchronous version of `parse_stream`.
+        """
+        return self.operator.aparse_output_stream(stream, items=items)
+
 
 TaskType = TypeVar("TaskType", bound=BaseTask)
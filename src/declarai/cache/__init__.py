@@ -0,0 +1,32 @@
+"""
+Cache module for Declarai LLM responses.
+The cache backends are imported on first use.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+from .base import BaseLLMCache, llm_cache_key
+
+if TYPE_CHECKING:
+    from .in_memory import InMemoryLLMCache
+    from .single_flight import SingleFlight
+    from .sqlite import SQLiteLLMCache
+
+_LAZY_ATTRIBUTES = {
+    "InMemoryLLMCache": ".in_memory",
+    "SQLiteLLMCache": ".sqlite",
+    "SingleFlight": ".single_flight",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
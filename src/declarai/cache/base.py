@@ -0,0 +1,81 @@
+"""
+Base class for the LLM response cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from abc import ABC, abstractmethod  # pylint: disable=E0611
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:  # the operators import the cache, avoid a circular import
+    from declarai.operators.llm import BaseLLM, LLMResponse
+
+
+def _json_default(obj: Any) -> Any:
+    if hasattr(obj, "dict"):  # pydantic models, e.g. Message
+        return obj.dict()
+    return str(obj)
+
+
+def llm_cache_key(
+    llm: BaseLLM, compiled: Dict[str, Any], llm_params: Dict[str, Any]
+) -> str:
+    """
+    Creates a stable key for a single LLM call.
+    The key is a hash of the provider, the model, the compiled messages and the llm params, so identical calls
+    result in the same key across processes.
+
+    Args:
+        llm: The LLM that executes the call
+        compiled: The compiled template that is sent to the LLM
+        llm_params: The llm params that are sent to the LLM
+
+    Returns:
+        A hex digest that identifies the call
+    """
+    params = {k: v for k, v in llm_params.items() if k != "stream"}
+    payload = {
+        "provider": llm.provider,
+        "model": params.pop("model", None) or llm.model,
+        "compiled": compiled,
+        "llm_params": params,
+    }
+    serialized = json.dumps(payload, sort_keys=True, default=_json_default)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class BaseLLMCache(ABC):
+    """
+    Abstract class to cache the responses of the LLM.
+
+    See `InMemoryLLMCache` for default implementation.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """
+        Return the cached response for the given key
+
+        Args:
+            key: The key of the LLM call, see `llm_cache_key`
+
+        Returns:
+            The cached LLMResponse, or None if the key is missing or expired
+        """
+
+    @abstractmethod
+    def set(self, key: str, response: LLMResponse) -> None:
+        """
+        Store the response of an LLM call.
+
+        Args:
+            key: The key of the LLM call, see `llm_cache_key`
+            response: The response to store
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove all the cached responses
+        """
@@ -0,0 +1,60 @@
+"""
+This module contains the in-memory implementation of the LLM response cache.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from .base import BaseLLMCache
+
+if TYPE_CHECKING:
+    from declarai.operators.llm import LLMResponse
+
+
+class InMemoryLLMCache(BaseLLMCache):
+    """
+    LLM response cache that stores the responses in memory, evicting the least recently used responses.
+    Every caller receives its own copy of a cached response, so changing it does not affect later hits.
+
+    Args:
+        max_size: The maximum number of responses to keep. Defaults to 1024.
+        ttl: The number of seconds a response is kept for. If not passed, responses are only evicted by size.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._responses: "OrderedDict[str, Tuple[float, LLMResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Return the cached response and mark it as recently used"""
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is None:
+                return None
+            created_at, response = entry
+            if self.ttl is not None and time.monotonic() - created_at > self.ttl:
+                del self._responses[key]
+                return None
+            self._responses.move_to_end(key)
+            return response.copy(deep=True)
+
+    def set(self, key: str, response: LLMResponse) -> None:
+        """Store the response, evicting the least recently used response when the cache is full"""
+        with self._lock:
+            self._responses[key] = (time.monotonic(), response.copy(deep=True))
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all the cached responses"""
+        with self._lock:
+            self._responses.clear()
+
+    def __len__(self) -> int:
+        return len(self._responses)
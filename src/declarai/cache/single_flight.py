@@ -0,0 +1,96 @@
+"""
+This module contains the SingleFlight class, which is used to coalesce identical LLM calls that are in flight at the
+same time.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share the same key into a single execution.
+    While a call for a key is in flight, any other caller with the same key waits for it and receives its result
+    (or its exception), instead of executing the call again.
+    Once the call completes, the key is released, so later calls execute normally.
+
+    Supports both threads (`do`) and coroutines (`ado`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        """
+        Executes `func`, unless a call with the same key is already in flight, in which case waits for its result.
+        Args:
+            key: identifies identical calls
+            func: the call to execute
+
+        Returns:
+            The result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = func()
+            except BaseException as e:  # noqa
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Asynchronous version of `do`. Coalesces calls that share the same key within the running event loop.
+        Args:
+            key: identifies identical calls
+            func: a coroutine function that executes the call
+
+        Returns:
+            The result of the call
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        future = self._async_calls.get(loop_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._async_calls[loop_key] = loop.create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:  # noqa
+            future.set_exception(e)
+            future.exception()  # mark as retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_calls[loop_key]
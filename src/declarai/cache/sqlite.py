@@ -0,0 +1,83 @@
+"""
+This module contains the SQLiteLLMCache class, which is used to persist LLM responses in a local SQLite database.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+from .base import BaseLLMCache
+
+if TYPE_CHECKING:
+    from declarai.operators.llm import LLMResponse
+
+DEFAULT_TABLE_NAME = "llm_cache"
+"""A table name for the SQLite database."""
+
+
+class SQLiteLLMCache(BaseLLMCache):
+    """
+    LLM response cache that persists the responses in a local SQLite database, so they survive restarts and can be
+    shared between processes.
+
+    Args:
+        path: Path of the SQLite database file.
+        table_name: Name of the table to store the responses in.
+        ttl: The number of seconds a response is kept for. If not passed, responses never expire.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = "declarai_cache.sqlite",
+        table_name: str = DEFAULT_TABLE_NAME,
+        ttl: Optional[float] = None,
+    ):
+        self.path = str(path)
+        self.table_name = table_name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table_name} "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Retrieve the response from the database, dropping it if it has expired"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT response, created_at FROM {self.table_name} WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                with self._conn:
+                    self._conn.execute(
+                        f"DELETE FROM {self.table_name} WHERE key = ?", (key,)
+                    )
+                return None
+
+        from declarai.operators.llm import (  # pylint: disable=C0415
+            LLMResponse,
+        )
+
+        return LLMResponse.parse_raw(response)
+
+    def set(self, key: str, response: LLMResponse) -> None:
+        """Store the response in the database"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table_name} (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response.json(), time.time()),
+            )
+
+    def clear(self) -> None:
+        """Remove all the cached responses from the database"""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table_name}")
@@ -11,22 +11,27 @@ At every iteration, the user message is added to the message history, and the pr
 The prompt is then sent to the LLM, and the response is parsed and added to the message history.
 """
 from functools import partial
-from typing import Any, Callable, Dict, List, Type, Union, overload
+from typing import Any, Callable, Dict, List, Optional, Type, Union, overload
 
-from declarai._base import BaseTask
-from declarai.memory import InMemoryMessageHistory
+from declarai._base import BaseTask, ExecutionContext
+from declarai.cache.base import BaseLLMCache
+from declarai.memory.in_memory import InMemoryMessageHistory
 from declarai.memory.base import BaseChatMessageHistory
+from declarai.memory.window import SlidingWindowMemory
 from declarai.middleware.base import TaskMiddleware
 from declarai.operators import (
     LLM,
     BaseChatOperator,
     LLMParamsType,
+    ModelsOpenai,
     LLMResponse,
     Message,
     MessageRole,
     resolve_operator,
 )
 from declarai.operators.utils import format_prompt_msg
+from declarai.operators.routing import ModelLadder
+from declarai.operators.tokens import ContextOverflow
 from declarai.python_parser.parser import PythonParser
 from declarai.task import Task
 
@@ -71,8 +76,6 @@ class Chat(BaseTask, metaclass=ChatMeta):
 
     Attributes:
         is_declarai (bool): A class-level attribute indicating if the chat is of type 'declarai'. Always set to `True`.
-        _call_kwargs (Dict[str, Any]): A dictionary to store additional keyword arguments, used for passing kwargs between
-         the execution of the chat and the execution of the middlewares.
         middlewares (List[TaskMiddleware] or None): Middlewares used for every iteration of the chat.
         operator (BaseChatOperator): The operator used for the chat.
         conversation (List[Message]): Property that returns a list of messages exchanged in the chat.
@@ -81,6 +84,7 @@ class Chat(BaseTask, metaclass=ChatMeta):
         _chat_history (BaseChatMessageHistory): The chat history mechanism for the chat.
         greeting (str): The greeting message for the chat.
         system (str): The system message for the chat.
+        memory_policy (SlidingWindowMemory or None): Limits the part of the chat history that is sent to the LLM.
 
     Args:
         operator (BaseChatOperator): The operator to use for the chat.
@@ -91,12 +95,13 @@ class Chat(BaseTask, metaclass=ChatMeta):
         greeting (str, optional): Greeting message to use. Defaults to operator's greeting or None.
         system (str, optional): System message to use. Defaults to operator's system message or None.
         stream (bool, optional): Whether to stream the response from the LLM or not. Defaults to False.
+        memory_policy (SlidingWindowMemory, optional): Limits the part of the chat history that is sent to the LLM.
+         Defaults to sending the whole history.
         **kwargs: Additional keyword arguments to pass to the formatting of the system message.
     """
 
     is_declarai = True
     operator: BaseChatOperator
-    _call_kwargs: Dict[str, Any]
 
     def __init__(
         self,
@@ -106,6 +111,7 @@ class Chat(BaseTask, metaclass=ChatMeta):
         chat_history: BaseChatMessageHistory = None,
         greeting: str = None,
         system: str = None,
+        memory_policy: SlidingWindowMemory = None,
         **kwargs,
     ):
         self.middlewares = middlewares
@@ -113,6 +119,11 @@ class Chat(BaseTask, metaclass=ChatMeta):
         self._chat_history = chat_history or DEFAULT_CHAT_HISTORY()
         self.greeting = greeting or self.operator.greeting
         self.system = self.__set_system_prompt(system=system, **kwargs)
+        self.memory_policy = (
+            memory_policy.bind(self.operator.llm.token_counter)
+            if memory_policy
+            else None
+        )
         self.__set_memory()
 
     def __set_system_prompt(self, system: str, **kwargs) -> str:
@@ -148,9 +159,26 @@ class Chat(BaseTask, metaclass=ChatMeta):
 
         """
         messages = kwargs.pop("messages", None) or self._chat_history.history
-        compiled = self.operator.compile(messages=messages, **kwargs)
+        compiled = self.operator.compile(messages=self._window(messages), **kwargs)
         return compiled
 
+    def _window(self, messages: List[Message]) -> List[Message]:
+        """
+        Selects the messages that are sent to the LLM according to the memory policy of the chat.
+        """
+        if self.memory_policy is None:
+            return messages
+        pinned = 0
+        if (
+            self.memory_policy.pin_greeting
+            and self.greeting
+            and messages
+            and messages[0].role == MessageRole.assistant
+            and messages[0].message == self.greeting
+        ):
+            pinned = 1
+        return self.memory_policy.select(messages, pinned=pinned)
+
     def add_message(self, message: str, role: MessageRole) -> None:
         """
         Interface to add a message to the chat history.
@@ -189,14 +217,37 @@ class Chat(BaseTask, metaclass=ChatMeta):
                 return self.operator.parsed_send_func.parse(self.llm_response.response)
             return self.llm_response.response
 
-    def _exec_middlewares(self, kwargs) -> Any:
-        if self.middlewares:
-            exec_with_middlewares = None
-            for middleware in self.middlewares:
-                exec_with_middlewares = middleware(self, self._call_kwargs)
-            if exec_with_middlewares:
-                return exec_with_middlewares()
-        return self._exec(kwargs)
+    async def _aexec(self, kwargs) -> Any:
+        """
+        Executes the call to the LLM asynchronously. See `_exec` for more information.
+
+        Args:
+            kwargs: Keyword arguments to pass to the LLM like `temperature`, `max_tokens`, etc.
+
+        Returns:
+             The raw response from the LLM, together with the metadata.
+        """
+        if self.operator.streaming:
+            stream = self.astream_handler(await self.operator.apredict(**kwargs))
+            self.llm_stream_response = stream
+            return self.llm_stream_response
+        else:
+            self.llm_response = await self.operator.apredict(**kwargs)
+            self.add_message(self.llm_response.response, role=MessageRole.assistant)
+            if self.operator.parsed_send_func:
+                return self.operator.parsed_send_func.parse(self.llm_response.response)
+            return self.llm_response.response
+
+    def _runtime_kwargs(
+        self, messages: List[Message], llm_params: LLMParamsType
+    ) -> Dict[str, Any]:
+        runtime_kwargs = dict(messages=self._window(messages))
+        runtime_llm_params = (
+            llm_params or self.llm_params
+        )  # order is important! We prioritize runtime params that
+        if runtime_llm_params:
+            runtime_kwargs["llm_params"] = runtime_llm_params
+        return runtime_kwargs
 
     def __call__(
         self, *, messages: List[Message], llm_params: LLMParamsType = None
@@ -213,15 +264,61 @@ class Chat(BaseTask, metaclass=ChatMeta):
             The parsed response from the LLM.
 
         """
-        runtime_kwargs = dict(messages=messages)
-        runtime_llm_params = (
-            llm_params or self.llm_params
-        )  # order is important! We prioritize runtime params that
-        if runtime_llm_params:
-            runtime_kwargs["llm_params"] = runtime_llm_params
+        return self.invoke(messages=messages, llm_params=llm_params).result
+
+    def invoke(
+        self, *, messages: List[Message], llm_params: LLMParamsType = None
+    ) -> ExecutionContext:
+        """
+        Executes the call to the LLM, and returns the context of the execution rather than only its result.
+        The context holds the result together with the response of the LLM of this specific call, which makes it the
+        safe way to access the response metadata when the chat is called concurrently.
+        Args:
+            messages: The messages to pass to the LLM.
+            llm_params: The llm_params to use for the call to the LLM.
+
+        Returns:
+            The execution context, holding the result and the llm response of the call.
+             When streaming, the llm response is set once the stream is exhausted.
+
+        """
+        context = ExecutionContext(self._runtime_kwargs(messages, llm_params))
+        with self._execution(context):
+            context.result = self._exec_middlewares(context.kwargs)
+        return context
+
+    async def acall(
+        self, *, messages: List[Message], llm_params: LLMParamsType = None
+    ) -> Any:
+        """
+        Asynchronous version of calling the chat. Awaits the LLM without blocking the running event loop.
+        Args:
+            messages: The messages to pass to the LLM.
+            llm_params: The llm_params to use for the call to the LLM.
 
-        self._call_kwargs = runtime_kwargs
-        return self._exec_middlewares(runtime_kwargs)
+        Returns:
+            The parsed response from the LLM.
+
+        """
+        return (await self.ainvoke(messages=messages, llm_params=llm_params)).result
+
+    async def ainvoke(
+        self, *, messages: List[Message], llm_params: LLMParamsType = None
+    ) -> ExecutionContext:
+        """
+        Asynchronous version of `invoke`.
+        Args:
+            messages: The messages to pass to the LLM.
+            llm_params: The llm_params to use for the call to the LLM.
+
+        Returns:
+            The execution context, holding the result and the llm response of the call.
+
+        """
+        context = ExecutionContext(self._runtime_kwargs(messages, llm_params))
+        with self._execution(context):
+            context.result = await self._aexec_middlewares(context.kwargs)
+        return context
 
     def send(
         self,
@@ -246,6 +343,28 @@ class Chat(BaseTask, metaclass=ChatMeta):
             messages=self._chat_history.history, llm_params=llm_params, **kwargs
         )
 
+    async def asend(
+        self,
+        message: str,
+        llm_params: Union[LLMParamsType, Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Asynchronous version of `send`. Sends a message to the LLM without blocking the running event loop.
+        Args:
+            message:
+            llm_params:
+            **kwargs:
+
+        Returns:
+            Final response from the LLM, after parsing.
+
+        """
+        self.add_message(message, role=MessageRole.user)
+        return await self.acall(
+            messages=self._chat_history.history, llm_params=llm_params, **kwargs
+        )
+
 
 class ChatDecorator:
     """
@@ -255,13 +374,25 @@ class ChatDecorator:
 
     Args:
         llm (LLM): Resolved LLM object.
+        cache (BaseLLMCache, optional): The default cache for the responses of the LLM, used by every chat that does
+            not define its own.
+        compact_schema (bool): Whether chats describe their expected output in a compact format by default.
 
     Attributes:
         llm (LLM): Resolved LLM object.
+        cache (BaseLLMCache): The default cache for the responses of the LLM.
+        compact_schema (bool): Whether chats describe their expected output in a compact format by default.
     """
 
-    def __init__(self, llm: LLM):
+    def __init__(
+        self,
+        llm: LLM,
+        compact_schema: bool = False,
+        cache: Optional[BaseLLMCache] = None,
+    ):
         self.llm = llm
+        self.compact_schema = compact_schema
+        self.cache = cache
 
     @staticmethod
     @overload
@@ -287,6 +418,11 @@ class ChatDecorator:
         greeting: str = None,
         system: str = None,
         streaming: bool = None,
+        cache: Union[BaseLLMCache, bool] = None,
+        compact_schema: bool = None,
+        context_overflow: ContextOverflow = "raise",
+        model_ladder: Union[ModelLadder, List[ModelsOpenai]] = None,
+        memory_policy: SlidingWindowMemory = None,
         **kwargs,
     ) -> Callable[..., Type[Chat]]:
         """
@@ -307,6 +443,11 @@ class ChatDecorator:
         greeting: str = None,
         system: str = None,
         streaming: bool = None,
+        cache: Union[BaseLLMCache, bool] = None,
+        compact_schema: bool = None,
+        context_overflow: ContextOverflow = "raise",
+        model_ladder: Union[ModelLadder, List[ModelsOpenai]] = None,
+        memory_policy: SlidingWindowMemory = None,
     ):
         """
         Decorator method that converts a class into a chat task class.
@@ -319,7 +460,18 @@ class ChatDecorator:
             chat_history (BaseChatMessageHistory, optional): Chat history mechanism to use. Defaults to None.
             greeting (str, optional): Greeting message to use. Defaults to None.
             system (str, optional): System message to use. Defaults to None.
-            streaming (bool, optional): Whether to use streaming or not. Defaults to None.
+            streaming (bool, optional): Whether to use streaming or not. Pass "deltas" to stream an `LLMDelta` per
+             chunk instead of the accumulated response. Defaults to None.
+            cache (BaseLLMCache, optional): A cache for the responses of the LLM. Defaults to the cache of the
+             decorator, pass `False` to disable caching for this chat.
+            compact_schema (bool, optional): Whether to describe the expected output in a compact, token efficient
+             format. Defaults to the setting of the decorator.
+            context_overflow (str, optional): What to do with prompts that do not fit the context window of the LLM,
+             "raise" an error before the request is sent or "truncate" the oldest messages to fit. Defaults to "raise".
+            model_ladder (List[str], optional): Models to route every message between, the cheapest first. Each
+             message is sent to the first model whose context window fits the conversation and the expected output.
+            memory_policy (SlidingWindowMemory, optional): Limits the part of the chat history that is sent to the LLM.
+             Every instance of the chat keeps its own window. Defaults to sending the whole history.
 
         Returns:
             (Type[Chat]): A new Chat class that inherits from the original class and has chat capabilities.
@@ -338,6 +490,12 @@ class ChatDecorator:
 
         """
         operator_type = resolve_operator(self.llm, operator_type="chat")
+        if cache is None:
+            cache = self.cache
+        elif cache is False:
+            cache = None
+        if compact_schema is None:
+            compact_schema = self.compact_schema
 
         def wrap(cls) -> Type[Chat]:
             non_private_methods = {
@@ -356,11 +514,16 @@ class ChatDecorator:
                     parsed=parsed_cls,
                     llm_params=llm_params,
                     streaming=streaming,
+                    cache=cache,
+                    compact_schema=compact_schema,
+                    context_overflow=context_overflow,
+                    model_ladder=model_ladder,
                 ),
                 middlewares=middlewares,
                 chat_history=chat_history,
                 greeting=greeting,
                 system=system,
+                memory_policy=memory_policy,
             )
 
             new_chat: Type[Chat] = type(cls.__name__, (Chat,), {})  # noqa
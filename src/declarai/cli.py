@@ -0,0 +1,59 @@
+"""
+The declarai command line interface.
+
+    declarai compile app.tasks app.chats --output declarai_manifest.json
+
+Imports the given modules, and writes the parsed metadata of all the tasks they declare into a task manifest.
+Point the `DECLARAI_MANIFEST` environment variable at the manifest to skip parsing the source code of the tasks at
+startup.
+"""
+import argparse
+import importlib
+import os
+import sys
+from typing import List, Optional
+
+from declarai.python_parser.manifest import record_manifest
+
+DEFAULT_MANIFEST_PATH = "declarai_manifest.json"
+
+
+def compile_manifest(modules: List[str], output: str) -> int:
+    """
+    Imports the given modules and writes the metadata of the tasks they declare into a manifest file.
+    Args:
+        modules: The names of the modules that declare the tasks
+        output: The path of the manifest file
+
+    Returns:
+        The number of tasks in the manifest
+    """
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    with record_manifest() as manifest:
+        for module in modules:
+            importlib.import_module(module)
+    manifest.save(output)
+    return len(manifest)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="declarai")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser(
+        "compile", help="Precompile the tasks of the given modules into a manifest"
+    )
+    compile_parser.add_argument(
+        "modules", nargs="+", help="The modules that declare the tasks"
+    )
+    compile_parser.add_argument(
+        "-o",
+        "--output",
+        default=DEFAULT_MANIFEST_PATH,
+        help=f"The path of the manifest file (default: {DEFAULT_MANIFEST_PATH})",
+    )
+
+    args = parser.parse_args(argv)
+    count = compile_manifest(args.modules, args.output)
+    print(f"Compiled {count} tasks into {args.output}")
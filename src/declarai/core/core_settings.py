@@ -6,3 +6,6 @@ This way we do not interfere with any existing environment variables.
 """
 
 DECLARAI_PREFIX = "DECLARAI"
+
+MANIFEST_PATH_ENV = f"{DECLARAI_PREFIX}_MANIFEST"
+"""An environment variable with the path of a precompiled task manifest, created by `declarai compile`."""
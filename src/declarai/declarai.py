@@ -3,8 +3,9 @@
 Decorates the package functionalities and serve as the main interface for the user.
 """
 import warnings
-from typing import Any, Dict, Optional, Type, overload
+from typing import TYPE_CHECKING, Any, Dict, Optional, Type, Union, overload
 
+from declarai.cache.base import BaseLLMCache
 from declarai.chat import ChatDecorator
 from declarai.operators import (
     LLM,
@@ -12,12 +13,18 @@ from declarai.operators import (
     ModelsOpenai,
     ProviderAzureOpenai,
     ProviderOpenai,
+    RateLimiter,
+    RetryPolicy,
+    TokenCounter,
     llm_registry,
     operator_registry,
     resolve_llm,
 )
 from declarai.task import TaskDecorator
 
+if TYPE_CHECKING:
+    from declarai.operators import HTTPTransport
+
 SUPPORT_018_BACK_COMPAT = True
 
 
@@ -27,7 +34,7 @@ def magic(
     task_desc: Optional[str] = None,
     input_desc: Optional[Dict[str, str]] = None,
     output_desc: Optional[str] = None,
-    **kwargs
+    **kwargs,
 ) -> Any:
     """
     This is an empty method used as a potential replacement for using the docstring for passing
@@ -53,6 +60,10 @@ class Declarai:
     Args:
         provider (str): The provider name.
         model (str): The model name.
+        cache (BaseLLMCache, optional): A cache for the LLM responses, shared by all the tasks and chats of this
+            context.
+        compact_schema (bool, optional): Describe the expected output of all the tasks and chats of this context in a
+            compact, token efficient format.
         **kwargs: Additional keyword arguments passed to the LLM resolver.
 
     Attributes:
@@ -73,12 +84,19 @@ class Declarai:
             timeout: int = None,
             stream: bool = None,
             request_timeout: int = None,
-        ):
+            cache: BaseLLMCache = None,
+            rate_limiter: RateLimiter = None,
+            retry_policy: RetryPolicy = None,
+            transport: Union["HTTPTransport", bool] = None,
+            token_counter: TokenCounter = None,
+            context_window: int = None,
+            compact_schema: bool = False,
+        ) -> "Declarai":
             warnings.warn(
                 "Declarai.openai is deprecated. Will be removed in 0.2.*. Please use `import declarai; declarai.openai`",
                 DeprecationWarning,
             )
-            openai(
+            return openai(
                 model=model,
                 version=version,
                 openai_token=openai_token,
@@ -86,6 +104,13 @@ class Declarai:
                 timeout=timeout,
                 stream=stream,
                 request_timeout=request_timeout,
+                cache=cache,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                transport=transport,
+                token_counter=token_counter,
+                context_window=context_window,
+                compact_schema=compact_schema,
             )
 
         @staticmethod
@@ -98,12 +123,19 @@ class Declarai:
             timeout: int = None,
             stream: bool = None,
             request_timeout: int = None,
-        ):
+            cache: BaseLLMCache = None,
+            rate_limiter: RateLimiter = None,
+            retry_policy: RetryPolicy = None,
+            transport: Union["HTTPTransport", bool] = None,
+            token_counter: TokenCounter = None,
+            context_window: int = None,
+            compact_schema: bool = False,
+        ) -> "Declarai":
             warnings.warn(
                 "Declarai.azure_openai is deprecated. Will be removed in 0.2.*. Please use `import declarai; declarai.azure_openai`",
                 DeprecationWarning,
             )
-            azure_openai(
+            return azure_openai(
                 deployment_name=deployment_name,
                 azure_openai_key=azure_openai_key,
                 azure_openai_api_base=azure_openai_api_base,
@@ -112,6 +144,13 @@ class Declarai:
                 timeout=timeout,
                 stream=stream,
                 request_timeout=request_timeout,
+                cache=cache,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                transport=transport,
+                token_counter=token_counter,
+                context_window=context_window,
+                compact_schema=compact_schema,
             )
 
     @overload
@@ -122,6 +161,7 @@ class Declarai:
         version: Optional[str] = None,
         openai_token: Optional[str] = None,
         stream: Optional[bool] = None,
+        cache: Optional[BaseLLMCache] = None,
     ):
         ...
 
@@ -131,19 +171,43 @@ class Declarai:
         provider: ProviderAzureOpenai,
         model: str,
         stream: Optional[bool] = None,
-        **kwargs
+        cache: Optional[BaseLLMCache] = None,
+        **kwargs,
     ):
         ...
 
-    def __init__(self, provider: str, model: str, **kwargs):
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        cache: Optional[BaseLLMCache] = None,
+        compact_schema: bool = False,
+        **kwargs,
+    ):
         self.llm = resolve_llm(provider, model, **kwargs)
-        self.task = TaskDecorator(self.llm).task
+        self.task = TaskDecorator(
+            self.llm, cache=cache, compact_schema=compact_schema
+        ).task
 
         class Experimental:
-            chat = ChatDecorator(self.llm).chat
+            chat = ChatDecorator(
+                self.llm, compact_schema=compact_schema, cache=cache
+            ).chat
 
         self.experimental = Experimental
 
+    def close(self) -> None:
+        """
+        Releases the connections of the LLM, e.g. its pooled HTTP sessions. See `BaseLLM.close`.
+        """
+        self.llm.close()
+
+    async def aclose(self) -> None:
+        """
+        Asynchronous version of `close`, to be awaited from the event loop the tasks were executed in.
+        """
+        await self.llm.aclose()
+
 
 def openai(
     model: ModelsOpenai,
@@ -153,6 +217,13 @@ def openai(
     timeout: int = None,
     stream: bool = None,
     request_timeout: int = None,
+    cache: BaseLLMCache = None,
+    rate_limiter: RateLimiter = None,
+    retry_policy: RetryPolicy = None,
+    transport: Union["HTTPTransport", bool] = None,
+    token_counter: TokenCounter = None,
+    context_window: int = None,
+    compact_schema: bool = False,
 ) -> Declarai:
     """
     Sets up a Declarai context for the OpenAI provider.
@@ -165,6 +236,15 @@ def openai(
         timeout (int, optional): Timeout for the request.
         stream (bool, optional): Whether to stream the response.
         request_timeout (int, optional): Request timeout duration.
+        cache (BaseLLMCache, optional): A cache for the LLM responses, shared by all the tasks and chats.
+        rate_limiter (RateLimiter, optional): Enforces requests and tokens per minute budgets.
+        retry_policy (RetryPolicy, optional): Retries transient errors with backoff and jitter.
+        transport (HTTPTransport, optional): Pooled keep-alive HTTP sessions, shared by all the tasks. Defaults to a
+            transport of the LLM, False sends the requests through the global sessions of the OpenAI SDK.
+        token_counter (TokenCounter, optional): Counts the tokens of prompts locally, before they are sent.
+        context_window (int, optional): The number of tokens the model accepts, when it is not a known model.
+        compact_schema (bool, optional): Describe the expected output of all the tasks in a compact, token efficient
+            format.
 
     Returns:
         Declarai: Initialized Declarai context.
@@ -178,6 +258,13 @@ def openai(
         timeout=timeout,
         stream=stream,
         request_timeout=request_timeout,
+        cache=cache,
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        transport=transport,
+        token_counter=token_counter,
+        context_window=context_window,
+        compact_schema=compact_schema,
     )
 
 
@@ -190,6 +277,13 @@ def azure_openai(
     timeout: int = None,
     stream: bool = None,
     request_timeout: int = None,
+    cache: BaseLLMCache = None,
+    rate_limiter: RateLimiter = None,
+    retry_policy: RetryPolicy = None,
+    transport: Union["HTTPTransport", bool] = None,
+    token_counter: TokenCounter = None,
+    context_window: int = None,
+    compact_schema: bool = False,
 ) -> Declarai:
     """
     Sets up a Declarai context for the Azure OpenAI provider.
@@ -203,6 +297,15 @@ def azure_openai(
         timeout (int, optional): Timeout for the request.
         stream (bool, optional): Whether to stream the response.
         request_timeout (int, optional): Request timeout duration.
+        cache (BaseLLMCache, optional): A cache for the LLM responses, shared by all the tasks and chats.
+        rate_limiter (RateLimiter, optional): Enforces requests and tokens per minute budgets.
+        retry_policy (RetryPolicy, optional): Retries transient errors with backoff and jitter.
+        transport (HTTPTransport, optional): Pooled keep-alive HTTP sessions, shared by all the tasks. Defaults to a
+            transport of the LLM, False sends the requests through the global sessions of the OpenAI SDK.
+        token_counter (TokenCounter, optional): Counts the tokens of prompts locally, before they are sent.
+        context_window (int, optional): The number of tokens the model accepts, when it is not a known model.
+        compact_schema (bool, optional): Describe the expected output of all the tasks in a compact, token efficient
+            format.
 
     Returns:
         DeclaraiContext: Initialized Declarai context.
@@ -217,6 +320,13 @@ def azure_openai(
         timeout=timeout,
         stream=stream,
         request_timeout=request_timeout,
+        cache=cache,
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        transport=transport,
+        token_counter=token_counter,
+        context_window=context_window,
+        compact_schema=compact_schema,
     )
 
 
@@ -0,0 +1,114 @@
+"""
+Measures the prompt tokens that the compact output schema saves on the evals scenarios.
+The prompts are compiled without calling the LLM, and their tokens are counted by the token counter of the LLM.
+
+Run with:
+    python -m declarai.evals.schema_tokens
+"""
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from declarai.evals.extraction import (
+    multi_value_extraction,
+    multi_value_extraction_kwargs,
+    multi_value_multi_type_extraction,
+    multi_value_multi_type_extraction_kwargs,
+    single_value_extraction,
+    single_value_extraction_kwargs,
+    single_value_multi_type_extraction,
+    single_value_multi_type_extraction_kwargs,
+)
+from declarai.evals.generation import (
+    structured_open_ended,
+    structured_open_ended_kwargs,
+    structured_strict_complex,
+    structured_strict_complex_kwargs,
+    unstructured_long_form,
+    unstructured_long_form_kwargs,
+    unstructured_short_form,
+    unstructured_short_form_kwargs,
+)
+from declarai.evals.manipulation import data_manipulation, data_manipulation_kwargs
+from declarai.operators import LLM, OpenAILLM
+from declarai.task import TaskDecorator
+
+SCENARIOS: Dict[str, tuple] = {
+    "single_value_extraction": (
+        single_value_extraction,
+        single_value_extraction_kwargs,
+    ),
+    "multi_value_extraction": (multi_value_extraction, multi_value_extraction_kwargs),
+    "multi_value_multi_type_extraction": (
+        multi_value_multi_type_extraction,
+        multi_value_multi_type_extraction_kwargs,
+    ),
+    "single_value_multi_type_extraction": (
+        single_value_multi_type_extraction,
+        single_value_multi_type_extraction_kwargs,
+    ),
+    "structured_open_ended": (structured_open_ended, structured_open_ended_kwargs),
+    "structured_strict_complex": (
+        structured_strict_complex,
+        structured_strict_complex_kwargs,
+    ),
+    "unstructured_long_form": (unstructured_long_form, unstructured_long_form_kwargs),
+    "unstructured_short_form": (
+        unstructured_short_form,
+        unstructured_short_form_kwargs,
+    ),
+    "data_manipulation": (data_manipulation, data_manipulation_kwargs),
+}
+"""The evals scenarios, and the kwargs they are called with."""
+
+
+class SchemaTokens(NamedTuple):
+    scenario: str
+    verbose_tokens: int
+    compact_tokens: int
+
+    @property
+    def saved(self) -> float:
+        """The share of the prompt tokens that the compact schema saves."""
+        return 1 - self.compact_tokens / self.verbose_tokens
+
+
+def _prompt_tokens(
+    llm: LLM, scenario: Callable, kwargs: Dict[str, Any], compact_schema: bool
+) -> int:
+    task = TaskDecorator(llm, compact_schema=compact_schema).task(scenario)
+    return llm.count_tokens(task.compile(**kwargs)["messages"])
+
+
+def measure_schema_tokens(llm: LLM = None) -> List[SchemaTokens]:
+    """
+    Compiles every evals scenario with the verbose and with the compact output schema.
+    Args:
+        llm: The LLM to compile the prompts for, never called
+
+    Returns:
+        The estimated prompt tokens of every scenario in both formats
+    """
+    llm = llm or OpenAILLM(openai_token="-", model="gpt-3.5-turbo")
+    return [
+        SchemaTokens(
+            scenario=name,
+            verbose_tokens=_prompt_tokens(llm, scenario, kwargs, compact_schema=False),
+            compact_tokens=_prompt_tokens(llm, scenario, kwargs, compact_schema=True),
+        )
+        for name, (scenario, kwargs) in SCENARIOS.items()
+    ]
+
+
+if __name__ == "__main__":
+    results = measure_schema_tokens()
+    print(f"{'Scenario':<40}{'verbose':>10}{'compact':>10}{'saved':>10}")
+    for result in results:
+        print(
+            f"{result.scenario:<40}{result.verbose_tokens:>10}"
+            f"{result.compact_tokens:>10}{result.saved:>10.1%}"
+        )
+    verbose_total = sum(result.verbose_tokens for result in results)
+    compact_total = sum(result.compact_tokens for result in results)
+    print(
+        f"{'total':<40}{verbose_total:>10}{compact_total:>10}"
+        f"{1 - compact_total / verbose_total:>10.1%}"
+    )
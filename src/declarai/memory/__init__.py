@@ -1,8 +1,36 @@
 """
 Memory module for Declarai interactions that includes message history.
+The backends are imported on first use, so that only the backend that is used is loaded.
 """
-from .file import FileMessageHistory
-from .in_memory import InMemoryMessageHistory
-from .mongodb import MongoDBMessageHistory
-from .postgres import PostgresMessageHistory
-from .redis import RedisMessageHistory
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .file import FileMessageHistory
+    from .in_memory import InMemoryMessageHistory
+    from .mongodb import MongoDBMessageHistory
+    from .postgres import PostgresMessageHistory
+    from .redis import RedisMessageHistory
+    from .window import SlidingWindowMemory
+
+_LAZY_ATTRIBUTES = {
+    "FileMessageHistory": ".file",
+    "InMemoryMessageHistory": ".in_memory",
+    "MongoDBMessageHistory": ".mongodb",
+    "PostgresMessageHistory": ".postgres",
+    "RedisMessageHistory": ".redis",
+    "SlidingWindowMemory": ".window",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
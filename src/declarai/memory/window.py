@@ -0,0 +1,121 @@
+"""
+Memory policies that limit the part of the chat history that is sent to the LLM.
+Without a policy, the whole conversation is sent on every turn, so the size of the prompt, its latency and its cost grow
+with the length of the conversation until it no longer fits the context window of the model.
+"""
+from typing import List, Optional
+
+from declarai.operators import Message
+from declarai.operators.tokens import CharacterTokenCounter, TokenCounter
+
+_DEFAULT_TOKEN_COUNTER = CharacterTokenCounter()
+
+
+class SlidingWindowMemory:
+    """
+    Sends only the most recent messages of the chat history to the LLM.
+    The window is limited by a number of messages, a budget of tokens, or both. The system message is always sent, and
+    so is the greeting when `pin_greeting` is set. The last message is always sent, even when it exceeds the budget
+    alone.
+
+    The tokens of every message are counted once, when the message is added to the history, and the window only moves
+    forward while the conversation grows, so computing it takes constant amortized time per turn.
+
+    Args:
+        max_messages: the maximum number of messages in the window, not including the pinned greeting
+        max_tokens: the maximum number of tokens of the window, including the pinned greeting
+        pin_greeting: whether the greeting of the chat is always sent, ahead of the window
+        token_counter: counts the tokens of the messages. Defaults to the token counter of the LLM of the chat.
+
+    Example:
+        ```py
+        @gpt_35.experimental.chat(memory_policy=SlidingWindowMemory(max_tokens=2000))
+        class SQLBot:
+            ...
+        ```
+    """
+
+    def __init__(
+        self,
+        max_messages: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        pin_greeting: bool = True,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        if max_messages is None and max_tokens is None:
+            raise ValueError(
+                "A sliding window requires max_messages, max_tokens or both"
+            )
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.pin_greeting = pin_greeting
+        self.token_counter = token_counter
+        self.reset()
+
+    def bind(self, token_counter: TokenCounter) -> "SlidingWindowMemory":
+        """
+        Returns a new policy with the same limits and an empty state, for a single chat.
+        Args:
+            token_counter: the token counter that is used unless the policy defines its own
+
+        Returns:
+            The new policy
+        """
+        return SlidingWindowMemory(
+            max_messages=self.max_messages,
+            max_tokens=self.max_tokens,
+            pin_greeting=self.pin_greeting,
+            token_counter=self.token_counter or token_counter,
+        )
+
+    def reset(self) -> None:
+        """
+        Drops the token counts of the messages, e.g. after the chat history was cleared.
+        """
+        self._cumulative_tokens = [0]
+        self._last_message: Optional[Message] = None
+        self._start = 0
+
+    def select(self, messages: List[Message], pinned: int = 0) -> List[Message]:
+        """
+        Selects the messages that are sent to the LLM.
+        Args:
+            messages: the chat history
+            pinned: the number of messages at the start of the history that are always sent, e.g. the greeting
+
+        Returns:
+            The pinned messages, followed by the most recent messages that fit the window
+        """
+        self._count(messages)
+        cumulative = self._cumulative_tokens
+        end = len(messages)
+        start = max(self._start, pinned)
+        if self.max_messages is not None:
+            start = max(start, end - self.max_messages)
+        if self.max_tokens is not None:
+            budget = self.max_tokens - cumulative[pinned]
+            while start < end - 1 and cumulative[end] - cumulative[start] > budget:
+                start += 1
+        self._start = start
+        if start <= pinned:
+            return messages
+        return messages[:pinned] + messages[start:]
+
+    def _count(self, messages: List[Message]) -> None:
+        """
+        Counts the tokens of the messages that were added since the last call.
+        The counts are dropped when the history no longer continues the messages that were counted.
+        """
+        counted = len(self._cumulative_tokens) - 1
+        if counted > len(messages) or (
+            counted and messages[counted - 1] != self._last_message
+        ):
+            self.reset()
+            counted = 0
+        token_counter = self.token_counter or _DEFAULT_TOKEN_COUNTER
+        for message in messages[counted:]:
+            self._cumulative_tokens.append(
+                self._cumulative_tokens[-1] + token_counter.count_messages([message])
+            )
+        if messages:
+            self._last_message = messages[-1]
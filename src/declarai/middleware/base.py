@@ -2,7 +2,18 @@
 Base class for task middlewares.
 """
 from abc import abstractmethod  # pylint: disable=E0611
-from typing import Any, Dict, Iterator
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Type,
+)
 
 from declarai._base import TaskType
 
@@ -18,39 +29,100 @@ class TaskMiddleware:
     Attributes:
         _task: The task to wrap
         _kwargs: The keyword arguments to pass to the task
+        _context: The execution context of the call the middleware wraps
     """
 
     def __init__(self, task: TaskType, kwargs: Dict[str, Any] = None):
         self._task = task
         self._kwargs = kwargs
+        self._context = task.execution_context
 
-    def _stream(self) -> Iterator:
+    def _stream(self, stream: Iterator) -> Iterator:
         """
         Re-streams the streaming response while adding the after sideeffects execution to the generator
         Returns:
 
         """
-        for chunk in self._task._exec(self._kwargs):
+        for chunk in stream:
             yield chunk
-        self.after(self._task)
+        with self._task._execution(self._context):
+            self.after(self._task)
 
-    def __call__(self) -> Any:
+    async def _astream(self, stream: AsyncIterator) -> AsyncIterator:
         """
-        Once the middleware is called, it executes the task and returns the result.
-        Before it executes the task, it calls the `before` method, and after it executes the task, it calls the `after` method.
+        Asynchronous version of `_stream`.
+        Re-streams the streaming response while adding the after sideeffects execution to the generator
+        Returns:
+
+        """
+        async for chunk in stream:
+            yield chunk
+        with self._task._execution(self._context):
+            self.after(self._task)
+
+    def handle(self, call_next: Callable[[], Any]) -> Any:
+        """
+        Wraps the rest of the middleware chain, and the task at its end.
+        By default, calls `before`, then the rest of the chain, then `after`. When the task is streaming, `after` is
+        called once the stream is exhausted.
+        Override to control the execution, e.g. a caching middleware can return a result without calling `call_next`,
+        which skips the rest of the chain and the call to the LLM. Such a middleware may set `task.llm_response` to
+        supply the response of the call, otherwise the `after` of the middlewares that wrap it is skipped, as there is
+        no response to act on.
+        Args:
+            call_next: executes the rest of the chain and returns its result
+
         Returns:
             The result of the task
         """
         self.before(self._task)
-        # # If the task is streaming, handle it differently
+        res = call_next()
         if self._task.operator.streaming:
             # Yield chunks from the task, then call the after method
-            return self._stream()
-        else:
-            # Non-streaming tasks can be handled as before
-            res = self._task._exec(self._kwargs)
+            return self._stream(res)
+        self._after()
+        return res
+
+    async def ahandle(self, call_next: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Asynchronous version of `handle`.
+        Args:
+            call_next: awaits the rest of the chain and returns its result
+
+        Returns:
+            The result of the task
+        """
+        self.before(self._task)
+        res = await call_next()
+        if self._task.operator.streaming:
+            return self._astream(res)
+        self._after()
+        return res
+
+    def _after(self) -> None:
+        """
+        Calls `after`, unless an inner middleware returned without a response from the LLM.
+        """
+        if self._task.llm_response is not None:
             self.after(self._task)
-            return res
+
+    def __call__(self) -> Any:
+        """
+        Executes the task wrapped by this middleware alone.
+        Before it executes the task, it calls the `before` method, and after it executes the task, it calls the `after` method.
+        Returns:
+            The result of the task
+        """
+        return self.handle(partial(self._task._exec, self._kwargs))
+
+    async def acall(self) -> Any:
+        """
+        Asynchronous version of `__call__`.
+        Awaits the execution of the task between the `before` and `after` methods.
+        Returns:
+            The result of the task
+        """
+        return await self.ahandle(partial(self._task._aexec, self._kwargs))
 
     @abstractmethod
     def before(self, task: TaskType) -> None:
@@ -67,3 +139,57 @@ class TaskMiddleware:
         Args:
             task: the task to execute
         """
+
+
+MiddlewareChain = Callable[[TaskType, Dict[str, Any]], Any]
+"A composed chain of middlewares, executed with the task and the runtime kwargs of the call"
+
+
+def compose_middlewares(
+    middlewares: Optional[List[Type[TaskMiddleware]]], endpoint: MiddlewareChain
+) -> MiddlewareChain:
+    """
+    Composes the middlewares around the endpoint, onion style. The first middleware is the outermost one, its
+    `before` runs first and its `after` runs last.
+    The chain is composed once, every call only instantiates the middlewares, which hold the state of that call.
+    Args:
+        middlewares: the middleware classes to compose
+        endpoint: executes the task itself
+
+    Returns:
+        The composed chain
+    """
+    chain = endpoint
+    for middleware in reversed(middlewares or []):
+        chain = _link(middleware, chain)
+    return chain
+
+
+def acompose_middlewares(
+    middlewares: Optional[List[Type[TaskMiddleware]]], endpoint: MiddlewareChain
+) -> MiddlewareChain:
+    """
+    Asynchronous version of `compose_middlewares`. Both the endpoint and the composed chain are coroutine functions.
+    """
+    chain = endpoint
+    for middleware in reversed(middlewares or []):
+        chain = _alink(middleware, chain)
+    return chain
+
+
+def _link(
+    middleware: Type[TaskMiddleware], call_next: MiddlewareChain
+) -> MiddlewareChain:
+    def chain(task: TaskType, kwargs: Dict[str, Any]) -> Any:
+        return middleware(task, kwargs).handle(partial(call_next, task, kwargs))
+
+    return chain
+
+
+def _alink(
+    middleware: Type[TaskMiddleware], call_next: MiddlewareChain
+) -> MiddlewareChain:
+    async def chain(task: TaskType, kwargs: Dict[str, Any]) -> Any:
+        return await middleware(task, kwargs).ahandle(partial(call_next, task, kwargs))
+
+    return chain
@@ -1,23 +1,69 @@
 """
 Operators are the main interface that interacts internally with the LLMs.
+The providers are imported on first use, so that importing declarai does not pay for the SDKs of every provider.
 """
-from typing import Type, Union, overload
-
-from typing_extensions import Literal
-
-from .llm import LLM, BaseLLM, BaseLLMParams, LLMParamsType, LLMResponse, LLMSettings
-from .message import Message, MessageRole
-from .openai_operators import (
-    AzureOpenAIChatOperator,
-    AzureOpenAILLM,
-    AzureOpenAITaskOperator,
-    OpenAIChatOperator,
-    OpenAILLM,
-    OpenAITaskOperator,
+import importlib
+from typing import TYPE_CHECKING, Literal, Type, Union, overload
+
+from .llm import (
+    LLM,
+    AsyncLLMStream,
+    BaseLLM,
+    BaseLLMParams,
+    LLMDelta,
+    LLMParamsType,
+    LLMResponse,
+    LLMSettings,
+    LLMStream,
 )
+from .message import Message, MessageRole
 from .operator import BaseChatOperator, BaseOperator
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .routing import ModelLadder
+from .tokens import (
+    BPETokenCounter,
+    CharacterTokenCounter,
+    ContextWindowExceededError,
+    TokenCounter,
+)
 from .registry import llm_registry, operator_registry
 
+if TYPE_CHECKING:
+    from .openai_operators import (
+        AzureOpenAIChatOperator,
+        AzureOpenAILLM,
+        AzureOpenAITaskOperator,
+        HTTPTransport,
+        OpenAIChatOperator,
+        OpenAILLM,
+        OpenAITaskOperator,
+    )
+
+_LAZY_ATTRIBUTES = {
+    "AzureOpenAIChatOperator": ".openai_operators",
+    "AzureOpenAILLM": ".openai_operators",
+    "AzureOpenAITaskOperator": ".openai_operators",
+    "HTTPTransport": ".openai_operators",
+    "OpenAIChatOperator": ".openai_operators",
+    "OpenAILLM": ".openai_operators",
+    "OpenAITaskOperator": ".openai_operators",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
+
+
 # Based on documentation from https://platform.openai.com/docs/models/overview
 ProviderOpenai = "openai"
 ProviderAzureOpenai = "azure-openai"
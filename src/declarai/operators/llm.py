@@ -3,11 +3,24 @@ This module defines the base classes for the LLM interface.
 """
 from __future__ import annotations
 
+import asyncio
 from abc import abstractmethod
-from typing import Optional, TypedDict, TypeVar
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    TypedDict,
+    TypeVar,
+)
 
 from pydantic.main import BaseModel
 
+from declarai.operators.message import Message
+from declarai.operators.tokens import CharacterTokenCounter, TokenCounter
+
 
 class LLMResponse(BaseModel):
     """
@@ -30,6 +43,169 @@ class LLMResponse(BaseModel):
     raw_response: Optional[dict] = None
 
 
+STREAM_DELTAS = "deltas"
+"""Streaming mode that yields an `LLMDelta` per chunk instead of the accumulated `LLMResponse`"""
+
+
+class LLMDelta:
+    """
+    A single chunk of a streamed LLM response.
+    Unlike `LLMResponse`, a delta only holds the text that was added by the chunk, which keeps streaming of long
+    responses linear in their length.
+
+    Attributes:
+        content: The text added by the chunk
+        role: The role of the message, only sent on the first chunk by most providers
+        model: The model that generated the chunk
+        finish_reason: The reason the generation stopped, only sent on the last chunk
+        usage: The token usage of the response, if the provider reports it
+    """
+
+    __slots__ = ("content", "role", "model", "finish_reason", "usage")
+
+    def __init__(
+        self,
+        content: str = "",
+        role: Optional[str] = None,
+        model: Optional[str] = None,
+        finish_reason: Optional[str] = None,
+        usage: Optional[dict] = None,
+    ):
+        self.content = content
+        self.role = role
+        self.model = model
+        self.finish_reason = finish_reason
+        self.usage = usage
+
+    def __repr__(self) -> str:
+        return f"LLMDelta(content={self.content!r}, role={self.role!r}, finish_reason={self.finish_reason!r})"
+
+
+StreamFinalizer = Callable[[LLMResponse], None]
+"""Called with the full response once a stream is exhausted"""
+
+
+class DeltaBuffer:
+    """
+    Accumulates streamed deltas, the full response is only materialized once requested.
+
+    Args:
+        on_finish: Called with the full response once the stream is exhausted
+    """
+
+    def __init__(self, on_finish: Optional[StreamFinalizer] = None):
+        self._parts: List[str] = []
+        self._role = "assistant"
+        self._model: Optional[str] = None
+        self._usage: Optional[dict] = None
+        self._response: Optional[LLMResponse] = None
+        self._on_finish = on_finish
+        self.finished = False
+
+    def add(self, delta: LLMDelta) -> LLMDelta:
+        self._parts.append(delta.content)
+        if delta.role:
+            self._role = delta.role
+        if delta.model:
+            self._model = delta.model
+        if delta.usage:
+            self._usage = delta.usage
+        return delta
+
+    @property
+    def text(self) -> str:
+        """
+        The text that was streamed so far.
+        """
+        return "".join(self._parts)
+
+    @property
+    def response(self) -> LLMResponse:
+        """
+        The response that was streamed so far, built once the stream is exhausted.
+        """
+        if self._response is not None:
+            return self._response
+        usage = self._usage or {}
+        response = LLMResponse(
+            response=self.text,
+            model=self._model,
+            role=self._role,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            total_tokens=usage.get("total_tokens"),
+        )
+        if self.finished:
+            self._parts = [response.response]
+            self._response = response
+        return response
+
+    def finish(self) -> None:
+        """
+        Marks the stream as exhausted, and calls `on_finish` with the full response exactly once.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        if self._on_finish is not None:
+            self._on_finish(self.response)
+
+
+class LLMStream(DeltaBuffer):
+    """
+    An iterator of the deltas of a streamed response.
+    Once exhausted, `response` holds the full `LLMResponse`.
+
+    Args:
+        deltas: The deltas of the response, as produced by the LLM
+        on_finish: Called with the full response once the stream is exhausted
+    """
+
+    def __init__(
+        self, deltas: Iterator[LLMDelta], on_finish: Optional[StreamFinalizer] = None
+    ):
+        super().__init__(on_finish)
+        self._deltas = deltas
+
+    def __iter__(self) -> "LLMStream":
+        return self
+
+    def __next__(self) -> LLMDelta:
+        try:
+            return self.add(next(self._deltas))
+        except StopIteration:
+            self.finish()
+            raise
+
+
+class AsyncLLMStream(DeltaBuffer):
+    """
+    Asynchronous version of `LLMStream`.
+
+    Args:
+        deltas: The deltas of the response, as produced by the LLM
+        on_finish: Called with the full response once the stream is exhausted
+    """
+
+    def __init__(
+        self,
+        deltas: AsyncIterator[LLMDelta],
+        on_finish: Optional[StreamFinalizer] = None,
+    ):
+        super().__init__(on_finish)
+        self._deltas = deltas
+
+    def __aiter__(self) -> "AsyncLLMStream":
+        return self
+
+    async def __anext__(self) -> LLMDelta:
+        try:
+            return self.add(await self._deltas.__anext__())
+        except StopAsyncIteration:
+            self.finish()
+            raise
+
+
 class BaseLLMParams(TypedDict):
     """
     The base LLM params that are common to all LLMs.
@@ -101,10 +277,40 @@ class LLMSettings:
 class BaseLLM:
     """
     The base LLM class that all LLMs should inherit from.
+
+    Attributes:
+        provider (str): The provider of the model
+        model (str): The model to use
+        token_counter (TokenCounter): Counts the tokens of prompts locally, before they are sent
+        context_window (int): The number of tokens the model accepts, the prompt and the completion. None if unknown.
     """
 
     provider: str
     model: str
+    token_counter: TokenCounter = CharacterTokenCounter()
+    context_window: Optional[int] = None
+
+    def count_tokens(self, messages: List[Message]) -> int:
+        """
+        Counts the tokens of a prompt with the token counter of the LLM, without calling the provider.
+        Args:
+            messages: the messages that are sent to the LLM
+
+        Returns:
+            The number of prompt tokens
+        """
+        return self.token_counter.count_messages(messages)
+
+    def model_context_window(self, model: str) -> Optional[int]:
+        """
+        Returns the context window of a model of the provider, used when calls are routed between models.
+        Args:
+            model: the name of the model
+
+        Returns:
+            The number of tokens the model accepts, or None if it is unknown
+        """
+        return self.context_window if model == self.model else None
 
     @abstractmethod
     def predict(self, *args, **kwargs) -> LLMResponse:
@@ -119,6 +325,35 @@ class BaseLLM:
         """
         raise NotImplementedError()
 
+    async def apredict(self, *args, **kwargs) -> LLMResponse:
+        """
+        The asynchronous counterpart of `predict`.
+        LLMs that provide a native async client should override this method.
+        By default, the blocking `predict` is executed in the event loop's default executor, so that it does not
+        block the running loop.
+        Args:
+            *args:
+            **kwargs:
+
+        Returns: llm response object
+
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.predict, *args, **kwargs))
+
+    def close(self) -> None:
+        """
+        Releases the connections held by the LLM, e.g. its pooled HTTP sessions.
+        The LLM may still be used afterwards, the connections are opened again when needed.
+        Asynchronous connections of event loops that are still running are only released by `aclose`.
+        """
+
+    async def aclose(self) -> None:
+        """
+        Asynchronous version of `close`. Also releases the asynchronous connections of the running event loop.
+        """
+        self.close()
+
 
 LLMParamsType = TypeVar("LLMParamsType", bound=BaseLLMParams)
 """Type variable for LLM params"""
@@ -4,3 +4,4 @@ OpenAI operators and LLMs.
 from .chat_operator import AzureOpenAIChatOperator, OpenAIChatOperator
 from .openai_llm import AzureOpenAILLM, OpenAIError, OpenAILLM, OpenAILLMParams
 from .task_operator import AzureOpenAITaskOperator, OpenAITaskOperator
+from .transport import HTTPTransport
@@ -1,13 +1,26 @@
 """
 LLM implementation for OpenAI
 """
-from typing import List, Optional, Iterator, Union
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
 from openai.openai_object import OpenAIObject
 import openai
+import openai.error
 
 from declarai.operators import BaseLLM, BaseLLMParams, LLMResponse, Message
+from declarai.operators.llm import (
+    STREAM_DELTAS,
+    AsyncLLMStream,
+    DeltaBuffer,
+    LLMDelta,
+    LLMStream,
+    StreamFinalizer,
+)
+from declarai.operators.rate_limiter import RateLimiter
 from declarai.operators.registry import register_llm
+from declarai.operators.retry import RetryPolicy
+from declarai.operators.tokens import TokenCounter
 
 from .settings import (
     AZURE_API_VERSION,
@@ -17,6 +30,7 @@ from .settings import (
     OPENAI_API_KEY,
     OPENAI_MODEL,
 )
+from .transport import HTTPTransport
 
 
 class OpenAIError(Exception):
@@ -25,15 +39,70 @@ class OpenAIError(Exception):
     pass
 
 
+OPENAI_RETRYABLE_ERRORS = (
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.TryAgain,
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+)
+"Transient errors of the OpenAI SDK that are retried when a retry policy is set"
+
+# Based on documentation from https://platform.openai.com/docs/models/overview
+OPENAI_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "text-davinci-003": 4097,
+    "text-davinci-002": 4097,
+    "code-davinci-002": 8001,
+}
+"The number of tokens every OpenAI model accepts, the prompt and the completion"
+
+
+def openai_context_window(model: str) -> Optional[int]:
+    """
+    Returns the context window of an OpenAI model.
+    Snapshots and fine-tuned models share the context window of their base model, e.g. gpt-3.5-turbo-0613.
+    Args:
+        model: the name of the model
+
+    Returns:
+        The number of tokens the model accepts, or None if the model is unknown
+    """
+    if not model:
+        return None
+    base_models = [
+        base_model
+        for base_model in OPENAI_CONTEXT_WINDOWS
+        if model == base_model
+        or model.startswith(f"{base_model}-")
+        or model.startswith(f"{base_model}:")
+    ]
+    if not base_models:
+        return None
+    return OPENAI_CONTEXT_WINDOWS[max(base_models, key=len)]
+
+
 class BaseOpenAILLM(BaseLLM):
     """
     OpenAI LLM implementation that uses openai sdk to make predictions.
     Args:
         openai_token: OpenAI API key
         model: OpenAI model name
+        rate_limiter: Enforces requests and tokens per minute budgets before requests are sent
+        retry_policy: Retries transient errors with backoff, within an optional deadline
+        transport: Pooled keep-alive HTTP sessions the requests are sent through. Defaults to a transport of the LLM.
+            Set to False to send the requests through the global sessions of the OpenAI SDK.
+        token_counter: Counts the tokens of prompts locally. Defaults to an estimation based on the length of the text.
+        context_window: The number of tokens the model accepts. Defaults to the context window of known OpenAI models.
     Attributes:
         openai (openai): OpenAI SDK
         model (str): OpenAI model name
+        rate_limiter (RateLimiter): The rate limiter of the LLM, if any
+        retry_policy (RetryPolicy): The retry policy of the LLM, if any
+        transport (HTTPTransport): The HTTP transport of the LLM, if any
     """
 
     provider = "openai"
@@ -47,8 +116,18 @@ class BaseOpenAILLM(BaseLLM):
         timeout: int = None,
         stream: bool = None,
         request_timeout: int = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        transport: Union[HTTPTransport, bool] = None,
+        token_counter: TokenCounter = None,
+        context_window: int = None,
         **kwargs,
     ):
+        if transport is None:
+            transport = HTTPTransport()
+        transport = transport or None
+        if request_timeout is None and transport:
+            request_timeout = transport.request_timeout
         self._kwargs = {
             "headers": headers,
             "timeout": timeout,
@@ -60,6 +139,12 @@ class BaseOpenAILLM(BaseLLM):
         self.api_type = api_type
         self.stream = stream
         self.model = model_name
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.transport = transport
+        if token_counter is not None:
+            self.token_counter = token_counter
+        self.context_window = context_window or openai_context_window(model_name)
 
     @property
     def streaming(self) -> bool:
@@ -70,12 +155,60 @@ class BaseOpenAILLM(BaseLLM):
         """
         return self.stream
 
+    def model_context_window(self, model: str) -> Optional[int]:
+        return super().model_context_window(model) or openai_context_window(model)
+
+    def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        if self.transport:
+            await self.transport.aclose()
+
+    def _completion_kwargs(
+        self,
+        messages: List[Message],
+        model: str = None,
+        temperature: float = 0,
+        max_tokens: int = None,
+        top_p: float = 1,
+        frequency_penalty: int = 0,
+        presence_penalty: int = 0,
+        stream: bool = None,
+    ) -> Dict[str, Any]:
+        """
+        Builds the keyword arguments that are sent to the OpenAI ChatCompletion api.
+        Shared by both the blocking and the asynchronous prediction paths.
+        """
+        if stream is None:
+            stream = self.stream
+        openai_messages = [{"role": m.role, "content": m.message} for m in messages]
+        completion_kwargs = dict(
+            model=model or self.model,
+            messages=openai_messages,
+            temperature=temperature,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+            api_key=self.api_key,
+            api_type=self.api_type,
+            stream=bool(stream),
+            **self._kwargs,
+        )
+        if model and "engine" in completion_kwargs:
+            # Azure routes the requests by the deployment, so the requested model replaces the default deployment
+            completion_kwargs["engine"] = model
+        if max_tokens is not None:
+            completion_kwargs["max_tokens"] = max_tokens
+        return completion_kwargs
+
     def predict(
         self,
         messages: List[Message],
         model: str = None,
         temperature: float = 0,
-        max_tokens: int = 3000,
+        max_tokens: int = None,
         top_p: float = 1,
         frequency_penalty: int = 0,
         presence_penalty: int = 0,
@@ -84,11 +217,12 @@ class BaseOpenAILLM(BaseLLM):
         """
         Predicts the next message using OpenAI
         Args:
-            stream: if to stream the response
+            stream: if to stream the response. Set to "deltas" to stream an `LLMStream` of the deltas of the response.
             messages: List of messages that are used as context for the prediction
             model: the model to use for the prediction
             temperature: the temperature to use for the prediction
-            max_tokens: the maximum number of tokens to use for the prediction
+            max_tokens: the maximum number of tokens to use for the prediction. When not set, the provider limits the
+                completion to what is left of the context window of the model.
             top_p: the top p to use for the prediction
             frequency_penalty: the frequency penalty to use for the prediction
             presence_penalty: the presence penalty to use for the prediction
@@ -97,35 +231,176 @@ class BaseOpenAILLM(BaseLLM):
             LLMResponse: The response from the LLM
 
         """
-        if stream is None:
-            stream = self.stream
-        openai_messages = [{"role": m.role, "content": m.message} for m in messages]
-        res = self.openai.ChatCompletion.create(
-            model=model or self.model,
-            messages=openai_messages,
+        completion_kwargs = self._completion_kwargs(
+            messages=messages,
+            model=model,
             temperature=temperature,
             max_tokens=max_tokens,
             top_p=top_p,
             frequency_penalty=frequency_penalty,
             presence_penalty=presence_penalty,
-            api_key=self.api_key,
-            api_type=self.api_type,
             stream=stream,
-            **self._kwargs,
+        )
+        stream_mode = self.stream if stream is None else stream
+        reserved_tokens = self._requested_tokens(
+            messages, completion_kwargs.get("max_tokens")
+        )
+
+        def send(remaining_time: Optional[float]) -> OpenAIObject:
+            with self.transport.bind() if self.transport else nullcontext():
+                return self.openai.ChatCompletion.create(
+                    **self._with_deadline(completion_kwargs, remaining_time)
+                )
+
+        # The budget is reserved once for the call, rather than again for every retry
+        if self.rate_limiter:
+            self.rate_limiter.acquire(reserved_tokens)
+        try:
+            if self.retry_policy:
+                res = self.retry_policy.call(send, retry_on=OPENAI_RETRYABLE_ERRORS)
+            else:
+                res = send(None)
+        except Exception:
+            self._release(reserved_tokens)
+            raise
+
+        if completion_kwargs["stream"]:
+            return handle_streaming_response(
+                res,
+                deltas=stream_mode == STREAM_DELTAS,
+                on_finish=self._stream_finalizer(
+                    reserved_tokens, completion_kwargs.get("max_tokens")
+                ),
+            )
+        return self._reconcile(reserved_tokens, to_llm_response(res))
+
+    async def apredict(
+        self,
+        messages: List[Message],
+        model: str = None,
+        temperature: float = 0,
+        max_tokens: int = None,
+        top_p: float = 1,
+        frequency_penalty: int = 0,
+        presence_penalty: int = 0,
+        stream: bool = None,
+    ) -> Union[AsyncIterator[LLMResponse], LLMResponse]:
+        """
+        Predicts the next message using OpenAI's asynchronous api.
+        Accepts the same arguments as `predict`, but does not block the running event loop while waiting for
+        the response.
+
+        Returns:
+            LLMResponse: The response from the LLM, or an async iterator of responses when streaming.
+
+        """
+        completion_kwargs = self._completion_kwargs(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+            stream=stream,
+        )
+        stream_mode = self.stream if stream is None else stream
+        reserved_tokens = self._requested_tokens(
+            messages, completion_kwargs.get("max_tokens")
         )
 
-        if stream:
-            return handle_streaming_response(res)
-
-        else:
-            return LLMResponse(
-                response=res.choices[0]["message"]["content"],
-                model=res.model,
-                prompt_tokens=res["usage"]["prompt_tokens"],
-                completion_tokens=res["usage"]["completion_tokens"],
-                total_tokens=res["usage"]["total_tokens"],
-                raw_response=res.to_dict_recursive(),
+        async def send(remaining_time: Optional[float]) -> OpenAIObject:
+            request_kwargs = self._with_deadline(completion_kwargs, remaining_time)
+            if self.transport:
+                async with self.transport.abind():
+                    return await self.openai.ChatCompletion.acreate(**request_kwargs)
+            return await self.openai.ChatCompletion.acreate(**request_kwargs)
+
+        if self.rate_limiter:
+            await self.rate_limiter.aacquire(reserved_tokens)
+        try:
+            if self.retry_policy:
+                res = await self.retry_policy.acall(
+                    send, retry_on=OPENAI_RETRYABLE_ERRORS
+                )
+            else:
+                res = await send(None)
+        except Exception:
+            self._release(reserved_tokens)
+            raise
+
+        if completion_kwargs["stream"]:
+            return ahandle_streaming_response(
+                res,
+                deltas=stream_mode == STREAM_DELTAS,
+                on_finish=self._stream_finalizer(
+                    reserved_tokens, completion_kwargs.get("max_tokens")
+                ),
             )
+        return self._reconcile(reserved_tokens, to_llm_response(res))
+
+    @staticmethod
+    def _with_deadline(
+        completion_kwargs: Dict[str, Any], remaining_time: Optional[float]
+    ) -> Dict[str, Any]:
+        """
+        Limits the request timeout to the time that is left until the deadline of the call.
+        """
+        if remaining_time is None:
+            return completion_kwargs
+        request_timeout = completion_kwargs.get("request_timeout")
+        if isinstance(request_timeout, tuple):
+            return {
+                **completion_kwargs,
+                "request_timeout": tuple(
+                    _min_timeout(timeout, remaining_time) for timeout in request_timeout
+                ),
+            }
+        return {
+            **completion_kwargs,
+            "request_timeout": _min_timeout(request_timeout, remaining_time),
+        }
+
+    def _requested_tokens(self, messages: List[Message], max_tokens: int) -> int:
+        """
+        Estimates the number of tokens a request may use, the prompt and the maximum completion.
+        """
+        if not self.rate_limiter:
+            return 0
+        return self.count_tokens(messages) + (max_tokens or 0)
+
+    def _release(self, reserved_tokens: int) -> None:
+        """
+        Gives back the reservation of a call that failed, as failed requests do not use the token budget.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.reconcile(reserved_tokens, 0)
+
+    def _reconcile(self, reserved_tokens: int, response: LLMResponse) -> LLMResponse:
+        if self.rate_limiter:
+            self.rate_limiter.reconcile(reserved_tokens, response.total_tokens)
+        return response
+
+    def _stream_finalizer(
+        self, reserved_tokens: int, max_tokens: Optional[int]
+    ) -> Optional[StreamFinalizer]:
+        """
+        Reconciles the reservation of a streamed call once the stream is exhausted.
+        Streamed chunks do not report their usage, so the tokens of the streamed completion are counted locally.
+        """
+        if not self.rate_limiter:
+            return None
+        prompt_tokens = reserved_tokens - (max_tokens or 0)
+
+        def on_finish(response: LLMResponse) -> None:
+            used_tokens = response.total_tokens
+            if used_tokens is None:
+                used_tokens = prompt_tokens + self.token_counter.count(
+                    response.response
+                )
+            self.rate_limiter.reconcile(reserved_tokens, used_tokens)
+
+        return on_finish
 
 
 @register_llm(provider="openai")
@@ -139,6 +414,12 @@ class OpenAILLM(BaseOpenAILLM):
         timeout: Timeout to use for the request
         stream: Stream to use for the request
         request_timeout: Request timeout to use for the request
+        rate_limiter: Enforces requests and tokens per minute budgets before requests are sent
+        retry_policy: Retries transient errors with backoff, within an optional deadline
+        transport: Pooled keep-alive HTTP sessions the requests are sent through. Defaults to a transport of the LLM.
+            Set to False to send the requests through the global sessions of the OpenAI SDK.
+        token_counter: Counts the tokens of prompts locally, before they are sent
+        context_window: The number of tokens the model accepts, when it is not a known OpenAI model
     """
 
     def __init__(
@@ -149,6 +430,11 @@ class OpenAILLM(BaseOpenAILLM):
         timeout: int = None,
         stream: bool = None,
         request_timeout: int = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        transport: Union[HTTPTransport, bool] = None,
+        token_counter: TokenCounter = None,
+        context_window: int = None,
     ):
         openai_token = openai_token or OPENAI_API_KEY
         model = model or OPENAI_MODEL
@@ -167,7 +453,18 @@ class OpenAILLM(BaseOpenAILLM):
                 "the model via the init interface."
             )
         super().__init__(
-            openai_token, "openai", model, headers, timeout, stream, request_timeout
+            openai_token,
+            "openai",
+            model,
+            headers,
+            timeout,
+            stream,
+            request_timeout,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            transport=transport,
+            token_counter=token_counter,
+            context_window=context_window,
         )
 
 
@@ -203,6 +500,12 @@ class AzureOpenAILLM(BaseOpenAILLM):
         timeout: Timeout to use for the request
         stream: Stream to use for the request
         request_timeout: Request timeout to use for the request
+        rate_limiter: Enforces the requests and tokens per minute budgets of the deployment
+        retry_policy: Retries transient errors with backoff, within an optional deadline
+        transport: Pooled keep-alive HTTP sessions the requests are sent through. Defaults to a transport of the LLM.
+            Set to False to send the requests through the global sessions of the OpenAI SDK.
+        token_counter: Counts the tokens of prompts locally, before they are sent
+        context_window: The number of tokens the deployed model accepts
     """
 
     provider = "azure-openai"
@@ -217,6 +520,11 @@ class AzureOpenAILLM(BaseOpenAILLM):
         timeout: int = None,
         stream: bool = None,
         request_timeout: int = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        transport: Union[HTTPTransport, bool] = None,
+        token_counter: TokenCounter = None,
+        context_window: int = None,
     ):
         model = model or DEPLOYMENT_NAME
         api_key = azure_openai_key or AZURE_OPENAI_KEY
@@ -231,43 +539,120 @@ class AzureOpenAILLM(BaseOpenAILLM):
             timeout,
             stream,
             request_timeout,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            transport=transport,
+            token_counter=token_counter,
+            context_window=context_window,
             engine=model,
             api_version=api_version,
             api_base=api_base,
         )
 
 
-def handle_streaming_response(api_response: OpenAIObject) -> Iterator[LLMResponse]:
+def _min_timeout(timeout: Optional[float], remaining_time: float) -> float:
+    if timeout:
+        return min(timeout, remaining_time)
+    return remaining_time
+
+
+def to_llm_response(res: OpenAIObject) -> LLMResponse:
     """
-    Accumulate chunk deltas into a full response. Returns the full message.
+    Converts a non-streaming ChatCompletion response into an LLMResponse.
     """
-    response = {"role": None, "response": "", "raw_response": ""}
+    return LLMResponse(
+        response=res.choices[0]["message"]["content"],
+        model=res.model,
+        prompt_tokens=res["usage"]["prompt_tokens"],
+        completion_tokens=res["usage"]["completion_tokens"],
+        total_tokens=res["usage"]["total_tokens"],
+        raw_response=res.to_dict_recursive(),
+    )
+
 
+def _to_delta(chunk: OpenAIObject) -> LLMDelta:
+    """
+    Converts a single streamed chunk into a delta, without copying the raw chunk.
+    """
+    choice = chunk.choices[0]
+    delta = choice["delta"]
+    return LLMDelta(
+        content=delta.get("content") or "",
+        role=delta.get("role"),
+        model=chunk.get("model"),
+        finish_reason=choice.get("finish_reason"),
+        usage=chunk.get("usage"),
+    )
+
+
+def _accumulate_chunk(buffer: DeltaBuffer, chunk: OpenAIObject) -> LLMResponse:
+    """
+    Merges a single streamed chunk into the buffer and returns the response up to this chunk.
+    """
+    buffer.add(_to_delta(chunk))
+    response = buffer.response
+    response.raw_response = chunk.to_dict_recursive()
+    return response
+
+
+def _iter_responses(
+    api_response: Iterator[OpenAIObject], on_finish: Optional[StreamFinalizer] = None
+) -> Iterator[LLMResponse]:
+    buffer = DeltaBuffer(on_finish)
     chunk: OpenAIObject
     for chunk in api_response:  # noqa
-        response["raw_response"] = chunk.to_dict_recursive()
-        delta = chunk.choices[0]["delta"]
-        response["model"] = chunk.model
-        if chunk.get("usage"):
-            response["prompt_tokens"] = chunk.usage.get("prompt_tokens")
-            response["completion_tokens"] = chunk.usage.get("completion_tokens")
-            response["total_tokens"] = chunk.usage.get("total_tokens")
-
-        if "role" in delta:
-            response["role"] = delta["role"]
-
-        if delta.get("function_call"):
-            fn_call = delta.get("function_call")
-            if "function_call" not in response["data"]:
-                response["data"]["function_call"] = {"name": None, "arguments": ""}
-            if "name" in fn_call:
-                response["data"]["function_call"]["name"] = fn_call.name
-            if "arguments" in fn_call:
-                response["data"]["function_call"]["arguments"] += (
-                    fn_call.arguments or ""
-                )
+        yield _accumulate_chunk(buffer, chunk)
+    buffer.finish()
 
-        if "content" in delta:
-            response["response"] += delta.content or ""
 
-        yield LLMResponse(**response)
+async def _aiter_responses(
+    api_response: AsyncIterator[OpenAIObject],
+    on_finish: Optional[StreamFinalizer] = None,
+) -> AsyncIterator[LLMResponse]:
+    buffer = DeltaBuffer(on_finish)
+    chunk: OpenAIObject
+    async for chunk in api_response:  # noqa
+        yield _accumulate_chunk(buffer, chunk)
+    buffer.finish()
+
+
+async def _aiter_deltas(
+    api_response: AsyncIterator[OpenAIObject],
+) -> AsyncIterator[LLMDelta]:
+    chunk: OpenAIObject
+    async for chunk in api_response:  # noqa
+        yield _to_delta(chunk)
+
+
+def handle_streaming_response(
+    api_response: Iterator[OpenAIObject],
+    deltas: bool = False,
+    on_finish: Optional[StreamFinalizer] = None,
+) -> Union[LLMStream, Iterator[LLMResponse]]:
+    """
+    Accumulate chunk deltas into a full response.
+    Args:
+        api_response: The streamed chunks of the OpenAI api
+        deltas: Whether to yield the delta of each chunk. The full response is then built once, when the stream is
+            exhausted. Otherwise, every chunk yields the response accumulated so far.
+        on_finish: Called with the full response once the stream is exhausted
+
+    Returns:
+        An `LLMStream` of deltas, or an iterator of the accumulated responses.
+    """
+    if deltas:
+        return LLMStream((_to_delta(chunk) for chunk in api_response), on_finish)
+    return _iter_responses(api_response, on_finish)
+
+
+def ahandle_streaming_response(
+    api_response: AsyncIterator[OpenAIObject],
+    deltas: bool = False,
+    on_finish: Optional[StreamFinalizer] = None,
+) -> Union[AsyncLLMStream, AsyncIterator[LLMResponse]]:
+    """
+    Asynchronous version of `handle_streaming_response`.
+    """
+    if deltas:
+        return AsyncLLMStream(_aiter_deltas(api_response), on_finish)
+    return _aiter_responses(api_response, on_finish)
@@ -8,6 +8,7 @@ from declarai.operators.message import Message, MessageRole
 from declarai.operators.operator import BaseOperator, CompiledTemplate
 from ..utils import can_be_jinja
 from declarai.operators.templates import (
+    CompactStructuredOutputInstructionPrompt,
     InstructFunctionTemplate,
     StructuredOutputInstructionPrompt,
     compile_output_prompt,
@@ -77,10 +78,9 @@ class OpenAITaskOperator(BaseOperator):
             )
             return ""
 
-        signature_return = self.parsed.signature_return
         return_name, return_doc = self.parsed.docstring_return
         return compile_output_prompt(
-            return_type=signature_return.str_schema,
+            return_type=self._return_str_schema(self.parsed),
             str_schema=return_name,
             return_docstring=return_doc,
             return_magic=self.parsed.magic.return_name,
@@ -98,7 +98,11 @@ class OpenAITaskOperator(BaseOperator):
 
         """
         instruction_template = InstructFunctionTemplate
-        structured_template = StructuredOutputInstructionPrompt
+        structured_template = (
+            CompactStructuredOutputInstructionPrompt
+            if self.compact_schema
+            else StructuredOutputInstructionPrompt
+        )
         output_schema = self._compile_output_prompt(structured_template)
 
         messages = []
@@ -0,0 +1,248 @@
+"""
+Pooled keep-alive HTTP transport for the OpenAI SDK.
+On its own, the OpenAI SDK opens a new HTTP session for every asynchronous request and recycles the blocking
+session of each thread every few minutes. A transport owns its sessions explicitly, so that every request of an LLM
+reuses the same pool of warm connections.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+import openai
+import requests
+from openai import api_requestor
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+"Default number of connections kept alive per host"
+
+_MISSING = object()
+
+
+class HTTPTransport:
+    """
+    Owns pooled keep-alive HTTP sessions that are shared by all the requests of an LLM.
+    A single transport may also be shared between several LLMs that talk to the same host.
+
+    The sessions are created on first use, and recreated on the next use after they were closed. An asynchronous
+    session is bound to the event loop it was created in. Sessions of event loops that were closed are closed when the
+    transport is next used asynchronously, and by `close` and `aclose`.
+
+    Args:
+        pool_size: The maximum number of connections kept alive per host
+        connect_timeout: Seconds to wait for a connection to be established
+        read_timeout: Seconds to wait for the server to respond. For asynchronous requests, this is the total
+            time of the request.
+        max_retries: The number of times a failed connection attempt is retried by the session
+        keepalive_timeout: Seconds an idle asynchronous connection is kept open
+
+    Attributes:
+        pool_size (int): The maximum number of connections kept alive per host
+        connect_timeout (float): Seconds to wait for a connection to be established
+        read_timeout (float): Seconds to wait for the server to respond
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        max_retries: int = api_requestor.MAX_CONNECTION_RETRIES,
+        keepalive_timeout: float = 15,
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[requests.Session] = None
+        self._async_sessions: Dict[
+            asyncio.AbstractEventLoop, aiohttp.ClientSession
+        ] = {}
+        self._lock = threading.Lock()
+        weakref.finalize(self, _close_async_sessions, self._async_sessions)
+
+    @property
+    def request_timeout(self) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """
+        The (connect, read) timeout of the requests, as accepted by the OpenAI SDK.
+        """
+        if self.connect_timeout is None and self.read_timeout is None:
+            return None
+        return self.connect_timeout, self.read_timeout
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The blocking session of the transport, created on first use.
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = self._make_session()
+            return self._session
+
+    def _make_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=self.max_retries,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if isinstance(openai.proxy, str):
+            session.proxies = {"http": openai.proxy, "https": openai.proxy}
+        elif isinstance(openai.proxy, dict):
+            session.proxies = openai.proxy.copy()
+        return session
+
+    def async_session(self) -> aiohttp.ClientSession:
+        """
+        The asynchronous session of the transport for the running event loop, created on first use.
+        aiohttp sessions are bound to the event loop they were created in, so each loop gets its own session.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._async_sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    limit_per_host=self.pool_size,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                session = aiohttp.ClientSession(connector=connector)
+                self._async_sessions[loop] = session
+            return session
+
+    def _pop_async_sessions(
+        self, include_loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> List[aiohttp.ClientSession]:
+        """
+        Removes the asynchronous sessions of the event loops that were closed, and of `include_loop`, to be closed by the
+        caller.
+        """
+        with self._lock:
+            loops = [
+                loop
+                for loop in self._async_sessions
+                if loop.is_closed() or loop is include_loop
+            ]
+            return [self._async_sessions.pop(loop) for loop in loops]
+
+    @contextmanager
+    def bind(self) -> Iterator[requests.Session]:
+        """
+        Routes the blocking requests of the OpenAI SDK made by the current thread through the transport.
+        The previous session of the thread is restored on exit.
+        """
+        context = api_requestor._thread_context
+        previous_session = getattr(context, "session", _MISSING)
+        previous_create_time = getattr(context, "session_create_time", _MISSING)
+        session = self.session
+        context.session = session
+        # Marks the session as fresh so the SDK does not close and replace it mid-request.
+        context.session_create_time = time.time()
+        try:
+            yield session
+        finally:
+            _restore(context, "session", previous_session)
+            _restore(context, "session_create_time", previous_create_time)
+
+    @asynccontextmanager
+    async def abind(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        Routes the asynchronous requests of the OpenAI SDK made by the current task through the transport.
+        """
+        for stale_session in self._pop_async_sessions():
+            _close_detached(stale_session)
+        session = self.async_session()
+        token = openai.aiosession.set(session)
+        try:
+            yield session
+        finally:
+            openai.aiosession.reset(token)
+
+    def _close_session(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def close(self) -> None:
+        """
+        Closes the blocking session of the transport, and the asynchronous sessions of event loops that are not running,
+        and releases their connections.
+        Sessions of event loops that are running can only be closed from within the loop, with `aclose`.
+        """
+        with self._lock:
+            self._close_session()
+            idle_loops = (
+                []
+                if _is_loop_running()
+                else [
+                    loop
+                    for loop in self._async_sessions
+                    if not loop.is_running() and not loop.is_closed()
+                ]
+            )
+            idle_sessions = [self._async_sessions.pop(loop) for loop in idle_loops]
+        for loop, session in zip(idle_loops, idle_sessions):
+            loop.run_until_complete(session.close())
+        for session in self._pop_async_sessions():
+            _close_detached(session)
+
+    async def aclose(self) -> None:
+        """
+        Closes all the sessions of the transport that can be closed from the running event loop: the blocking session,
+        the asynchronous session of the running loop, and the sessions of event loops that were closed.
+        """
+        with self._lock:
+            self._close_session()
+        for session in self._pop_async_sessions(asyncio.get_running_loop()):
+            await session.close()
+
+
+def _close_async_sessions(
+    async_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession]
+) -> None:
+    """
+    Closes the asynchronous sessions of the event loops that were closed, once the transport is garbage collected.
+    """
+    for loop, session in list(async_sessions.items()):
+        if loop.is_closed():
+            _close_detached(session)
+
+
+def _is_loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _close_detached(session: aiohttp.ClientSession) -> None:
+    """
+    Closes a session of an event loop that was closed.
+    The connections of the loop are already gone, so closing the session completes without waiting on any loop.
+    """
+    closing = session.close()
+    try:
+        closing.send(None)
+    except StopIteration:
+        pass
+    else:
+        closing.close()
+
+
+def _restore(context: threading.local, name: str, value) -> None:
+    if value is _MISSING:
+        if hasattr(context, name):
+            delattr(context, name)
+    else:
+        setattr(context, name, value)
@@ -2,16 +2,41 @@
 Operator is a class that is used to wrap the compilation of prompts and the singular execution of the LLM.
 """
 from abc import abstractmethod
-from typing import Any, Dict, Optional, TypeVar, Union, Iterator, List
+from functools import partial
 from logging import getLogger
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+from declarai.cache.base import BaseLLMCache, llm_cache_key
+from declarai.cache.single_flight import SingleFlight
 from declarai.operators import Message, MessageRole
-from declarai.operators.llm import LLM, LLMParamsType, LLMResponse
+from declarai.operators.llm import LLM, LLMDelta, LLMParamsType, LLMResponse
+from declarai.operators.routing import ModelLadder
 from declarai.operators.templates import (
-    compile_output_prompt,
+    CompactStructuredOutputChatPrompt,
     StructuredOutputChatPrompt,
+    compile_output_prompt,
+)
+from declarai.operators.tokens import (
+    ContextOverflow,
+    ContextWindowExceededError,
+    completion_tokens,
+    truncate_messages,
 )
-from declarai.operators.utils import format_prompt_msg
+from declarai.operators.utils import PreparedTemplate
 from declarai.python_parser.parser import PythonParser
+from declarai.python_parser.type_annotation_to_schema import (
+    type_annotation_to_compact_str_schema,
+)
 
 CompiledTemplate = TypeVar("CompiledTemplate")
 
@@ -26,11 +51,23 @@ class BaseOperator:
         parsed (PythonParser): The parsed object that is used to compile the prompts
         llm_params: The parameters to pass to the LLM
         streaming: Whether to use streaming or not
+        cache: A cache for the responses of the LLM. Streaming calls are never cached.
+        coalesce: Whether identical calls that are in flight at the same time should share a single call to the LLM.
+        compact_schema: Whether to describe the expected output in a compact, token efficient format.
+        context_overflow: What to do with prompts that do not fit the context window of the LLM, "raise" a
+            `ContextWindowExceededError` before the request is sent, or "truncate" the prompt to fit.
+        model_ladder: Routes every call to the first model of the ladder whose context window fits the prompt.
+            A list of model names is turned into a `ModelLadder`.
         kwargs: Enables passing of additional parameters to the operator
     Attributes:
         llm (LLM): The LLM to use for the operator
         parsed (PythonParser): The parsed object that is used to compile the prompts
         llm_params (LLMParamsType): The parameters that were passed during initialization of the operator
+        cache (BaseLLMCache): The cache for the responses of the LLM
+        single_flight (SingleFlight): Coalesces identical in flight calls when `coalesce` is enabled
+        compact_schema (bool): Whether the expected output is described in a compact format
+        context_overflow (str): What to do with prompts that do not fit the context window of the LLM
+        model_ladder (ModelLadder): The models calls are routed between, if any
 
     Methods:
         compile: Compiles the prompts using the parsed object and returns the compiled prompts
@@ -45,12 +82,25 @@ class BaseOperator:
         parsed: PythonParser,
         llm_params: LLMParamsType = None,
         streaming: bool = None,
+        cache: Optional[BaseLLMCache] = None,
+        coalesce: bool = False,
+        compact_schema: bool = False,
+        context_overflow: ContextOverflow = "raise",
+        model_ladder: Union[ModelLadder, Sequence[str], None] = None,
         **kwargs: Dict,
     ):
         self.llm = llm
         self.parsed = parsed
         self.llm_params = llm_params or {}
         self._call_streaming = streaming
+        self.cache = cache
+        self.single_flight = SingleFlight() if coalesce else None
+        self.compact_schema = compact_schema
+        self.context_overflow = context_overflow
+        if model_ladder is not None and not isinstance(model_ladder, ModelLadder):
+            model_ladder = ModelLadder(model_ladder)
+        self.model_ladder = model_ladder
+        self._prepared_template: Optional[PreparedTemplate] = None
 
     @property
     def streaming(self) -> bool:
@@ -71,9 +121,30 @@ class BaseOperator:
     def compile_template(self) -> CompiledTemplate:
         ...
 
+    def prepare_template(self) -> PreparedTemplate:
+        """
+        Returns the result of `compile_template`, pre-parsed once and reused by every call to `compile`.
+        Returns:
+            PreparedTemplate: The cached template
+        """
+        if self._prepared_template is None:
+            template = self.compile_template()
+            if isinstance(template, Message):
+                template = [template]
+            self._prepared_template = PreparedTemplate(template)
+        return self._prepared_template
+
+    def reset_template(self) -> None:
+        """
+        Drops the cached template, so it is compiled again on the next call to `compile`.
+        Should be called whenever an attribute that is used by `compile_template` changes.
+        """
+        self._prepared_template = None
+
     def compile(self, **kwargs) -> CompiledTemplate:
         """
         Implements the compile method of the BaseOperator class.
+        The template is compiled once and cached, only the placeholders are populated on every call.
         Args:
             **kwargs:
 
@@ -81,12 +152,67 @@ class BaseOperator:
             Dict[str, List[Message]]: A dictionary containing a list of messages.
 
         """
-        template = self.compile_template()
-        if kwargs:
-            template[-1].message = format_prompt_msg(
-                _string=template[-1].message, **kwargs
+        return {"messages": self.prepare_template().populate(**kwargs)}
+
+    def _runtime_llm_params(
+        self, llm_params: Optional[LLMParamsType] = None
+    ) -> LLMParamsType:
+        """
+        Resolves the llm params for a single execution.
+        Params provided during execution override the ones provided during initialization.
+        """
+        # Order is important - runtime params take precedence. The params are copied, so that the operator's own
+        # params and the caller's params are never mutated by concurrent executions.
+        llm_params = dict(llm_params or self.llm_params)
+        if self.streaming is not None:
+            llm_params["stream"] = self.streaming  # streaming should be the last param
+        return llm_params
+
+    def _fit_context_window(
+        self, compiled: CompiledTemplate, llm_params: LLMParamsType
+    ) -> CompiledTemplate:
+        """
+        Counts the tokens of the prompt before it is sent, and makes sure the prompt and the completion fit the context
+        window of the LLM. When a model ladder is set, the call is first routed to the smallest model that fits it.
+        The prompt is truncated or rejected according to `context_overflow`, and a requested `max_tokens` is lowered to
+        the number of tokens that are left for the completion.
+        Does nothing when the context window of the LLM is unknown.
+        """
+        context_window = getattr(self.llm, "context_window", None)
+        if "messages" not in compiled or (
+            self.model_ladder is None and not isinstance(context_window, int)
+        ):
+            return compiled
+
+        messages = compiled["messages"]
+        prompt_tokens = self.llm.count_tokens(messages)
+        max_tokens = llm_params.get("max_tokens")
+        if self.model_ladder is not None:
+            llm_params["model"], context_window = self.model_ladder.select(
+                self.llm, prompt_tokens, max_tokens
             )
-        return {"messages": template}
+            if context_window is None:
+                return compiled
+        reserved = max_tokens or 1
+        if prompt_tokens + reserved > context_window:
+            if self.context_overflow == "truncate" and reserved < context_window:
+                messages = truncate_messages(
+                    messages, self.llm.token_counter, context_window - reserved
+                )
+                compiled = {**compiled, "messages": messages}
+                prompt_tokens = self.llm.count_tokens(messages)
+                logger.warning(
+                    "The prompt was truncated to %s tokens to fit the context window of %s tokens",
+                    prompt_tokens,
+                    context_window,
+                )
+            elif prompt_tokens >= context_window:
+                raise ContextWindowExceededError(prompt_tokens, context_window)
+
+        max_tokens = completion_tokens(prompt_tokens, context_window, max_tokens)
+        if max_tokens is not None:
+            llm_params["max_tokens"] = max_tokens
+        return compiled
 
     # Should add validate that llm params are valid part of the llm (attach llmparams on base operator?)
     def predict(
@@ -102,11 +228,113 @@ class BaseOperator:
         Returns:
             The response from the LLM
         """
-        llm_params = llm_params or self.llm_params  # Order is important -
-        if self.streaming is not None:
-            llm_params["stream"] = self.streaming  # streaming should be the last param
-        # provided params during execution should override the ones provided during initialization
-        return self.llm.predict(**self.compile(**kwargs), **llm_params)
+        return self.predict_compiled(self.compile(**kwargs), llm_params=llm_params)
+
+    def predict_compiled(
+        self,
+        compiled: CompiledTemplate,
+        *,
+        llm_params: Optional[LLMParamsType] = None,
+    ) -> Union[LLMResponse, Iterator[LLMResponse]]:
+        """
+        Executes the LLM with an already compiled template.
+        Useful when the prompt was compiled ahead of time, so it is not compiled again for the execution.
+        Args:
+            compiled: The output of the `compile` method.
+            llm_params: The parameters that are passed during runtime. If provided, they will override the ones provided during initialization.
+
+        Returns:
+            The response from the LLM
+        """
+        llm_params = self._runtime_llm_params(llm_params)
+        compiled = self._fit_context_window(compiled, llm_params)
+        if not self._is_keyed(llm_params):
+            return self.llm.predict(**compiled, **llm_params)
+
+        cache_key = llm_cache_key(self.llm, compiled, llm_params)
+        predict = partial(self._predict_cached, cache_key, compiled, llm_params)
+        if self.single_flight is not None:
+            return self.single_flight.do(cache_key, predict)
+        return predict()
+
+    async def apredict(
+        self, *, llm_params: Optional[LLMParamsType] = None, **kwargs: object
+    ) -> Union[LLMResponse, AsyncIterator[LLMResponse]]:
+        """
+        Executes prediction using the LLM without blocking the running event loop.
+        Same as `predict`, but awaits the `apredict` method of the LLM.
+        Args:
+            llm_params: The parameters that are passed during runtime. If provided, they will override the ones provided during initialization.
+            **kwargs: The keyword arguments to pass to the `compile` method. Used to format the prompts placeholders.
+
+        Returns:
+            The response from the LLM
+        """
+        return await self.apredict_compiled(
+            self.compile(**kwargs), llm_params=llm_params
+        )
+
+    async def apredict_compiled(
+        self,
+        compiled: CompiledTemplate,
+        *,
+        llm_params: Optional[LLMParamsType] = None,
+    ) -> Union[LLMResponse, AsyncIterator[LLMResponse]]:
+        """
+        Asynchronous version of `predict_compiled`.
+        Args:
+            compiled: The output of the `compile` method.
+            llm_params: The parameters that are passed during runtime. If provided, they will override the ones provided during initialization.
+
+        Returns:
+            The response from the LLM
+        """
+        llm_params = self._runtime_llm_params(llm_params)
+        compiled = self._fit_context_window(compiled, llm_params)
+        if not self._is_keyed(llm_params):
+            return await self.llm.apredict(**compiled, **llm_params)
+
+        cache_key = llm_cache_key(self.llm, compiled, llm_params)
+        apredict = partial(self._apredict_cached, cache_key, compiled, llm_params)
+        if self.single_flight is not None:
+            return await self.single_flight.ado(cache_key, apredict)
+        return await apredict()
+
+    def _is_keyed(self, llm_params: LLMParamsType) -> bool:
+        """
+        Whether the call should be identified by a key, for caching or coalescing. Streaming calls never are.
+        """
+        has_keyed_features = self.cache is not None or self.single_flight is not None
+        return has_keyed_features and not llm_params.get("stream")
+
+    def _predict_cached(
+        self, cache_key: str, compiled: CompiledTemplate, llm_params: LLMParamsType
+    ) -> LLMResponse:
+        llm_response = self.cache.get(cache_key) if self.cache is not None else None
+        if llm_response is None:
+            llm_response = self.llm.predict(**compiled, **llm_params)
+            if self.cache is not None:
+                self.cache.set(cache_key, llm_response)
+        return llm_response
+
+    async def _apredict_cached(
+        self, cache_key: str, compiled: CompiledTemplate, llm_params: LLMParamsType
+    ) -> LLMResponse:
+        llm_response = self.cache.get(cache_key) if self.cache is not None else None
+        if llm_response is None:
+            llm_response = await self.llm.apredict(**compiled, **llm_params)
+            if self.cache is not None:
+                self.cache.set(cache_key, llm_response)
+        return llm_response
+
+    def _return_str_schema(self, parsed: PythonParser) -> Optional[str]:
+        """
+        The schema of the return type of the parsed function, in the format selected by `compact_schema`.
+        """
+        signature_return = parsed.signature_return
+        if self.compact_schema and signature_return.type_ is not None:
+            return type_annotation_to_compact_str_schema(signature_return.type_)
+        return signature_return.str_schema
 
     def parse_output(self, output: str) -> Any:
         """
@@ -119,6 +347,53 @@ class BaseOperator:
         """
         return self.parsed.parse(output)
 
+    def parse_output_stream(
+        self, stream: Iterator[Union[LLMResponse, LLMDelta]], items: bool = False
+    ) -> Iterator[Any]:
+        """
+        Parses the streamed output from the LLM while it arrives.
+        Args:
+            stream: the streamed llm output, either accumulated responses or deltas
+            items: whether to yield each element of a list return type as soon as it is closed
+
+        Returns:
+            An iterator of the progressively populated output, ending with the fully parsed output.
+            When `items` is set, an iterator of the parsed elements.
+        """
+        output_parser = self.parsed.stream_parser(items=items)
+        received = 0
+        for chunk in stream:
+            text = _chunk_text(chunk, received)
+            received += len(text)
+            yield from output_parser.feed(text)
+        yield from output_parser.close()
+
+    async def aparse_output_stream(
+        self, stream: AsyncIterator[Union[LLMResponse, LLMDelta]], items: bool = False
+    ) -> AsyncIterator[Any]:
+        """
+        Asynchronous version of `parse_output_stream`.
+        """
+        output_parser = self.parsed.stream_parser(items=items)
+        received = 0
+        async for chunk in stream:
+            text = _chunk_text(chunk, received)
+            received += len(text)
+            for parsed in output_parser.feed(text):
+                yield parsed
+        for parsed in output_parser.close():
+            yield parsed
+
+
+def _chunk_text(chunk: Union[LLMResponse, LLMDelta], received: int) -> str:
+    """
+    Returns the text that was added by a streamed chunk.
+    Deltas hold it directly, accumulated responses hold all the text that was received so far.
+    """
+    if isinstance(chunk, LLMDelta):
+        return chunk.content
+    return chunk.response[received:]
+
 
 class BaseChatOperator(BaseOperator):
     """
@@ -146,7 +421,7 @@ class BaseChatOperator(BaseOperator):
         **kwargs,
     ):
         super().__init__(parsed=parsed, streaming=streaming, **kwargs)
-        self.system = system or self.parsed.docstring_freeform
+        self._system = system or self.parsed.docstring_freeform
         self.greeting = greeting or getattr(self.parsed.decorated, "greeting", None)
         self.parsed_send_func = (
             PythonParser(self.parsed.decorated.send)
@@ -154,6 +429,18 @@ class BaseChatOperator(BaseOperator):
             else None
         )
 
+    @property
+    def system(self) -> str:
+        """
+        The system message that is used for the chat.
+        """
+        return self._system
+
+    @system.setter
+    def system(self, system: str) -> None:
+        self._system = system
+        self.reset_template()
+
     def _compile_output_prompt(self, template) -> str:
         if not self.parsed_send_func.has_any_return_defs:
             logger.warning(
@@ -164,10 +451,9 @@ class BaseChatOperator(BaseOperator):
             )
             return ""
 
-        signature_return = self.parsed_send_func.signature_return
         return_name, return_doc = self.parsed_send_func.docstring_return
         return compile_output_prompt(
-            return_type=signature_return.str_schema,
+            return_type=self._return_str_schema(self.parsed_send_func),
             str_schema=return_name,
             return_docstring=return_doc,
             return_magic=self.parsed_send_func.magic.return_name,
@@ -180,7 +466,11 @@ class BaseChatOperator(BaseOperator):
         Compiles the system prompt.
         Returns: The compiled system message
         """
-        structured_template = StructuredOutputChatPrompt
+        structured_template = (
+            CompactStructuredOutputChatPrompt
+            if self.compact_schema
+            else StructuredOutputChatPrompt
+        )
         if self.parsed_send_func:
             output_schema = self._compile_output_prompt(structured_template)
         else:
@@ -193,5 +483,4 @@ class BaseChatOperator(BaseOperator):
         return Message(message=compiled_system_prompt, role=MessageRole.system)
 
     def compile(self, messages: List[Message], **kwargs) -> CompiledTemplate:
-        system_message = self.compile_template()
-        return dict(messages=[system_message] + messages)
+        return dict(messages=self.prepare_template().messages + messages)
@@ -0,0 +1,137 @@
+"""
+Client side rate limiting for LLMs.
+Enforces requests-per-minute and tokens-per-minute budgets before the requests are sent, instead of discovering the
+limits through rate limit errors returned by the provider.
+"""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A token bucket that is refilled continuously up to its capacity.
+
+    Args:
+        capacity: the maximum amount the bucket holds, which is also the amount refilled every minute.
+    """
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.refill_per_second = capacity / 60
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self._updated_at) * self.refill_per_second,
+        )
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Returns the number of seconds until the amount is available.
+        Amounts above the capacity only wait for a full bucket, and leave the bucket in debt once consumed.
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing, 0) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """
+        Returns the amount to the bucket. A negative amount consumes it instead.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Enforces requests-per-minute and tokens-per-minute budgets for an LLM.
+    The tokens of a request are estimated before it is sent, and reconciled with the actual usage reported by the LLM
+    once the response arrives.
+    A single rate limiter can be shared between multiple LLM instances that use the same quota.
+
+    Args:
+        requests_per_minute: the maximum number of requests to send every minute
+        tokens_per_minute: the maximum number of tokens (prompt and completion) to use every minute
+
+    Example:
+        ```py
+        gpt_35 = declarai.openai(
+            model="gpt-3.5-turbo",
+            rate_limiter=RateLimiter(requests_per_minute=3500, tokens_per_minute=90000),
+        )
+        ```
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Reserves the budget for a single request if it is available.
+        Returns the number of seconds to wait before trying again, or 0 if the budget was reserved.
+        """
+        with self._lock:
+            wait = max(
+                self._requests.wait_time(1) if self._requests else 0,
+                self._tokens.wait_time(tokens) if self._tokens else 0,
+            )
+            if wait <= 0:
+                if self._requests:
+                    self._requests.consume(1)
+                if self._tokens:
+                    self._tokens.consume(tokens)
+            return wait
+
+    def acquire(self, tokens: int = 0) -> int:
+        """
+        Blocks until the budget for a request with the given number of tokens is available, and reserves it.
+        Args:
+            tokens: the estimated number of tokens of the request
+
+        Returns:
+            The number of tokens that were reserved, to be passed to `reconcile`
+        """
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return tokens
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> int:
+        """
+        Asynchronous version of `acquire`. Waits without blocking the running event loop.
+        """
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return tokens
+            await asyncio.sleep(wait)
+
+    def reconcile(self, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """
+        Corrects the token budget once the actual usage of a request is known.
+        Args:
+            reserved_tokens: the number of tokens that were reserved by `acquire`
+            used_tokens: the number of tokens reported by the LLM. If unknown, the reservation is kept.
+        """
+        if self._tokens is None or used_tokens is None:
+            return
+        with self._lock:
+            self._tokens.adjust(reserved_tokens - used_tokens)
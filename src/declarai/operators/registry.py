@@ -1,12 +1,28 @@
 """
 Registry for LLMs and Operators.
 """
+import importlib
 from collections import defaultdict
 from typing import Type, Optional
 
 from declarai.operators.llm import LLM
 from declarai.operators.operator import BaseOperator
 
+_PROVIDER_MODULES = {
+    "openai": "declarai.operators.openai_operators",
+    "azure-openai": "declarai.operators.openai_operators",
+}
+"""The modules that register the built-in providers, imported when a provider is first resolved."""
+
+
+def _load_provider(provider: str) -> None:
+    """
+    Imports the module of a built-in provider, which registers its LLMs and operators.
+    """
+    module_name = _PROVIDER_MODULES.get(provider)
+    if module_name:
+        importlib.import_module(module_name)
+
 
 class LLMRegistry:
     """
@@ -48,6 +64,8 @@ class LLMRegistry:
         """
         if not model:
             model = "default"
+        if provider not in self._registry:
+            _load_provider(provider)
         provider_registry = self._registry.get(provider, {})
 
         llm_cls = provider_registry.get(model)
@@ -124,6 +142,8 @@ class OperatorRegistry:
         """
         default_model = "default"
         provider = llm_instance.provider
+        if provider not in self._registry:
+            _load_provider(provider)
         operator_registry = self._registry.get(provider, {})
 
         specific_operator_registry = operator_registry.get(operator_type, {})
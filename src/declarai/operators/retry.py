@@ -0,0 +1,171 @@
+"""
+Retry policy for LLM calls.
+Retries transient failures (rate limits, server errors, timeouts) with exponential backoff and jitter, while respecting
+an overall deadline for the call.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger("RetryPolicy")
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+"HTTP status codes of errors that are considered transient"
+
+
+class RetryPolicy:
+    """
+    Defines which errors are retried and how long to wait between the attempts.
+
+    Args:
+        max_attempts: the maximum number of attempts, including the first one.
+        retry_on: error classes that are always retried.
+        retry_on_status: errors that carry one of these HTTP status codes (`http_status` attribute) are retried.
+        initial_backoff: the number of seconds to wait before the first retry.
+        max_backoff: the maximum number of seconds of the computed backoff. A longer `Retry-After` sent by the server is
+         still honored.
+        multiplier: the factor the backoff grows by after every attempt.
+        jitter: whether to randomize the backoff, so that many clients do not retry at the same moment.
+        deadline: the maximum number of seconds the call may take, including all the attempts and waits.
+         The remaining time is passed to every attempt, so it can be used as the request timeout.
+
+    Example:
+        ```py
+        gpt_35 = declarai.openai(
+            model="gpt-3.5-turbo",
+            retry_policy=RetryPolicy(max_attempts=5, deadline=60),
+        )
+        ```
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        retry_on_status: Tuple[int, ...] = RETRYABLE_STATUS_CODES,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30,
+        multiplier: float = 2,
+        jitter: bool = True,
+        deadline: Optional[float] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.retry_on = retry_on
+        self.retry_on_status = retry_on_status
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def is_retryable(
+        self, error: BaseException, retry_on: Tuple[Type[BaseException], ...] = ()
+    ) -> bool:
+        """
+        Returns whether the error is transient and the call should be retried.
+        Args:
+            error: the error raised by the attempt
+            retry_on: additional error classes to retry, usually the transient errors of the LLM provider.
+        """
+        retry_on = self.retry_on + tuple(retry_on)
+        if retry_on and isinstance(error, retry_on):
+            return True
+        return getattr(error, "http_status", None) in self.retry_on_status
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Returns the number of seconds to wait after the given failed attempt (starting from 1).
+        A `Retry-After` header sent with the error is the lower bound of the wait, so the call is never retried before
+        the server allows it.
+        """
+        delay = min(
+            self.initial_backoff * self.multiplier ** (attempt - 1), self.max_backoff
+        )
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(retry_after, delay)
+        return delay
+
+    def _next_delay(
+        self,
+        attempt: int,
+        error: BaseException,
+        expires_at: Optional[float],
+        retry_on: Tuple[Type[BaseException], ...],
+    ) -> float:
+        """
+        Returns the delay before the next attempt, or raises the error if it should not be retried.
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error, retry_on):
+            raise error
+        delay = self.backoff(attempt, error)
+        if expires_at is not None and time.monotonic() + delay >= expires_at:
+            raise error
+        logger.warning(
+            "Attempt %s/%s failed with %r, retrying in %.2f seconds",
+            attempt,
+            self.max_attempts,
+            error,
+            delay,
+        )
+        return delay
+
+    def _remaining(self, expires_at: Optional[float]) -> Optional[float]:
+        return None if expires_at is None else max(expires_at - time.monotonic(), 0)
+
+    def call(
+        self,
+        func: Callable[[Optional[float]], T],
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ) -> T:
+        """
+        Executes the function, retrying it according to the policy.
+        Args:
+            func: the call to execute. Receives the number of seconds left until the deadline, or None.
+            retry_on: additional error classes to retry, usually the transient errors of the LLM provider.
+
+        Returns:
+            The result of the first successful attempt
+        """
+        expires_at = time.monotonic() + self.deadline if self.deadline else None
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(self._remaining(expires_at))
+            except Exception as e:  # noqa
+                delay = self._next_delay(attempt, e, expires_at, retry_on)
+            time.sleep(delay)
+
+    async def acall(
+        self,
+        func: Callable[[Optional[float]], Awaitable[T]],
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ) -> T:
+        """
+        Asynchronous version of `call`. Waits between the attempts without blocking the running event loop.
+        """
+        expires_at = time.monotonic() + self.deadline if self.deadline else None
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func(self._remaining(expires_at))
+            except Exception as e:  # noqa
+                delay = self._next_delay(attempt, e, expires_at, retry_on)
+            await asyncio.sleep(delay)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
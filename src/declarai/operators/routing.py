@@ -0,0 +1,77 @@
+"""
+Routing of calls between the models of a provider by the size of their prompt.
+Small models are usually cheaper and faster, so every call is sent to the smallest model whose context window fits it,
+instead of pinning all the calls to the model with the largest context window.
+"""
+import logging
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from declarai.operators.llm import BaseLLM
+
+logger = logging.getLogger("ModelLadder")
+
+EXPECTED_OUTPUT_TOKENS = 500
+"The number of completion tokens that are reserved when choosing a model, when `max_tokens` is not set"
+
+
+class ModelLadder:
+    """
+    An ordered list of models of the same provider, from the cheapest to the most capable.
+    Every call is routed to the first model whose context window fits the prompt and the expected output.
+    Calls that fit none of the models are routed to the last one.
+
+    Args:
+        models: the models to choose from, the cheapest first
+        expected_output_tokens: the number of completion tokens to reserve when `max_tokens` is not set
+        context_windows: the context windows of models that are unknown to the LLM, e.g. Azure deployments
+
+    Example:
+        ```py
+        @gpt_35.task(model_ladder=["gpt-3.5-turbo", "gpt-3.5-turbo-16k"])
+        def summarize(text: str) -> str:
+            ...
+        ```
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        expected_output_tokens: int = EXPECTED_OUTPUT_TOKENS,
+        context_windows: Optional[Dict[str, int]] = None,
+    ):
+        if not models:
+            raise ValueError("A model ladder requires at least one model")
+        self.models = list(models)
+        self.expected_output_tokens = expected_output_tokens
+        self.context_windows = context_windows or {}
+
+    def context_window(self, llm: "BaseLLM", model: str) -> Optional[int]:
+        """
+        Returns the context window of a model, or None if it is unknown.
+        """
+        return self.context_windows.get(model) or llm.model_context_window(model)
+
+    def select(
+        self, llm: "BaseLLM", prompt_tokens: int, max_tokens: Optional[int] = None
+    ) -> Tuple[str, Optional[int]]:
+        """
+        Chooses the model for a single call.
+        Args:
+            llm: the LLM that executes the call
+            prompt_tokens: the number of tokens of the prompt
+            max_tokens: the requested number of completion tokens, if any
+
+        Returns:
+            The chosen model and its context window
+        """
+        required_tokens = prompt_tokens + (max_tokens or self.expected_output_tokens)
+        for model in self.models:
+            context_window = self.context_window(llm, model)
+            if context_window is not None and required_tokens <= context_window:
+                logger.debug(
+                    "Routing a call of %s tokens to %s", required_tokens, model
+                )
+                return model, context_window
+        model = self.models[-1]
+        return model, self.context_window(llm, model)
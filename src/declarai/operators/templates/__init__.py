@@ -5,6 +5,8 @@ from .chain_of_thought import ChainOfThoughtsTemplate
 from .instruct_function import InstructFunctionTemplate
 from .output_prompt import compile_output_prompt, compile_output_schema_template
 from .output_structure import (
+    CompactStructuredOutputChatPrompt,
+    CompactStructuredOutputInstructionPrompt,
     StructuredOutputChatPrompt,
     StructuredOutputInstructionPrompt,
 )
@@ -11,3 +11,12 @@ The expected format is:
 StructuredOutputChatPrompt = """Your responses should be a JSON structure with a single key named '{return_name}', nothing else. The expected format is: {output_schema}"""  # noqa
 
 "."  # for documentation purposes
+
+
+CompactStructuredOutputInstructionPrompt = """Answer only with JSON with the single key '{return_name}':
+{output_schema}"""
+"."  # for documentation purposes
+
+
+CompactStructuredOutputChatPrompt = """Answer only with JSON with the single key '{return_name}': {output_schema}"""  # noqa
+"."  # for documentation purposes
@@ -0,0 +1,252 @@
+"""
+Local token counting for LLMs.
+Counting the tokens of a prompt before it is sent allows rejecting or truncating prompts that do not fit the context
+window of the model, and requesting a completion that fits what is left of it, without a round trip to the provider.
+"""
+import base64
+import re
+from abc import abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional, Pattern, Union
+
+from declarai.operators.message import Message, MessageRole
+
+CHARS_PER_TOKEN = 4
+"A rough estimation of the number of characters in a single token for english text"
+TOKENS_PER_MESSAGE = 4
+"The number of tokens the chat format adds for every message"
+
+BPE_SPLIT_PATTERN = (
+    r"'(?:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+"
+    r"|\s+(?!\S)|\s+"
+)
+"""
+The pattern that splits text into the pieces that are encoded separately.
+An approximation of the pattern of the `cl100k_base` encoding that only uses the features of the `re` module.
+"""
+
+ContextOverflow = Literal["raise", "truncate"]
+"What to do with a prompt that does not fit the context window of the model"
+
+
+class ContextWindowExceededError(ValueError):
+    """
+    Raised before a request is sent, when its prompt does not fit the context window of the model.
+
+    Attributes:
+        prompt_tokens (int): The number of tokens of the prompt
+        context_window (int): The number of tokens the model accepts
+    """
+
+    def __init__(self, prompt_tokens: int, context_window: int):
+        super().__init__(
+            f"The prompt has {prompt_tokens} tokens, which leaves no room for a completion "
+            f"in the context window of {context_window} tokens"
+        )
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+
+
+class TokenCounter:
+    """
+    The base class of token counters.
+    Subclasses implement `count`, the overhead of the chat format is added by `count_messages`.
+
+    Attributes:
+        tokens_per_message (int): The number of tokens the chat format adds for every message
+    """
+
+    tokens_per_message = TOKENS_PER_MESSAGE
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """
+        Counts the tokens of a text.
+        Args:
+            text: the text to count
+
+        Returns:
+            The number of tokens of the text
+        """
+        raise NotImplementedError()
+
+    def count_messages(self, messages: List[Message]) -> int:
+        """
+        Counts the tokens of the messages of a prompt, including the overhead of the chat format.
+        Args:
+            messages: the messages that are sent to the LLM
+
+        Returns:
+            The number of prompt tokens
+        """
+        return sum(
+            self.count(message.message) + self.tokens_per_message
+            for message in messages
+        )
+
+
+class CharacterTokenCounter(TokenCounter):
+    """
+    Estimates the number of tokens from the number of characters of the text.
+    Fast and dependency free, but only accurate for english text. This is the default token counter of LLMs.
+
+    Args:
+        chars_per_token: the average number of characters in a single token
+    """
+
+    def __init__(self, chars_per_token: int = CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return len(text) // self.chars_per_token
+
+
+class BPETokenCounter(TokenCounter):
+    """
+    Counts tokens by encoding the text with byte pair encoding tables, entirely offline.
+    The tables are the mergeable ranks of the encoding of the model, e.g. the `cl100k_base.tiktoken` file that is used by
+    the gpt-3.5 and gpt-4 models.
+
+    Args:
+        mergeable_ranks: The rank of every token, as bytes
+        pattern: The pattern that splits the text into pieces before they are encoded
+        cache_size: The number of distinct pieces whose counts are kept in memory
+
+    Example:
+        ```py
+        token_counter = BPETokenCounter.from_file("cl100k_base.tiktoken")
+        gpt_35 = declarai.openai(model="gpt-3.5-turbo", token_counter=token_counter)
+        ```
+    """
+
+    def __init__(
+        self,
+        mergeable_ranks: Dict[bytes, int],
+        pattern: Union[str, Pattern] = BPE_SPLIT_PATTERN,
+        cache_size: int = 4096,
+    ):
+        self.mergeable_ranks = mergeable_ranks
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self._count_piece = lru_cache(maxsize=cache_size)(self._encode_length)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "BPETokenCounter":
+        """
+        Loads the mergeable ranks from a file in the tiktoken format, a base64 encoded token and its rank on every line.
+        Args:
+            path: the path of the file
+            **kwargs: passed to the token counter
+
+        Returns:
+            The token counter
+        """
+        mergeable_ranks = {}
+        with open(path, "rb") as ranks_file:
+            for line in ranks_file:
+                if line.strip():
+                    token, rank = line.split()
+                    mergeable_ranks[base64.b64decode(token)] = int(rank)
+        return cls(mergeable_ranks, **kwargs)
+
+    def count(self, text: str) -> int:
+        return sum(
+            self._count_piece(piece.encode("utf-8"))
+            for piece in self.pattern.findall(text)
+        )
+
+    def _encode_length(self, piece: bytes) -> int:
+        """
+        Merges the bytes of the piece, lowest rank first, and returns the number of resulting tokens.
+        """
+        ranks = self.mergeable_ranks
+        if piece in ranks:
+            return 1
+        parts = [bytes((byte,)) for byte in piece]
+        while len(parts) > 1:
+            min_rank = None
+            min_index = None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (min_rank is None or rank < min_rank):
+                    min_rank = rank
+                    min_index = i
+            if min_index is None:
+                break
+            parts[min_index] += parts.pop(min_index + 1)
+        return len(parts)
+
+
+def completion_tokens(
+    prompt_tokens: int, context_window: int, max_tokens: Optional[int] = None
+) -> Optional[int]:
+    """
+    The number of completion tokens to request, so that the prompt and the completion fit the context window.
+    The prompt tokens are an estimation, so when no maximum is requested, none is set and the provider limits the
+    completion to what is actually left of the context window.
+    Args:
+        prompt_tokens: the number of tokens of the prompt
+        context_window: the number of tokens the model accepts
+        max_tokens: the requested number of completion tokens, if any
+
+    Returns:
+        The requested number of completion tokens, limited to the room that is left in the context window, or None if
+        no maximum was requested
+    Raises:
+        ContextWindowExceededError: If there is no room left for a completion
+    """
+    available = context_window - prompt_tokens
+    if available <= 0:
+        raise ContextWindowExceededError(prompt_tokens, context_window)
+    if max_tokens is None:
+        return None
+    return min(max_tokens, available)
+
+
+def truncate_messages(
+    messages: List[Message], token_counter: TokenCounter, limit: int
+) -> List[Message]:
+    """
+    Truncates the messages of a prompt so that they fit the given number of tokens.
+    The oldest messages that are not system messages are dropped first, the last message is always kept and is cut
+    short if it still does not fit.
+    Args:
+        messages: the messages of the prompt
+        token_counter: counts the tokens of the messages
+        limit: the maximum number of prompt tokens
+
+    Returns:
+        The truncated messages
+    Raises:
+        ContextWindowExceededError: If the messages can not be truncated to fit, e.g. when the system messages alone
+            do not fit
+    """
+    messages = list(messages)
+    counts = [token_counter.count_messages([message]) for message in messages]
+    total = sum(counts)
+    index = 0
+    while total > limit and index < len(messages) - 1:
+        if messages[index].role == MessageRole.system:
+            index += 1
+            continue
+        total -= counts.pop(index)
+        del messages[index]
+
+    if total > limit and messages:
+        last = messages[-1]
+        text = last.message
+        excess = total - limit
+        while excess > 0 and text:
+            last_tokens = max(counts[-1] - token_counter.tokens_per_message, 1)
+            cut = max(len(text) * excess // last_tokens, 1)
+            text = text[: len(text) - cut]
+            tokens = token_counter.count_messages(
+                [Message(message=text, role=last.role)]
+            )
+            excess -= counts[-1] - tokens
+            counts[-1] = tokens
+        messages[-1] = Message(message=text, role=last.role)
+        total = limit + excess
+
+    if total > limit:
+        raise ContextWindowExceededError(total, limit)
+    return messages
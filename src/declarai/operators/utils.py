@@ -1,18 +1,31 @@
-import jinja2
+from typing import TYPE_CHECKING, List, Optional, Sequence
 
+from declarai.operators.message import Message
 
-def can_be_jinja(string: str) -> bool:
+if TYPE_CHECKING:
+    import jinja2
+
+
+def _compile_jinja(string: str) -> Optional["jinja2.Template"]:
     """
-    Checks if a string can be compiled using the jinja2 template engine.
+    Compiles a string into a jinja2 template if it contains jinja syntax, otherwise returns None.
+    jinja2 is only imported once a string with jinja syntax is found.
     """
     if "{{" in string or "{%" in string or "{#" in string:
+        import jinja2  # pylint: disable=C0415
+
         try:
-            jinja2.Template(string)
-            return True
+            return jinja2.Template(string)
         except jinja2.exceptions.TemplateSyntaxError:
-            return False
-    else:
-        return False
+            return None
+    return None
+
+
+def can_be_jinja(string: str) -> bool:
+    """
+    Checks if a string can be compiled using the jinja2 template engine.
+    """
+    return _compile_jinja(string) is not None
 
 
 def format_prompt_msg(_string: str, **kwargs) -> str:
@@ -24,7 +37,75 @@ def format_prompt_msg(_string: str, **kwargs) -> str:
 
     Returns: The formatted string
     """
-    if can_be_jinja(_string):
-        return jinja2.Template(_string).render(**kwargs)
-    else:
-        return _string.format(**kwargs)
+    return PromptFormatter(_string).format(**kwargs)
+
+
+class PromptFormatter:
+    """
+    A pre-parsed prompt string.
+    The decision between jinja2 and python string formatting, as well as the jinja2 compilation, are done once when
+    the formatter is created, so formatting the string only substitutes the variables.
+
+    Args:
+        string: The string to format
+    """
+
+    __slots__ = ("string", "_jinja_template")
+
+    def __init__(self, string: str):
+        self.string = string
+        self._jinja_template = _compile_jinja(string)
+
+    def format(self, **kwargs) -> str:
+        """
+        Formats the string with the given kwargs.
+        Args:
+            **kwargs: The kwargs to pass to the template
+
+        Returns: The formatted string
+        """
+        if self._jinja_template is not None:
+            return self._jinja_template.render(**kwargs)
+        return self.string.format(**kwargs)
+
+
+class PreparedTemplate:
+    """
+    An immutable, pre-parsed prompt template.
+    The messages are compiled once, and only the placeholders of the last message are populated on every call.
+
+    Args:
+        messages: The compiled messages of the template. The last message is the one that holds the placeholders.
+    """
+
+    __slots__ = ("_messages", "_formatter")
+
+    def __init__(self, messages: Sequence[Message]):
+        self._messages = tuple(messages)
+        self._formatter = (
+            PromptFormatter(self._messages[-1].message) if self._messages else None
+        )
+
+    @property
+    def messages(self) -> List[Message]:
+        """
+        Returns: The messages of the template, without populating the placeholders.
+        """
+        return list(self._messages)
+
+    def populate(self, **kwargs) -> List[Message]:
+        """
+        Populates the placeholders of the last message with the given kwargs.
+        The static messages are shared between calls and should not be mutated.
+        Args:
+            **kwargs: The kwargs to pass to the template
+
+        Returns: The messages of the template with the populated last message
+        """
+        if not kwargs or not self._messages:
+            return self.messages
+        last_message = self._messages[-1]
+        return [
+            *self._messages[:-1],
+            Message(message=self._formatter.format(**kwargs), role=last_message.role),
+        ]
@@ -0,0 +1,94 @@
+"""
+Extraction of a JSON object from noisy LLM output.
+LLMs often wrap the JSON they were asked for in markdown code fences, precede it with chatter, follow it with
+explanations, or leave trailing commas in it. Instead of failing the whole output, the text is scanned once for the
+top level objects it contains, and the first one that holds the expected key is decoded.
+"""
+from typing import Any, Dict, List, Optional
+
+from declarai.python_parser.validation import loads
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _decode_object(candidate: str) -> Optional[Dict[str, Any]]:
+    try:
+        decoded = loads(candidate)
+    except ValueError:
+        return None
+    return decoded if isinstance(decoded, dict) else None
+
+
+def extract_json_object(
+    text: str, key: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Finds a JSON object within the given text, in a single pass.
+    Text outside of the objects is ignored, and trailing commas within them are removed.
+    Args:
+        text: The output of the LLM
+        key: A key that the object must hold. When no object holds it, the first object found is returned.
+
+    Returns:
+        The decoded object, or None if the text does not contain any.
+    """
+    first: Optional[Dict[str, Any]] = None
+    stack: List[str] = []
+    start = 0
+    # The indexes of the trailing commas of the current object, and the last comma that may be trailing
+    trailing_commas: List[int] = []
+    pending_comma: Optional[int] = None
+    in_string = False
+    escape = False
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if not stack:
+            if char == "{":
+                stack.append(char)
+                start = i
+                trailing_commas = []
+                pending_comma = None
+            continue
+
+        if char.isspace():
+            continue
+        if pending_comma is not None and char in "}]":
+            trailing_commas.append(pending_comma)
+        pending_comma = None
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            if _CLOSERS[stack[-1]] != char:
+                # Not valid JSON, look for the next object
+                stack = []
+                continue
+            stack.pop()
+            if not stack:
+                end = i + 1
+                candidate = text[start:end]
+                for comma in reversed(trailing_commas):
+                    comma -= start
+                    after_comma = comma + 1
+                    candidate = candidate[:comma] + candidate[after_comma:]
+                decoded = _decode_object(candidate)
+                if decoded is not None:
+                    if key is None or key in decoded:
+                        return decoded
+                    if first is None:
+                        first = decoded
+        elif char == ",":
+            pending_comma = i
+
+    return first
@@ -0,0 +1,207 @@
+"""
+A precompiled manifest of the parsed metadata of tasks.
+Parsing a task reads its source code, parses it and generates the schema of its return type. The manifest stores the
+results, keyed by a hash of the compiled code and the Python version it was compiled by, so that the tasks can be
+parsed at startup without any of these steps, also when the source files are not deployed.
+
+The manifest is created with `declarai compile`, and is loaded from the path in the `DECLARAI_MANIFEST` environment
+variable, or with `load_manifest`.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType
+from typing import Any, Dict, Iterator, Optional, Set, Union, get_args
+
+from declarai.core.core_settings import MANIFEST_PATH_ENV
+
+logger = logging.getLogger("TaskManifest")
+
+MANIFEST_VERSION = 1
+"""The version of the manifest file format."""
+
+SpecEntry = Dict[str, Any]
+
+
+def _const_repr(const: Any) -> str:
+    # The iteration order of frozensets depends on the hash seed of the process
+    if isinstance(const, frozenset):
+        return f"frozenset({sorted(_const_repr(item) for item in const)})"
+    if isinstance(const, tuple):
+        return f"({', '.join(_const_repr(item) for item in const)},)"
+    return repr(const)
+
+
+def _update_with_code(digest: "hashlib._Hash", code: CodeType) -> None:
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            _update_with_code(digest, const)
+        else:
+            digest.update(_const_repr(const).encode())
+
+
+def _update_with_type(digest: "hashlib._Hash", type_: Any, seen: Set[int]) -> None:
+    if id(type_) in seen:
+        return
+    seen.add(id(type_))
+    digest.update(repr(type_).encode())
+    # The schema of pydantic models depends on their fields
+    for field in getattr(type_, "__fields__", {}).values():
+        digest.update(repr(field).encode())
+        _update_with_type(digest, field.outer_type_, seen)
+    for arg in get_args(type_):
+        _update_with_type(digest, arg, seen)
+
+
+def source_hash(decorated: Any) -> str:
+    """
+    Hashes everything the parsed metadata of a function or class is derived from: its name, docstring, annotations
+    and compiled code. The source files are not required.
+    The compiled code differs between Python versions, so the hash includes the version it was compiled by, and a
+    manifest is only used by the Python version that created it.
+    Args:
+        decorated: The decorated function or class
+
+    Returns:
+        The hex digest of the hash
+    """
+    digest = hashlib.sha256()
+    digest.update(f"python{sys.version_info[0]}.{sys.version_info[1]}".encode())
+    digest.update(f"{decorated.__module__}:{decorated.__qualname__}".encode())
+    digest.update((inspect.getdoc(decorated) or "").encode())
+    functions = (
+        [decorated]
+        if inspect.isfunction(decorated)
+        else [
+            value
+            for _, value in sorted(vars(decorated).items())
+            if inspect.isfunction(value)
+        ]
+    )
+    seen: Set[int] = set()
+    for function in functions:
+        digest.update(function.__qualname__.encode())
+        _update_with_code(digest, function.__code__)
+        for annotation in function.__annotations__.values():
+            _update_with_type(digest, annotation, seen)
+    return digest.hexdigest()
+
+
+class TaskManifest:
+    """
+    The parsed metadata of tasks, keyed by their source hash.
+
+    Args:
+        specs: The entries of the manifest
+    """
+
+    def __init__(self, specs: Optional[Dict[str, SpecEntry]] = None):
+        self.specs = specs or {}
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def get(self, decorated: Any) -> Optional[SpecEntry]:
+        """
+        Returns the entry of the given function or class, None if it is missing or its code has changed.
+        """
+        return self.specs.get(source_hash(decorated))
+
+    def add(self, decorated: Any, entry: SpecEntry) -> None:
+        """
+        Adds the entry of the given function or class.
+        """
+        self.specs[source_hash(decorated)] = entry
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TaskManifest":
+        """
+        Loads a manifest file.
+        """
+        with open(path, encoding="utf-8") as manifest_file:
+            content = json.load(manifest_file)
+        if content.get("version") != MANIFEST_VERSION:
+            raise ValueError(
+                f"Unsupported manifest version {content.get('version')} in {path}, "
+                f"recompile it with `declarai compile`"
+            )
+        return cls(content["specs"])
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Writes the manifest to a file.
+        """
+        with open(path, "w", encoding="utf-8") as manifest_file:
+            json.dump(
+                {"version": MANIFEST_VERSION, "specs": self.specs},
+                manifest_file,
+                sort_keys=True,
+            )
+
+
+_active_manifest: Optional[TaskManifest] = None
+_env_manifest_loaded = False
+_recording_manifest: Optional[TaskManifest] = None
+
+
+def set_manifest(manifest: Optional[TaskManifest]) -> None:
+    """
+    Sets the manifest that tasks are parsed from, None to always parse the source code.
+    """
+    global _active_manifest, _env_manifest_loaded  # pylint: disable=W0603
+    _active_manifest = manifest
+    _env_manifest_loaded = True
+
+
+def load_manifest(path: Union[str, Path]) -> TaskManifest:
+    """
+    Loads a manifest file and parses the tasks that are decorated from now on from it.
+    """
+    manifest = TaskManifest.load(path)
+    set_manifest(manifest)
+    return manifest
+
+
+def active_manifest() -> Optional[TaskManifest]:
+    """
+    Returns the manifest that tasks are parsed from. On first use, it is loaded from the `DECLARAI_MANIFEST`
+    environment variable, if set.
+    """
+    global _env_manifest_loaded  # pylint: disable=W0603
+    if not _env_manifest_loaded:
+        _env_manifest_loaded = True
+        path = os.getenv(MANIFEST_PATH_ENV)
+        if path:
+            try:
+                load_manifest(path)
+            except (OSError, ValueError) as error:
+                logger.warning("Failed loading the task manifest %s: %s", path, error)
+    return _active_manifest
+
+
+def recording_manifest() -> Optional[TaskManifest]:
+    """
+    Returns the manifest that the parsed tasks are recorded into, when compiling.
+    """
+    return _recording_manifest
+
+
+@contextmanager
+def record_manifest() -> Iterator[TaskManifest]:
+    """
+    Records the metadata of every task that is parsed within the context into a new manifest.
+    The tasks are always parsed from their source code while recording.
+    """
+    global _recording_manifest  # pylint: disable=W0603
+    previous, _recording_manifest = _recording_manifest, TaskManifest()
+    try:
+        yield _recording_manifest
+    finally:
+        _recording_manifest = previous
@@ -3,16 +3,34 @@ An interface to extract different parts of the provided python code into a simpl
 """
 
 import inspect
-from functools import lru_cache as memoized
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import (
+    Any,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    get_args,
+    get_origin,
+)
 
-from pydantic import parse_obj_as, parse_raw_as
 from pydantic.error_wrappers import ValidationError
 
+from declarai.python_parser import manifest
+from declarai.python_parser.json_extraction import extract_json_object
 from declarai.python_parser.magic_parser import Magic, extract_magic_args
+from declarai.python_parser.partial_json import PartialJSONParser
 from declarai.python_parser.type_annotation_to_schema import (
     type_annotation_to_str_schema,
 )
+from declarai.python_parser.manifest import SpecEntry
+from declarai.python_parser.validation import (
+    is_model,
+    loads,
+    partial_model,
+    validator_for,
+)
 from declarai.python_parser.types import (
     ArgName,
     ArgType,
@@ -29,121 +47,251 @@ class OutputParsingError(Exception):
     pass
 
 
+class ParseSpec(NamedTuple):
+    """
+    The immutable metadata of a decorated function or class.
+    It is computed once, when the task is decorated, and is never mutated afterwards.
+    """
+
+    name: str
+    signature_kwargs: Mapping[ArgName, ArgType]
+    signature_return: SignatureReturn
+    docstring_freeform: DocstringFreeform
+    docstring_params: DocstringParams
+    docstring_return: DocstringReturn
+    magic: Magic
+    return_name: str
+    has_any_return_defs: bool
+    has_structured_return_type: bool
+    return_item_type: Optional[Any]
+
+
+def _str_schema(signature: inspect.Signature) -> Optional[str]:
+    if signature.return_annotation == inspect._empty:
+        return None
+    return type_annotation_to_str_schema(signature.return_annotation)
+
+
+def _magic(decorated: Any) -> Magic:
+    try:
+        func_str = inspect.getsource(decorated)
+    except (OSError, TypeError):
+        # Objects without source code, e.g. defined in a REPL, can not call magic
+        return Magic()
+    if "magic(" not in func_str:
+        return Magic()
+    return extract_magic_args(func_str)
+
+
+def _return_item_type(return_type: Any) -> Optional[Any]:
+    if return_type is list:
+        return Any
+    if get_origin(return_type) is list:
+        args = get_args(return_type)
+        return args[0] if args else Any
+    return None
+
+
+def _spec_entry(decorated: Any, signature: inspect.Signature) -> SpecEntry:
+    """
+    Parses the docstring and the source code of a decorated function or class, and generates the schema of its
+    return type. These are the parts of the spec that are stored in the task manifest.
+    """
+    parsed_docstring = ReSTDocstringParser(inspect.getdoc(decorated) or "")
+    return {
+        "docstring_freeform": parsed_docstring.freeform,
+        "docstring_params": parsed_docstring.params,
+        "docstring_return": list(parsed_docstring.returns),
+        "magic": vars(_magic(decorated)),
+        "return_str_schema": _str_schema(signature),
+    }
+
+
+def parse_spec(decorated: Any) -> ParseSpec:
+    """
+    Extracts the metadata of a decorated function or class.
+    The source code is read, and the return type schema is generated, exactly once. When the task is found in the
+    active task manifest, both are skipped.
+    Args:
+        decorated: The decorated function or class
+
+    Returns:
+        The parsed metadata
+    """
+    signature = inspect.signature(decorated)
+    recording = manifest.recording_manifest()
+    compiled = manifest.active_manifest() if recording is None else None
+    entry = compiled.get(decorated) if compiled is not None else None
+    if entry is None:
+        entry = _spec_entry(decorated, signature)
+        if recording is not None:
+            recording.add(decorated, entry)
+
+    return_annotation = signature.return_annotation
+    if return_annotation == inspect._empty:
+        signature_return = SignatureReturn()
+    else:
+        signature_return = SignatureReturn(
+            name=str(return_annotation),
+            str_schema=entry["return_str_schema"],
+            type_=return_annotation,
+        )
+    docstring_return = tuple(entry["docstring_return"])
+    magic = Magic(**entry["magic"])
+
+    # A return definition is any of the following:
+    # - return type annotation
+    # - return reference in docstring
+    # - return referenced in magic placeholder  # TODO: Address magic reference as well.
+    has_any_return_defs = any(
+        [docstring_return[0], docstring_return[1], signature_return]
+    )
+    # Except for the following types, a dedicated output parsing
+    # behavior is required to return the expected return type of the task.
+    has_structured_return_type = any(
+        [
+            docstring_return[0],
+            signature_return.name
+            not in (
+                None,
+                "<class 'str'>",
+                "<class 'int'>",
+                "<class 'float'>",
+                "<class 'bool'>",
+            ),
+        ]
+    )
+    return ParseSpec(
+        name=decorated.__name__,
+        signature_kwargs=MappingProxyType(
+            {
+                param.name: param.annotation
+                for param in signature.parameters.values()
+                if param.name != "self"
+            }
+        ),
+        signature_return=signature_return,
+        docstring_freeform=entry["docstring_freeform"],
+        docstring_params=entry["docstring_params"],
+        docstring_return=docstring_return,
+        magic=magic,
+        return_name=magic.return_name or docstring_return[0] or "declarai_result",
+        has_any_return_defs=has_any_return_defs,
+        has_structured_return_type=has_structured_return_type,
+        return_item_type=_return_item_type(signature_return.type_),
+    )
+
+
 class PythonParser:
     """
     A unified interface for accessing python parsed data.
+    The metadata is parsed once, when the parser is created, and is kept in an immutable `spec`.
+
+    Attributes:
+        spec (ParseSpec): The parsed metadata of the decorated function or class
     """
 
     is_func: bool
     is_class: bool
     decorated: Any
-    name: str
-    signature_return_type: Any
-    docstring_freeform: DocstringFreeform
-    docstring_params: DocstringParams
-    docstring_return: DocstringReturn
+    spec: ParseSpec
 
     def __init__(self, decorated: Any):
         self.is_func = inspect.isfunction(decorated)
         self.is_class = inspect.isclass(decorated)
         self.decorated = decorated
+        self.spec = parse_spec(decorated)
+        self._validator = (
+            validator_for(self.signature_return_type)
+            if self.signature_return_type
+            else None
+        )
 
-        # Static attributes:
-        self.name = self.decorated.__name__
+    @property
+    def name(self) -> str:
+        return self.spec.name
 
-        self._signature = inspect.signature(self.decorated)
-        self.signature_return_type = self.signature_return.type_
+    @property
+    def signature_kwargs(self) -> Mapping[ArgName, ArgType]:
+        return self.spec.signature_kwargs
 
-        docstring = inspect.getdoc(self.decorated)
-        self._parsed_docstring = ReSTDocstringParser(docstring or "")
-        self.docstring_freeform = self._parsed_docstring.freeform
-        self.docstring_params = self._parsed_docstring.params
-        self.docstring_return = self._parsed_docstring.returns
+    @property
+    def signature_return(self) -> SignatureReturn:
+        return self.spec.signature_return
 
     @property
-    @memoized(maxsize=1)
-    def signature_kwargs(self) -> Dict[ArgName, ArgType]:
-        return {
-            param.name: param.annotation
-            for param in dict(self._signature.parameters).values()
-            if param.name != "self"
-        }
+    def signature_return_type(self) -> Any:
+        return self.spec.signature_return.type_
 
     @property
-    @memoized(maxsize=1)
-    def signature_return(self) -> Optional[SignatureReturn]:
-        return_annotation = self._signature.return_annotation
-        if return_annotation == inspect._empty:
-            return SignatureReturn()
-        string_schema = type_annotation_to_str_schema(self._signature.return_annotation)
-        return SignatureReturn(
-            name=str(self._signature.return_annotation),
-            str_schema=string_schema,
-            type_=self._signature.return_annotation,
-        )
+    def docstring_freeform(self) -> DocstringFreeform:
+        return self.spec.docstring_freeform
+
+    @property
+    def docstring_params(self) -> DocstringParams:
+        return self.spec.docstring_params
+
+    @property
+    def docstring_return(self) -> DocstringReturn:
+        return self.spec.docstring_return
 
     @property
-    @memoized(maxsize=1)
     def magic(self) -> Magic:
-        func_str = inspect.getsource(self.decorated)
-        if "magic(" not in func_str:
-            return Magic()
-        return extract_magic_args(func_str)
+        return self.spec.magic
 
     @property
-    @memoized(maxsize=1)
     def return_name(self) -> str:
-        return self.magic.return_name or self.docstring_return[0] or "declarai_result"
+        return self.spec.return_name
 
     @property
-    @memoized(maxsize=1)
     def has_any_return_defs(self) -> bool:
         """
         A return definition is any of the following:
         - return type annotation
         - return reference in docstring
-        - return referenced in magic placeholder  # TODO: Address magic reference as well.
-        """
-        return any(
-            [
-                self.docstring_return[0],
-                self.docstring_return[1],
-                self.signature_return,
-            ]
-        )
+        - return referenced in magic placeholder
+        """
+        return self.spec.has_any_return_defs
 
     @property
-    @memoized(maxsize=1)
     def has_structured_return_type(self) -> bool:
         """
-        Except for the following types, a dedicated output parsing
+        Except for str, int, float and bool, a dedicated output parsing
         behavior is required to return the expected return type of the task.
         """
-        return any(
-            [
-                self.docstring_return[0],
-                self.signature_return.name
-                not in (
-                    None,
-                    "<class 'str'>",
-                    "<class 'int'>",
-                    "<class 'float'>",
-                    "<class 'bool'>",
-                ),
-            ]
-        )
+        return self.spec.has_structured_return_type
+
+    @property
+    def return_item_type(self) -> Optional[Any]:
+        """
+        The type of the items of a list return type, None if the return type is not a list.
+        """
+        return self.spec.return_item_type
 
     def parse(self, raw_result: str):
         if self.has_structured_return_type:
-            parsed_result = parse_raw_as(dict, raw_result)
             root_key = self.return_name or "declarai_result"
+            try:
+                parsed_result = loads(raw_result)
+            except ValueError:
+                parsed_result = None
+            if not isinstance(parsed_result, dict) or root_key not in parsed_result:
+                # The JSON may be surrounded by code fences or prose, or have trailing commas
+                parsed_result = extract_json_object(raw_result, key=root_key)
+            if parsed_result is None or root_key not in parsed_result:
+                raise OutputParsingError(
+                    f"\nFailed decoding result as a JSON object with the key '{root_key}':\n"
+                    "----------------------------------\n"
+                    f"raw_result:\n"
+                    f"{raw_result}"
+                )
             parsed_result = parsed_result[root_key]
         else:
             parsed_result = raw_result
 
-        if self.signature_return_type:
+        if self._validator:
             try:
-                return parse_obj_as(self.signature_return_type, parsed_result)
+                return self._validator.validate(parsed_result)
             except ValidationError:
                 raise OutputParsingError(
                     f"\nFailed parsing result into type:\n"
@@ -154,3 +302,163 @@ class PythonParser:
                 )
         else:
             return parsed_result
+
+    def parse_many(
+        self, raw_results: Iterable[str], return_exceptions: bool = False
+    ) -> List[Any]:
+        """
+        Parses many outputs of the task, sharing the validator of the return type between them.
+        Args:
+            raw_results: The outputs of the LLM
+            return_exceptions: if True, the errors of outputs that fail parsing are returned in place of their
+                results instead of being raised.
+
+        Returns:
+            The parsed results, in the same order as the outputs
+        """
+        results = []
+        for raw_result in raw_results:
+            try:
+                results.append(self.parse(raw_result))
+            except OutputParsingError as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def parse_partial(self, partial_result: Any) -> Optional[Any]:
+        """
+        Parses a partially populated result into the return type.
+        A model that does not validate yet is populated with the fields that do, see `partial_model`.
+        When the result of a list return type does not validate, the last element, which may still be incomplete,
+        is populated partially if it is a model, or left out otherwise.
+
+        Returns:
+            The parsed result, or None if it does not validate yet.
+        """
+        if not self._validator:
+            return partial_result
+        try:
+            return self._validator.validate(partial_result)
+        except (ValidationError, TypeError):
+            pass
+        if is_model(self.signature_return_type):
+            return partial_model(self.signature_return_type, partial_result)
+        if isinstance(partial_result, list) and partial_result:
+            try:
+                complete = self._validator.validate(partial_result[:-1])
+            except (ValidationError, TypeError):
+                return None
+            if is_model(self.return_item_type) and isinstance(complete, list):
+                last = partial_model(self.return_item_type, partial_result[-1])
+                if last is not None:
+                    complete.append(last)
+            return complete
+        return None
+
+    def parse_item(self, raw_item: Any) -> Any:
+        """
+        Parses a single element of a list return type.
+        """
+        try:
+            return validator_for(self.return_item_type).validate(raw_item)
+        except ValidationError:
+            raise OutputParsingError(
+                f"\nFailed parsing item into type:\n"
+                f"{self.return_item_type}\n"
+                "----------------------------------\n"
+                f"raw_item:\n"
+                f"{raw_item}"
+            )
+
+    def stream_parser(self, items: bool = False) -> "StreamingOutputParser":
+        """
+        Creates a parser for the streamed output of the task.
+        Args:
+            items: Whether to parse the elements of a list return type one by one, instead of the whole result.
+        """
+        return StreamingOutputParser(self, items=items)
+
+
+class StreamingOutputParser:
+    """
+    Parses the output of a task with a structured return type while it is streamed.
+
+    Every snapshot of the result decodes all the output consumed so far. To keep the work linear in the length of the
+    output, snapshots are taken on every chunk only while the output is short. Once it is longer than
+    `snapshot_every_chunk_up_to` characters, a snapshot is taken only after the output grew by `snapshot_growth` of
+    its length since the previous one.
+
+    Args:
+        parser: The parser of the task
+        items: Whether to parse the elements of a list return type as soon as each of them is closed, instead of
+            progressively populating the whole result.
+    """
+
+    snapshot_every_chunk_up_to = 4096
+    "The length of the output up to which a snapshot is taken on every chunk"
+    snapshot_growth = 0.1
+    "The relative growth of longer outputs between snapshots"
+
+    def __init__(self, parser: PythonParser, items: bool = False):
+        if not parser.has_structured_return_type:
+            raise ValueError(
+                f"Streamed parsing requires a structured return type, {parser.name} returns "
+                f"{parser.signature_return.name}"
+            )
+        if items and parser.return_item_type is None:
+            raise ValueError(
+                f"Streaming items requires a list return type, {parser.name} returns "
+                f"{parser.signature_return.name}"
+            )
+        self._parser = parser
+        self._items = items
+        self._root_key = parser.return_name or "declarai_result"
+        self._json = PartialJSONParser(items_key=self._root_key if items else None)
+        self._last: Any = None
+        self._snapshot_length = 0
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Consumes the next chunk of the output.
+        Returns:
+            The parsed items that were closed by the chunk, or the result if it changed.
+        """
+        self._json.feed(text)
+        if self._items:
+            return [self._parser.parse_item(item) for item in self._json.pop_items()]
+
+        if not self._should_snapshot():
+            return []
+        snapshot = self._json.snapshot()
+        if not isinstance(snapshot, dict) or self._root_key not in snapshot:
+            return []
+        result = self._parser.parse_partial(snapshot[self._root_key])
+        if result is None or result == self._last:
+            return []
+        self._last = result
+        return [result]
+
+    def _should_snapshot(self) -> bool:
+        length = self._json.length
+        if length > self.snapshot_every_chunk_up_to and (
+            length - self._snapshot_length
+            < self._snapshot_length * self.snapshot_growth
+        ):
+            return False
+        self._snapshot_length = length
+        return True
+
+    def close(self) -> List[Any]:
+        """
+        Completes the parsing once the output is exhausted.
+        Returns:
+            The fully parsed result, unless it was already returned by `feed`.
+        """
+        if self._items:
+            return []
+        result = self._parser.parse(self._json.text)
+        if result == self._last:
+            return []
+        self._last = result
+        return [result]
@@ -0,0 +1,235 @@
+"""
+Incremental parsing of JSON documents that arrive in chunks, e.g. when streaming the response of an LLM.
+The parser scans every character once, and keeps track of the last point at which the document can be closed into
+valid JSON, so that partial snapshots of the document can be taken at any time.
+"""
+import json
+import re
+from typing import Any, List, Optional
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_PARTIAL_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class PartialJSONParser:
+    """
+    Consumes a JSON document chunk by chunk.
+    Any text before the root object or array, like a markdown code fence, and any text after it is closed is ignored.
+
+    Args:
+        items_key: A key of the root object that holds an array. Each element of the array is decoded as soon as it is
+            closed, and can be collected with `pop_items`.
+
+    Attributes:
+        items_key (str): The key of the root object whose array elements are collected
+        closed (bool): Whether the root object or array was closed
+    """
+
+    def __init__(self, items_key: Optional[str] = None):
+        self.items_key = items_key
+        self.closed = False
+        self._parts: List[str] = []
+        self._offset = 0
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._key_expected = False
+        self._in_scalar = False
+        self._safe_offset = 0
+        self._safe_closers = ""
+        self._root_key_parts: Optional[List[str]] = None
+        self._root_key: Optional[str] = None
+        self._tracking_items = False
+        self._items_done = False
+        self._item_parts: List[str] = []
+        self._items: List[Any] = []
+
+    @property
+    def length(self) -> int:
+        """
+        The number of characters that were consumed so far.
+        """
+        return self._offset
+
+    @property
+    def text(self) -> str:
+        """
+        The text that was consumed so far.
+        """
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, chunk: str) -> None:
+        """
+        Consumes the next chunk of the document.
+        Args:
+            chunk: The text that follows the previously consumed text
+        """
+        self._parts.append(chunk)
+        base = self._offset
+        self._offset += len(chunk)
+        if self.closed:
+            return
+
+        # The start of the current array element within the chunk, when collecting items
+        item_start = 0
+        i = 0
+        length = len(chunk)
+        while i < length:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._capture_key(chunk[i])
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(chunk, i)
+                if match is None:
+                    self._capture_key(chunk[i:])
+                    break
+                j = match.start()
+                if chunk[j] == "\\":
+                    end = j + 1
+                    self._capture_key(chunk[i:end])
+                    self._escape = True
+                else:
+                    self._capture_key(chunk[i:j])
+                    self._in_string = False
+                    if not self._string_is_key:
+                        self._mark_safe(base + j + 1)
+                i = j + 1
+                continue
+
+            char = chunk[i]
+            if not self._stack and self._start is None and char not in "{[":
+                # Skips any text that precedes the document
+                i += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_is_key = self._key_expected
+                if self._string_is_key and len(self._stack) == 1:
+                    self._root_key_parts = []
+            elif char in "{[":
+                if self._start is None:
+                    self._start = base + i
+                self._stack.append(char)
+                self._key_expected = char == "{"
+                self._mark_safe(base + i + 1)
+                if char == "[" and self._is_items_array():
+                    self._tracking_items = True
+                    item_start = i + 1
+            elif char in "}]":
+                self._end_scalar(base + i)
+                if self._tracking_items and len(self._stack) == 2:
+                    self._collect_item(chunk[item_start:i])
+                    self._tracking_items = False
+                    self._items_done = True
+                self._stack.pop()
+                self._key_expected = False
+                self._mark_safe(base + i + 1)
+                if not self._stack:
+                    self.closed = True
+                    return
+            elif char == ",":
+                self._end_scalar(base + i)
+                if self._tracking_items and len(self._stack) == 2:
+                    self._collect_item(chunk[item_start:i])
+                    item_start = i + 1
+                self._key_expected = self._stack[-1] == "{"
+            elif char == ":":
+                self._key_expected = False
+                if self._root_key_parts is not None:
+                    self._root_key = json.loads(
+                        '"' + "".join(self._root_key_parts) + '"'
+                    )
+                    self._root_key_parts = None
+            elif char.isspace():
+                self._end_scalar(base + i)
+            else:
+                self._in_scalar = True
+            i += 1
+
+        if self._tracking_items:
+            self._item_parts.append(chunk[item_start:])
+
+    def snapshot(self) -> Any:
+        """
+        Decodes the document consumed so far, closing any open strings, arrays and objects.
+        Incomplete keys, numbers and literals are left out.
+
+        Returns:
+            The decoded document, or None if nothing could be decoded yet.
+        """
+        if self._start is None:
+            return None
+        text = self.text
+        start, safe_offset = self._start, self._safe_offset
+        if self._in_string and not self._string_is_key:
+            partial = text[start:]
+            if self._escape:
+                partial = partial[:-1]
+            partial = _PARTIAL_UNICODE_ESCAPE.sub("", partial)
+            candidate = partial + '"' + self._closers()
+        else:
+            candidate = text[start:safe_offset] + self._safe_closers
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            return None
+
+    def pop_items(self) -> List[Any]:
+        """
+        Returns the array elements that were closed since the last call.
+        """
+        items, self._items = self._items, []
+        return items
+
+    def _is_items_array(self) -> bool:
+        return (
+            self.items_key is not None
+            and not self._items_done
+            and len(self._stack) == 2
+            and self._stack[0] == "{"
+            and self._root_key == self.items_key
+        )
+
+    def _collect_item(self, tail: str) -> None:
+        raw = "".join(self._item_parts) + tail
+        self._item_parts = []
+        if not raw.strip():
+            return
+        try:
+            self._items.append(json.loads(raw))
+        except ValueError:
+            # The parser module depends on this one
+            from declarai.python_parser.parser import (  # pylint: disable=C0415
+                OutputParsingError,
+            )
+
+            raise OutputParsingError(
+                f"\nFailed decoding item as JSON:\n"
+                "----------------------------------\n"
+                f"raw_item:\n"
+                f"{raw}"
+            )
+
+    def _capture_key(self, text: str) -> None:
+        if self._root_key_parts is not None and self._string_is_key:
+            self._root_key_parts.append(text)
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[opener] for opener in reversed(self._stack))
+
+    def _mark_safe(self, offset: int) -> None:
+        self._safe_offset = offset
+        self._safe_closers = self._closers()
+
+    def _end_scalar(self, offset: int) -> None:
+        if self._in_scalar:
+            self._in_scalar = False
+            self._mark_safe(offset)
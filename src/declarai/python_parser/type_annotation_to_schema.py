@@ -1,8 +1,11 @@
+import collections
 import json
+import types
 import typing
-from typing import Any, Dict, Optional
+from functools import lru_cache, wraps
+from typing import Any, Dict, List, Optional, Tuple, get_args, get_origin
 
-import jsonref
+import typing_extensions
 from pydantic import schema_json_of
 from pydantic.main import ModelMetaclass
 
@@ -28,6 +31,9 @@ def resolve_pydantic_schema_recursive(schema_def: Dict[str, Any]) -> Any:
 
 
 def resolve_to_json_schema(type_: Any) -> Dict:
+    # jsonref imports requests for remote references, so it is only loaded when a schema is resolved
+    import jsonref  # pylint: disable=C0415
+
     if isinstance(type_, ModelMetaclass):
         unresolved = type_.schema_json()
     else:
@@ -40,32 +46,242 @@ def schema_to_string_for_prompt(schema: str) -> str:
     return schema
 
 
+_GENERIC_NAMES = {
+    list: "List",
+    dict: "Dict",
+    tuple: "Tuple",
+    set: "Set",
+    frozenset: "FrozenSet",
+    type: "Type",
+    collections.deque: "Deque",
+    collections.defaultdict: "DefaultDict",
+    typing.Union: "Union",
+}
+_LITERALS = {typing.Literal, typing_extensions.Literal}
+if getattr(types, "UnionType", None):  # X | Y annotations, python 3.10+
+    _GENERIC_NAMES[types.UnionType] = "Union"
+
+
+def _cache_key(type_: Any) -> Any:
+    origin = get_origin(type_)
+    if origin is None:
+        # Literal values of different types may be equal, e.g. 1 and True
+        return type_ if isinstance(type_, type) else (type(type_), type_)
+    return origin, tuple(_cache_key(arg) for arg in get_args(type_))
+
+
+class _TypeKey:
+    """
+    Keys the cache of a type by its origin and arguments, in order.
+    Typing considers unions equal regardless of the order of their arguments, e.g. `Union[int, str]` and
+    `Union[str, int]`, but their schemas list the arguments in order.
+    """
+
+    __slots__ = ("type_", "key")
+
+    def __init__(self, type_: Any):
+        self.type_ = type_
+        self.key = _cache_key(type_)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _TypeKey) and self.key == other.key
+
+
+def _cached(func):
+    """
+    Memoizes a function of a type for the lifetime of the process.
+    Types that can not be hashed, e.g. annotated with unhashable metadata, are resolved without the cache.
+    """
+    cached_func = lru_cache(maxsize=None)(lambda type_key: func(type_key.type_))
+
+    @wraps(func)
+    def wrapper(type_):
+        try:
+            return cached_func(_TypeKey(type_))
+        except TypeError:
+            return func(type_)
+
+    wrapper.cache_clear = cached_func.cache_clear
+    wrapper.cache_info = cached_func.cache_info
+    return wrapper
+
+
+@_cached
+def resolve_type_schema(type_: Any) -> Any:
+    """
+    Resolves the json schema of a type into its simplified representation.
+    The result is shared between all the callers and must not be mutated.
+    """
+    return resolve_pydantic_schema_recursive(resolve_to_json_schema(type_))
+
+
+def _is_generic(type_: Any) -> bool:
+    origin = get_origin(type_)
+    return origin is not None and origin not in _LITERALS and bool(get_args(type_))
+
+
+def _generic_name(type_: Any) -> str:
+    """
+    The name of a generic type, derived from its origin so that it is the same on every python version,
+    e.g. `Optional[int]` is named `Union`, like `Union[int, None]` and `int | None`.
+    """
+    origin = get_origin(type_)
+    return _GENERIC_NAMES.get(origin, getattr(origin, "__name__", str(origin)))
+
+
+def _generic_str_schema(type_: Any) -> str:
+    root_name = _generic_name(type_)
+    properties = []
+    for sub_type in get_args(type_):
+        if sub_type is Ellipsis:
+            properties.append("...")
+        elif _is_generic(sub_type):
+            properties.append(_generic_str_schema(sub_type))
+        else:
+            properties.append(str(resolve_type_schema(sub_type)))
+    return f"{root_name}[{', '.join(properties)}]"
+
+
+@_cached
 def type_annotation_to_str_schema(type_) -> Optional[str]:
     """
     This method accepts arbitrary types defined in the return annotation of a functions.
     Then creates a string representation of the annotation schema to be passed to the model.
+    The schemas are cached per type, so types that are shared between tasks are resolved once.
     """
-    if type_.__module__ == "builtins":
+    if getattr(type_, "__module__", None) == "builtins":
         if type_ in (str, int, float, bool):
             return type_.__name__
 
-    if isinstance(type_, typing._GenericAlias):
-        root_name = type_._name
-        if not root_name:
-            if type_.__origin__ == typing.Union:
-                root_name = "Union"
+    if _is_generic(type_):
+        return schema_to_string_for_prompt(_generic_str_schema(type_))
+
+    str_schema = json.dumps(resolve_type_schema(type_), indent=4)
+    return schema_to_string_for_prompt(str_schema)
+
+
+_COMPACT_TYPES = {
+    "string": "str",
+    "integer": "int",
+    "number": "float",
+    "boolean": "bool",
+}
+
+
+def _raw_json_schema(type_: Any) -> Dict:
+    if isinstance(type_, ModelMetaclass):
+        return type_.schema()
+    return json.loads(schema_json_of(type_))
+
+
+def _count_refs(schema_def: Any, counts: Dict[str, int]) -> None:
+    if isinstance(schema_def, dict):
+        ref = schema_def.get("$ref")
+        if isinstance(ref, str):
+            name = ref.rsplit("/", 1)[-1]
+            counts[name] = counts.get(name, 0) + 1
+        for value in schema_def.values():
+            _count_refs(value, counts)
+    elif isinstance(schema_def, list):
+        for value in schema_def:
+            _count_refs(value, counts)
+
+
+class _CompactRenderer:
+    """
+    Renders a json schema as a minified type hint, e.g. `{"name":str,"year":int|null}`.
+    Models that are referenced more than once are rendered once, as shared definitions, and referenced by name.
+    """
+
+    def __init__(self, schema: Dict):
+        self.definitions: Dict[str, Dict] = schema.get("definitions", {})
+        counts: Dict[str, int] = {}
+        _count_refs(schema, counts)
+        self.shared = [name for name in self.definitions if counts.get(name, 0) > 1]
+
+    def render(self, schema_def: Dict) -> str:
+        rendered = self._render_type(schema_def)
+        if "description" in schema_def:
+            return f"{rendered} - {schema_def['description']}"
+        return rendered
+
+    def render_definitions(self) -> List[Tuple[str, str]]:
+        return [(name, self.render(self.definitions[name])) for name in self.shared]
+
+    def _render_type(self, schema_def: Dict) -> str:
+        if "$ref" in schema_def:
+            name = schema_def["$ref"].rsplit("/", 1)[-1]
+            if name in self.shared or name not in self.definitions:
+                return name
+            return self.render(self.definitions[name])
+        if len(schema_def.get("allOf", ())) == 1:
+            return self._render_type(schema_def["allOf"][0])
+        if "anyOf" in schema_def:
+            return "|".join(self._render_type(option) for option in schema_def["anyOf"])
+        if "enum" in schema_def:
+            return "|".join(json.dumps(value) for value in schema_def["enum"])
+
+        obj_type = schema_def.get("type")
+        if obj_type == "object":
+            if "properties" in schema_def:
+                properties = ",".join(
+                    f"{json.dumps(key)}:{self.render(value)}"
+                    for key, value in schema_def["properties"].items()
+                )
+                return f"{{{properties}}}"
+            if isinstance(schema_def.get("additionalProperties"), dict):
+                return f"{{str:{self.render(schema_def['additionalProperties'])}}}"
+            return "{}"
+        if obj_type == "array":
+            if isinstance(schema_def.get("items"), dict):
+                return f"[{self.render(schema_def['items'])}]"
+            return "[]"
+        return _COMPACT_TYPES.get(obj_type, str(obj_type))
+
+
+@_cached
+def _compact_type_schema(type_: Any) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """
+    Renders the compact schema of a type, together with the shared definitions that it references.
+    """
+    if getattr(type_, "__module__", None) == "builtins" and type_ in (
+        str,
+        int,
+        float,
+        bool,
+    ):
+        return type_.__name__, ()
+
+    if _is_generic(type_):
+        root_name = _generic_name(type_)
         properties = []
-        for sub_type in type_.__args__:
-            resolved_schema = resolve_to_json_schema(sub_type)
-            properties.append(resolve_pydantic_schema_recursive(resolved_schema))
+        definitions: Dict[str, str] = {}
+        for sub_type in get_args(type_):
+            if sub_type is Ellipsis:
+                properties.append("...")
+                continue
+            rendered, sub_definitions = _compact_type_schema(sub_type)
+            properties.append(rendered)
+            definitions.update(sub_definitions)
+        return f"{root_name}[{','.join(properties)}]", tuple(definitions.items())
 
-        if len(properties) > 1:
-            resolved_str_schema = f"{root_name}[{properties[0]}, {properties[1]}]"
-        else:
-            resolved_str_schema = f"{root_name}[{properties[0]}]"
-        return schema_to_string_for_prompt(resolved_str_schema)
+    schema = _raw_json_schema(type_)
+    renderer = _CompactRenderer(schema)
+    return renderer.render(schema), tuple(renderer.render_definitions())
 
-    resolved_schema = resolve_to_json_schema(type_)
-    resolved_schema = resolve_pydantic_schema_recursive(resolved_schema)
-    str_schema = json.dumps(resolved_schema, indent=4)
-    return schema_to_string_for_prompt(str_schema)
+
+def type_annotation_to_compact_str_schema(type_) -> Optional[str]:
+    """
+    Creates a compact string representation of the annotation schema, to save prompt tokens.
+    The schema is minified, the primitive types are abbreviated, and models that are referenced more than once are
+    defined once and referenced by name.
+    """
+    rendered, definitions = _compact_type_schema(type_)
+    if definitions:
+        rendered += " where " + "; ".join(
+            f"{name}={definition}" for name, definition in definitions
+        )
+    return schema_to_string_for_prompt(rendered)
@@ -0,0 +1,108 @@
+"""
+Validation of the outputs of the LLM into the return types of the tasks.
+A validator is built once per return type and shared between all the tasks and calls that return it, instead of
+rebuilding the pydantic validation machinery on every parse.
+"""
+import json
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, create_model
+from pydantic.error_wrappers import ValidationError
+from pydantic.typing import display_as_type
+
+from declarai.python_parser.type_annotation_to_schema import _cached
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _select_loads() -> Callable[[str], Any]:
+    if orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+loads = _select_loads()
+"""Decodes a JSON document, using orjson when it is installed. Invalid documents raise a ValueError."""
+
+
+class TypeValidator:
+    """
+    Validates values into a type.
+
+    Args:
+        type_: The type to validate into
+    """
+
+    __slots__ = ("type_", "_model", "_field")
+
+    def __init__(self, type_: Any):
+        self.type_ = type_
+        self._model = create_model(
+            f"ParsingModel[{display_as_type(type_)}]", __root__=(type_, ...)
+        )
+        self._field = self._model.__fields__["__root__"]
+
+    def validate(self, value: Any) -> Any:
+        """
+        Validates a value into the type.
+        Raises:
+            ValidationError: If the value does not validate
+        """
+        validated, errors = self._field.validate(
+            value, {}, loc="__root__", cls=self._model
+        )
+        if errors:
+            raise ValidationError([errors], self._model)
+        return validated
+
+
+@_cached
+def validator_for(type_: Any) -> TypeValidator:
+    """
+    Returns the shared validator of a type.
+    Unions of the same types in a different order are validated in their own order, so they do not share a validator.
+    """
+    return TypeValidator(type_)
+
+
+def is_model(type_: Any) -> bool:
+    """
+    Whether the type is a pydantic model.
+    """
+    return isinstance(type_, type) and issubclass(type_, BaseModel)
+
+
+def partial_model(model: Any, value: Any) -> Optional[BaseModel]:
+    """
+    Builds a model from a partially populated value, e.g. while the output of the LLM is streamed.
+    Only the fields that validate are set, fields that are missing or still incomplete are left unset. Fields that
+    are models themselves are populated partially as well.
+    The model is built without validating it as a whole, so required fields may be missing.
+
+    Args:
+        model: The pydantic model to build
+        value: The partially populated value of the model
+
+    Returns:
+        The partially populated model, or None if none of its fields validate yet
+    """
+    if not isinstance(value, dict):
+        return None
+    fields = {}
+    for name, field in model.__fields__.items():
+        if field.alias not in value:
+            continue
+        raw = value[field.alias]
+        validated, errors = field.validate(raw, fields, loc=field.alias, cls=model)
+        if not errors:
+            fields[name] = validated
+        elif is_model(field.outer_type_):
+            nested = partial_model(field.outer_type_, raw)
+            if nested is not None:
+                fields[name] = nested
+    if not fields:
+        return None
+    return model.construct(_fields_set=set(fields), **fields)
@@ -13,56 +13,123 @@ the different LLM API providers as well as custom models have different APIs wit
 structures. For that reason, there are multiple implementations of operators, depending on the required use case.
 """
 
-from typing import Any, Callable, Dict, List, Optional, Type, overload, Iterator, Union
+import importlib
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    Union,
+    overload,
+)
 
-from declarai._base import BaseTask
+from declarai._base import BaseTask, ExecutionContext
+from declarai.cache.base import BaseLLMCache
 from declarai.middleware.base import TaskMiddleware
 from declarai.operators import (
     LLM,
     BaseOperator,
     LLMParamsType,
-    resolve_operator,
     LLMResponse,
+    ModelsOpenai,
+    resolve_operator,
 )
+from declarai.operators.routing import ModelLadder
+from declarai.operators.tokens import ContextOverflow
 from declarai.python_parser.parser import PythonParser
 
+DEFAULT_BATCH_CONCURRENCY = 8
+"The default number of LLM calls that are executed concurrently by `Task.batch`"
+
 
 class FutureTask:
     """
     A FutureTask is a wrapper around the task that is returned from the `plan` method.
     It used to create a lazy execution of the task, and to provide additional information about the task.
-    The only functionality that is provided by the FutureTask is the `__call__` method, which executes the task.
+    The FutureTask can either be executed synchronously by calling it, or be submitted to an executor and collected
+    later on, which allows running many planned tasks concurrently (see `gather`).
 
     Args:
         exec_func: the function to execute when the future task is called
         kwargs: the kwargs that were passed to the task
-        compiled_template: the compiled template that was populated by the task
+        compiled_template: the compiled template that was populated by the task, or a function that returns it.
+         When a function is provided, the template is only compiled when accessed.
         populated_prompt: the populated prompt that was populated by the task
 
     Methods:
         __call__: executes the task
+        submit: schedules the execution of the task on an executor
+        result: waits for the scheduled execution and returns its result
+        done: whether the scheduled execution has completed
     """
 
     def __init__(
         self,
         exec_func: Callable[[], Any],
         kwargs: Dict[str, Any],
-        compiled_template: str,
+        compiled_template: Union[str, Callable[[], str]],
         populated_prompt: str,
     ):
         self.exec_func = exec_func
         self.__populated_prompt = populated_prompt
         self.__compiled_template = compiled_template
         self.__kwargs = kwargs
+        self._future: Optional[Future] = None
+        self._submit_lock = threading.Lock()
 
     def __call__(self) -> Any:
         """
-        Calls the `exec_func` attribute of the FutureTask
+        Calls the `exec_func` attribute of the FutureTask.
+        If the FutureTask was already submitted, waits for the scheduled execution instead of executing it again.
         Returns:
             the response from the `exec_func`
         """
+        if self._future is not None:
+            return self._future.result()
         return self.exec_func()
 
+    def submit(self, executor: Optional[Executor] = None) -> "FutureTask":
+        """
+        Schedules the execution of the task. Submitting an already submitted FutureTask has no effect.
+        Args:
+            executor: the executor to run the task on. Defaults to a thread pool that is shared by all planned tasks.
+        Returns:
+            the FutureTask itself, to allow chaining `.submit().result()`
+        """
+        with self._submit_lock:
+            if self._future is None:
+                self._future = (executor or _default_executor()).submit(self.exec_func)
+        return self
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Returns the result of the task, submitting it first if it was not submitted yet.
+        Args:
+            timeout: the maximum number of seconds to wait for the result.
+        Returns:
+            the response from the `exec_func`
+        Raises:
+            concurrent.futures.TimeoutError: if the result is not available within the timeout.
+        """
+        return self.submit()._future.result(timeout)
+
+    def done(self) -> bool:
+        """
+        Returns whether the task was submitted and its execution has completed.
+        """
+        return self._future is not None and self._future.done()
+
     @property
     def populated_prompt(self) -> str:
         """
@@ -75,6 +142,8 @@ class FutureTask:
         """
         Returns the compiled template that was populated by the task
         """
+        if callable(self.__compiled_template):
+            self.__compiled_template = self.__compiled_template()
         return self.__compiled_template
 
     @property
@@ -85,6 +154,76 @@ class FutureTask:
         return self.__kwargs
 
 
+_DEFAULT_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_DEFAULT_EXECUTOR_LOCK = threading.Lock()
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    global _DEFAULT_EXECUTOR
+    with _DEFAULT_EXECUTOR_LOCK:
+        if _DEFAULT_EXECUTOR is None:
+            _DEFAULT_EXECUTOR = ThreadPoolExecutor(
+                max_workers=DEFAULT_BATCH_CONCURRENCY,
+                thread_name_prefix="declarai-plan",
+            )
+    return _DEFAULT_EXECUTOR
+
+
+def gather(
+    *futures: FutureTask,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Executes many planned tasks concurrently and collects their results.
+    Args:
+        *futures: the planned tasks, as returned from `Task.plan`
+        max_concurrency: the maximum number of tasks that are executed at the same time.
+         Defaults to executing all the tasks that were not submitted yet at once.
+        timeout: the maximum number of seconds to wait for all the results.
+        return_exceptions: if True, exceptions are returned in place of the failed task results instead of being raised.
+
+    Returns:
+        the results of the tasks in the same order as the provided futures
+
+    Example:
+        ```py
+        results = declarai.gather(
+            translate.plan(text="Hello"),
+            translate.plan(text="World"),
+        )
+        ```
+    """
+    pending = [future for future in futures if future._future is None]
+    executor = None
+    if pending:
+        executor = ThreadPoolExecutor(
+            max_workers=max_concurrency or len(pending),
+            thread_name_prefix="declarai-gather",
+        )
+        for future in pending:
+            future.submit(executor)
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    results = []
+    try:
+        for future in futures:
+            remaining = (
+                max(deadline - time.monotonic(), 0) if deadline is not None else None
+            )
+            try:
+                results.append(future.result(remaining))
+            except Exception as e:  # noqa
+                if not return_exceptions or isinstance(e, FutureTimeoutError):
+                    raise
+                results.append(e)
+    finally:
+        if executor:
+            executor.shutdown(wait=False)
+    return results
+
+
 class Task(BaseTask):
     """
     Initializes the Task
@@ -95,11 +234,9 @@ class Task(BaseTask):
 
     Attributes:
         operator: the operator to use to interact with the LLM
-        _call_kwargs: the kwargs that were passed to the task are set as attributes on the task and passed to the middlewares
     """
 
     is_declarai = True
-    _call_kwargs: Dict[str, Any]
 
     def __init__(
         self, operator: BaseOperator, middlewares: List[Type[TaskMiddleware]] = None
@@ -120,40 +257,71 @@ class Task(BaseTask):
         """
         return self.operator.compile(**kwargs)
 
-    def plan(self, **kwargs) -> FutureTask:
+    def plan(self, *, llm_params: LLMParamsType = None, **kwargs) -> FutureTask:
         """
         Populates the compiled template with the actual data.
+        The prompt is compiled once, and reused when the FutureTask is executed.
         Args:
+            llm_params: the params to pass to the LLM when the plan is executed.
             **kwargs: the data to populate the template with
         Returns:
              a FutureTask that can be used to execute the task in a lazy manner
         """
 
         populated_prompt = self.compile(**kwargs)
+        runtime_kwargs = self._runtime_kwargs(llm_params, dict(kwargs))
         return FutureTask(
-            self.__call__,
+            partial(self._exec_plan, populated_prompt, runtime_kwargs),
             kwargs=kwargs,
-            compiled_template=self.compile(),
+            compiled_template=self.compile,
             populated_prompt=populated_prompt,
         )
 
+    def _exec_plan(self, populated_prompt: Any, kwargs: Dict[str, Any]) -> Any:
+        """
+        Executes a planned task, reusing the prompt that was populated when the plan was created.
+        The prompt is passed through the middlewares in the execution context, so it is not compiled again.
+        """
+        with self._execution(ExecutionContext(kwargs, compiled=populated_prompt)):
+            return self._exec_middlewares(kwargs)
+
+    def _predict(self, kwargs: Dict[str, Any]) -> Any:
+        """
+        Executes the LLM, with the prompt of the execution context when it was compiled ahead of time.
+        """
+        context = self.execution_context
+        if context is not None and context.compiled is not None:
+            return self.operator.predict_compiled(
+                context.compiled, llm_params=kwargs.get("llm_params")
+            )
+        return self.operator.predict(**kwargs)
+
     def _exec(self, kwargs) -> Any:
         if self.operator.streaming:
-            stream = self.stream_handler(self.operator.predict(**kwargs))
+            stream = self.stream_handler(self._predict(kwargs))
             self.llm_stream_response = stream
             return self.llm_stream_response
         else:
-            self.llm_response = self.operator.predict(**kwargs)
+            self.llm_response = self._predict(kwargs)
             return self.operator.parse_output(self.llm_response.response)
 
-    def _exec_middlewares(self, kwargs) -> Any:
-        if self.middlewares:
-            exec_with_middlewares = None
-            for middleware in self.middlewares:
-                exec_with_middlewares = middleware(self, self._call_kwargs)
-            if exec_with_middlewares:
-                return exec_with_middlewares()
-        return self._exec(kwargs)
+    async def _aexec(self, kwargs) -> Any:
+        if self.operator.streaming:
+            stream = self.astream_handler(await self.operator.apredict(**kwargs))
+            self.llm_stream_response = stream
+            return self.llm_stream_response
+        else:
+            self.llm_response = await self.operator.apredict(**kwargs)
+            return self.operator.parse_output(self.llm_response.response)
+
+    def _runtime_kwargs(self, llm_params: LLMParamsType, kwargs: Dict[str, Any]):
+        runtime_llm_params = (
+            llm_params or self.llm_params
+        )  # order is important! We prioritize runtime params that
+        # were passed
+        if runtime_llm_params:
+            kwargs["llm_params"] = runtime_llm_params
+        return kwargs
 
     def __call__(
         self, *, llm_params: LLMParamsType = None, **kwargs
@@ -167,15 +335,162 @@ class Task(BaseTask):
         Returns: the user defined return type of the task
 
         """
-        runtime_llm_params = (
-            llm_params or self.llm_params
-        )  # order is important! We prioritize runtime params that
-        # were passed
-        if runtime_llm_params:
-            kwargs["llm_params"] = runtime_llm_params
+        return self.invoke(llm_params=llm_params, **kwargs).result
+
+    def invoke(self, *, llm_params: LLMParamsType = None, **kwargs) -> ExecutionContext:
+        """
+        Executes the task, and returns the context of the execution rather than only its result.
+        The context holds the result together with the response of the LLM of this specific call, which makes it the
+        safe way to access the response metadata when the task is called concurrently.
+        Args:
+            llm_params: the params to pass to the LLM. If provided, they will override the params that were passed during initialization
+            **kwargs: kwargs that are used to compile the template and populate the prompt.
+
+        Returns: the execution context, holding the result and the llm response of the call.
+         When streaming, the llm response is set once the stream is exhausted.
+
+        """
+        context = ExecutionContext(self._runtime_kwargs(llm_params, kwargs))
+        with self._execution(context):
+            context.result = self._exec_middlewares(context.kwargs)
+        return context
+
+    def __reduce__(self):
+        """
+        Tasks are pickled by reference, as the module and qualified name of the decorated function.
+        Unpickling imports the module and returns the task that is defined there, together with its LLM and
+        configuration. This allows sending tasks to worker processes. Only tasks that are defined at the top level of
+        a module can be pickled.
+        """
+        decorated = self.operator.parsed.decorated
+        module, qualname = decorated.__module__, decorated.__qualname__
+        try:
+            referenced = _load_task(module, qualname)
+        except Exception as e:  # noqa
+            referenced = e
+        if referenced is not self:
+            raise pickle.PicklingError(
+                f"Can't pickle task {qualname}: it is not the task found at {module}.{qualname}. "
+                "Only tasks that are defined at the top level of a module can be pickled."
+            )
+        return _load_task, (module, qualname)
+
+    def _exec_batch_item(self, kwargs: Dict[str, Any], llm_params: LLMParamsType):
+        try:
+            compiled = self.operator.compile(**kwargs)
+            llm_response = self.operator.predict_compiled(
+                compiled, llm_params=llm_params
+            )
+            return self.operator.parse_output(llm_response.response)
+        except Exception as e:  # noqa
+            return e
+
+    def batch(
+        self,
+        inputs: List[Dict[str, Any]],
+        *,
+        llm_params: LLMParamsType = None,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        executor: Union[str, Executor] = "thread",
+    ) -> List[Any]:
+        """
+        Executes the task for many input sets concurrently.
+        Every prompt is compiled once, and the calls to the LLM are dispatched over a bounded pool of workers.
+        A failure of a single item does not abort the batch, instead the raised exception is returned in place of
+        the item's result.
+        Middlewares are not executed for batched calls.
+        Args:
+            inputs: a list of kwargs, each used to compile the template and populate the prompt of a single call.
+            llm_params: the params to pass to the LLM. If provided, they will override the params that were passed during initialization
+            max_concurrency: the maximum number of LLM calls that are in flight at the same time.
+            executor: where the items are executed. "thread" runs them on a pool of threads. "process" runs them on a
+             pool of processes, so that CPU heavy prompt formatting and output parsing scale across cores. The task is
+             sent to the processes by reference, so it must be defined at the top level of a module. An `Executor`
+             instance is used as is, and is not shut down.
+
+        Returns: the results of the task in the same order as the inputs. Failed items hold the raised exception.
+
+        """
+        if self.operator.streaming:
+            raise ValueError("Batch execution is not supported for streaming tasks")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer")
+        if not inputs:
+            return []
+
+        runtime_llm_params = llm_params or self.llm_params
+        exec_item = partial(_exec_batch_item, self, runtime_llm_params)
+        if isinstance(executor, Executor):
+            return list(executor.map(exec_item, inputs))
+
+        max_workers = min(max_concurrency, len(inputs))
+        if executor == "thread":
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="declarai-batch"
+            ) as pool:
+                return list(pool.map(exec_item, inputs))
+        if executor == "process":
+            # Workers are spawned rather than forked, as forking a process that runs threads may deadlock.
+            # Spawned workers import the task by reference.
+            with ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                # Items are sent to the processes in chunks, to limit the overhead of inter process communication
+                chunksize = max(1, len(inputs) // (max_workers * 4))
+                return list(pool.map(exec_item, inputs, chunksize=chunksize))
+        raise ValueError(
+            f'executor must be "thread", "process" or an Executor, got {executor!r}'
+        )
+
+    async def acall(
+        self, *, llm_params: LLMParamsType = None, **kwargs
+    ) -> Union[Any, AsyncIterator[LLMResponse]]:
+        """
+        Orchestrates the execution of the task without blocking the running event loop.
+        Same as calling the task, but awaits the LLM asynchronously, so many tasks can be in flight on a single loop.
+        Args:
+            llm_params: the params to pass to the LLM. If provided, they will override the params that were passed during initialization
+            **kwargs: kwargs that are used to compile the template and populate the prompt.
 
-        self._call_kwargs = kwargs
-        return self._exec_middlewares(kwargs)
+        Returns: the user defined return type of the task, or an async iterator of responses when streaming
+
+        """
+        return (await self.ainvoke(llm_params=llm_params, **kwargs)).result
+
+    async def ainvoke(
+        self, *, llm_params: LLMParamsType = None, **kwargs
+    ) -> ExecutionContext:
+        """
+        Asynchronous version of `invoke`.
+        Args:
+            llm_params: the params to pass to the LLM. If provided, they will override the params that were passed during initialization
+            **kwargs: kwargs that are used to compile the template and populate the prompt.
+
+        Returns: the execution context, holding the result and the llm response of the call.
+
+        """
+        context = ExecutionContext(self._runtime_kwargs(llm_params, kwargs))
+        with self._execution(context):
+            context.result = await self._aexec_middlewares(context.kwargs)
+        return context
+
+
+def _exec_batch_item(
+    task: Task, llm_params: LLMParamsType, kwargs: Dict[str, Any]
+) -> Any:
+    return task._exec_batch_item(kwargs, llm_params)
+
+
+def _load_task(module: str, qualname: str) -> Task:
+    """
+    Returns the task that is defined in the module under the qualified name. Used to unpickle tasks.
+    """
+    task = importlib.import_module(module)
+    for name in qualname.split("."):
+        task = getattr(task, name)
+    if not isinstance(task, Task):
+        raise pickle.UnpicklingError(f"{module}.{qualname} is not a task")
+    return task
 
 
 class TaskDecorator:
@@ -183,13 +498,22 @@ class TaskDecorator:
     The TaskDecorator is used to create a task. It is used as a decorator on a function that will be used as a task.
     Args:
         llm_settings: the settings that define which LLM to use
+        cache: the default cache for the responses of the LLM, used by every task that does not define its own
+        compact_schema: whether tasks describe their expected output in a compact, token efficient format by default
         **kwargs: additional llm_settings like open_ai_api_key etc.
     Methods:
         task: the decorator that creates the task
     """
 
-    def __init__(self, llm: LLM):
+    def __init__(
+        self,
+        llm: LLM,
+        cache: Optional[BaseLLMCache] = None,
+        compact_schema: bool = False,
+    ):
         self.llm = llm
+        self.cache = cache
+        self.compact_schema = compact_schema
 
     @staticmethod
     @overload
@@ -205,6 +529,11 @@ class TaskDecorator:
         middlewares: List[Type[TaskMiddleware]] = None,
         llm_params: LLMParamsType = None,
         streaming: bool = None,
+        cache: Union[BaseLLMCache, bool] = None,
+        coalesce: bool = False,
+        compact_schema: bool = None,
+        context_overflow: ContextOverflow = "raise",
+        model_ladder: Union[ModelLadder, List[ModelsOpenai]] = None,
         **kwargs,
     ) -> Callable[[Callable], Task]:
         ...
@@ -216,6 +545,11 @@ class TaskDecorator:
         middlewares: List[Type[TaskMiddleware]] = None,
         llm_params: LLMParamsType = None,
         streaming: bool = None,
+        cache: Union[BaseLLMCache, bool] = None,
+        coalesce: bool = False,
+        compact_schema: bool = None,
+        context_overflow: ContextOverflow = "raise",
+        model_ladder: Union[ModelLadder, List[ModelsOpenai]] = None,
     ):
         """
         The decorator that creates the task
@@ -223,13 +557,29 @@ class TaskDecorator:
             func: the function to decorate that represents the task
             middlewares: middleware to use while executing the task
             llm_params: llm_params to use when calling the llm
-            streaming: whether to stream the response from the llm or not
+            streaming: whether to stream the response from the llm or not.
+             Pass "deltas" to stream an `LLMDelta` per chunk instead of the accumulated response.
+            cache: a cache for the responses of the llm. Defaults to the cache of the decorator,
+             pass `False` to disable caching for this task.
+            coalesce: whether identical calls that are in flight at the same time should share a single llm call.
+            compact_schema: whether to describe the expected output in a compact, token efficient format.
+             Defaults to the setting of the decorator.
+            context_overflow: what to do with prompts that do not fit the context window of the llm,
+             "raise" an error before the request is sent or "truncate" the prompt to fit.
+            model_ladder: models to route every call between, the cheapest first. Each call is sent to the first
+             model whose context window fits the prompt and the expected output.
 
         Returns:
             (Task): the task that was created
 
         """
         operator_type = resolve_operator(self.llm, operator_type="task")
+        if cache is None:
+            cache = self.cache
+        elif cache is False:
+            cache = None
+        if compact_schema is None:
+            compact_schema = self.compact_schema
 
         def wrap(_func: Callable) -> Task:
             operator = operator_type(
@@ -237,7 +587,14 @@ class TaskDecorator:
                 llm=self.llm,
                 llm_params=llm_params,
                 streaming=streaming,
+                cache=cache,
+                coalesce=coalesce,
+                compact_schema=compact_schema,
+                context_overflow=context_overflow,
+                model_ladder=model_ladder,
             )
+            # The static part of the prompt is compiled once, at decoration time
+            operator.prepare_template()
             llm_task = Task(operator=operator, middlewares=middlewares)
             llm_task.__name__ = _func.__name__
             return llm_task
@@ -70,3 +70,32 @@ def test_task_decorator_no_args(mocked_resolve_operator, mocked_python_parser):
     passed_llm_params = operator_class_mock.call_args.kwargs["llm_params"]
     assert passed_llm_params == {"temperature": 0.5}
     operator_instance_mock.predict.assert_called_with(llm_params={"temperature": 0.7})
+
+
+@patch("declarai.task.PythonParser")
+@patch("declarai.task.resolve_operator")
+def test_task_decorator_cache(mocked_resolve_operator, mocked_python_parser):
+    operator_class_mock = MagicMock()
+    mocked_resolve_operator.return_value = operator_class_mock
+    global_cache = MagicMock()
+    task_cache = MagicMock()
+
+    decorator = TaskDecorator(llm=MagicMock(), cache=global_cache).task
+
+    @decorator
+    def test_task(a: str) -> str:
+        ...
+
+    assert operator_class_mock.call_args.kwargs["cache"] == global_cache
+
+    @decorator(cache=task_cache)
+    def test_task(a: str) -> str:
+        ...
+
+    assert operator_class_mock.call_args.kwargs["cache"] == task_cache
+
+    @decorator(cache=False)
+    def test_task(a: str) -> str:
+        ...
+
+    assert operator_class_mock.call_args.kwargs["cache"] is None
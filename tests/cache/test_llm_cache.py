@@ -0,0 +1,133 @@
+from unittest.mock import MagicMock, patch
+
+from declarai import Declarai
+from declarai.cache import InMemoryLLMCache, SQLiteLLMCache, llm_cache_key
+from declarai.operators import LLMResponse, Message, MessageRole, OpenAITaskOperator
+from declarai.python_parser.parser import PythonParser
+
+
+def _llm(model: str = "gpt-3.5-turbo"):
+    llm = MagicMock()
+    llm.provider = "openai"
+    llm.model = model
+    llm.streaming = False
+    return llm
+
+
+def _compiled(message: str):
+    return {"messages": [Message(message=message, role=MessageRole.user)]}
+
+
+def test_llm_cache_key():
+    llm = _llm()
+    key = llm_cache_key(llm, _compiled("hello"), {"temperature": 0})
+    assert key == llm_cache_key(llm, _compiled("hello"), {"temperature": 0})
+    assert key == llm_cache_key(
+        llm, _compiled("hello"), {"temperature": 0, "stream": False}
+    )
+    assert key != llm_cache_key(llm, _compiled("world"), {"temperature": 0})
+    assert key != llm_cache_key(llm, _compiled("hello"), {"temperature": 1})
+    assert key != llm_cache_key(_llm("gpt-4"), _compiled("hello"), {"temperature": 0})
+
+
+def test_in_memory_cache_lru_eviction():
+    cache = InMemoryLLMCache(max_size=2)
+    cache.set("a", LLMResponse(response="a"))
+    cache.set("b", LLMResponse(response="b"))
+    assert cache.get("a").response == "a"  # "b" is now the least recently used
+    cache.set("c", LLMResponse(response="c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").response == "a"
+    assert cache.get("c").response == "c"
+    cache.clear()
+    assert len(cache) == 0
+
+
+@patch("declarai.cache.in_memory.time.monotonic")
+def test_in_memory_cache_ttl(mocked_monotonic):
+    cache = InMemoryLLMCache(ttl=10)
+    mocked_monotonic.return_value = 100
+    cache.set("a", LLMResponse(response="a"))
+    mocked_monotonic.return_value = 105
+    assert cache.get("a").response == "a"
+    mocked_monotonic.return_value = 111
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SQLiteLLMCache(path)
+    cache.set("a", LLMResponse(response="a", model="gpt-3.5-turbo", total_tokens=3))
+
+    persisted = SQLiteLLMCache(path).get("a")
+    assert persisted == LLMResponse(response="a", model="gpt-3.5-turbo", total_tokens=3)
+    assert cache.get("missing") is None
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_operator_cache():
+    llm = _llm()
+    llm.predict.return_value = LLMResponse(response="cached")
+
+    def openai_task(argument: str) -> str:
+        """
+        This is a test task
+        :param argument: this is a test argument
+        """
+
+    operator = OpenAITaskOperator(
+        parsed=PythonParser(openai_task), llm=llm, cache=InMemoryLLMCache()
+    )
+    assert operator.predict(argument="a").response == "cached"
+    assert operator.predict(argument="a").response == "cached"
+    assert llm.predict.call_count == 1
+
+    operator.predict(argument="b")
+    assert llm.predict.call_count == 2
+
+    operator._call_streaming = True
+    operator.predict(argument="a")
+    assert llm.predict.call_count == 3
+
+
+def test_in_memory_cache_returns_copies():
+    cache = InMemoryLLMCache()
+    response = LLMResponse(response="a")
+    cache.set("a", response)
+    response.response = "changed by the caller"
+
+    hit = cache.get("a")
+    hit.response = "changed by the first hit"
+    assert cache.get("a").response == "a"
+
+
+@patch("declarai.declarai.resolve_llm")
+def test_chat_uses_the_context_cache(mock_resolve_llm):
+    llm = _llm()
+    llm.predict.return_value = LLMResponse(response="cached")
+    mock_resolve_llm.return_value = llm
+    declarai = Declarai(
+        provider="openai", model="gpt-3.5-turbo", cache=InMemoryLLMCache()
+    )
+
+    @declarai.experimental.chat
+    class CachedChat:
+        """
+        This is a test chat.
+        """
+
+    assert CachedChat().send("hello") == "cached"
+    assert CachedChat().send("hello") == "cached"
+    assert llm.predict.call_count == 1
+
+    @declarai.experimental.chat(cache=False)
+    class UncachedChat:
+        """
+        This is a test chat.
+        """
+
+    UncachedChat().send("hello")
+    UncachedChat().send("hello")
+    assert llm.predict.call_count == 3
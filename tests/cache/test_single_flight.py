@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from declarai.cache import SingleFlight
+from declarai.operators import LLMResponse, OpenAITaskOperator
+from declarai.python_parser.parser import PythonParser
+
+
+def test_single_flight_threads():
+    single_flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def func():
+        calls.append(1)
+        release.wait(timeout=1)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(single_flight.do, "key", func) for _ in range(5)]
+        time.sleep(0.1)  # let all the callers join the in flight call
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert single_flight.do("key", lambda: "new-result") == "new-result"
+
+
+def test_single_flight_threads_error():
+    single_flight = SingleFlight()
+
+    def func():
+        raise RuntimeError("failure")
+
+    with pytest.raises(RuntimeError):
+        single_flight.do("key", func)
+    assert single_flight.do("key", lambda: "result") == "result"
+
+
+def test_single_flight_coroutines():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(
+            *[single_flight.ado("key", func) for _ in range(5)],
+            single_flight.ado("other-key", func),
+        )
+
+    assert asyncio.run(run()) == ["result"] * 6
+    assert len(calls) == 2
+
+
+def test_operator_coalesce():
+    llm = MagicMock()
+    llm.provider = "openai"
+    llm.model = "gpt-3.5-turbo"
+    llm.streaming = False
+
+    async def apredict(**_):
+        await asyncio.sleep(0.01)
+        return LLMResponse(response="coalesced")
+
+    llm.apredict = AsyncMock(side_effect=apredict)
+
+    def openai_task(argument: str) -> str:
+        """
+        This is a test task
+        :param argument: this is a test argument
+        """
+
+    operator = OpenAITaskOperator(
+        parsed=PythonParser(openai_task), llm=llm, coalesce=True
+    )
+
+    async def run():
+        return await asyncio.gather(
+            *[operator.apredict(argument="a") for _ in range(3)]
+        )
+
+    responses = asyncio.run(run())
+    assert [r.response for r in responses] == ["coalesced"] * 3
+    assert llm.apredict.await_count == 1
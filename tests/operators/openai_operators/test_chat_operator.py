@@ -24,6 +24,10 @@ def test_chat_openai_operator():
     assert messages[0].message == "This is my beloved chat"
     assert messages[0].role == "system"
 
+    openai_operator_instance.system = "This is my updated chat"
+    compiled = openai_operator_instance.compile(messages=[])
+    assert compiled["messages"][0].message == "This is my updated chat"
+
     # def openai_task():
     #     ...
     #
@@ -0,0 +1,195 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import openai.error
+import pytest
+from openai.openai_object import OpenAIObject
+
+from declarai.operators import (
+    LLMStream,
+    Message,
+    MessageRole,
+    OpenAILLM,
+    RetryPolicy,
+)
+
+
+def _completion(content: str) -> OpenAIObject:
+    return OpenAIObject.construct_from(
+        {
+            "model": "test-model",
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        }
+    )
+
+
+def _chunk(delta: dict) -> OpenAIObject:
+    return OpenAIObject.construct_from(
+        {"model": "test-model", "choices": [{"delta": delta}]}
+    )
+
+
+@patch("openai.ChatCompletion.acreate", new_callable=AsyncMock)
+def test_openai_llm_apredict(mocked_acreate):
+    mocked_acreate.return_value = _completion("async-result")
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+
+    res = asyncio.run(
+        llm.apredict(messages=[Message(message="hello", role=MessageRole.user)])
+    )
+    assert res.response == "async-result"
+    assert res.total_tokens == 3
+    assert mocked_acreate.call_args.kwargs["messages"] == [
+        {"role": "user", "content": "hello"}
+    ]
+    assert mocked_acreate.call_args.kwargs["api_key"] == "test-token"
+
+
+@patch("openai.ChatCompletion.acreate", new_callable=AsyncMock)
+def test_openai_llm_apredict_streaming(mocked_acreate):
+    async def stream():
+        yield _chunk({"role": "assistant", "content": "as"})
+        yield _chunk({"content": "ync"})
+
+    mocked_acreate.return_value = stream()
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+
+    async def consume():
+        res = await llm.apredict(
+            messages=[Message(message="hello", role=MessageRole.user)], stream=True
+        )
+        return [chunk.response async for chunk in res]
+
+    assert asyncio.run(consume()) == ["as", "async"]
+
+
+@patch("openai.ChatCompletion.create")
+def test_openai_llm_predict_streaming_deltas(mocked_create):
+    mocked_create.return_value = iter(
+        [
+            _chunk({"role": "assistant", "content": ""}),
+            _chunk({"content": "del"}),
+            _chunk({"content": "tas"}),
+        ]
+    )
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+
+    res = llm.predict(
+        messages=[Message(message="hello", role=MessageRole.user)], stream="deltas"
+    )
+    assert isinstance(res, LLMStream)
+    assert [delta.content for delta in res] == ["", "del", "tas"]
+    assert mocked_create.call_args.kwargs["stream"] is True
+    assert res.response.response == "deltas"
+    assert res.response.model == "test-model"
+    assert res.response is res.response
+
+
+@patch("openai.ChatCompletion.acreate", new_callable=AsyncMock)
+def test_openai_llm_apredict_streaming_deltas(mocked_acreate):
+    async def stream():
+        yield _chunk({"role": "assistant", "content": "as"})
+        yield _chunk({"content": "ync"})
+
+    mocked_acreate.return_value = stream()
+    llm = OpenAILLM(openai_token="test-token", model="test-model", stream="deltas")
+
+    async def consume():
+        res = await llm.apredict(
+            messages=[Message(message="hello", role=MessageRole.user)]
+        )
+        return [delta.content async for delta in res], res.response
+
+    contents, response = asyncio.run(consume())
+    assert contents == ["as", "ync"]
+    assert response.response == "async"
+
+
+@patch("openai.ChatCompletion.create")
+def test_openai_llm_rate_limiter(mocked_create):
+    mocked_create.return_value = _completion("result")
+    rate_limiter = MagicMock()
+    rate_limiter.acquire.side_effect = lambda tokens: tokens
+    llm = OpenAILLM(
+        openai_token="test-token", model="test-model", rate_limiter=rate_limiter
+    )
+
+    llm.predict(
+        messages=[Message(message="a" * 40, role=MessageRole.user)], max_tokens=100
+    )
+    rate_limiter.acquire.assert_called_once_with(114)
+    rate_limiter.reconcile.assert_called_once_with(114, 3)
+
+
+@pytest.mark.parametrize("stream", [True, "deltas"])
+@patch("openai.ChatCompletion.create")
+def test_openai_llm_rate_limiter_reconciles_streams(mocked_create, stream):
+    mocked_create.return_value = iter(
+        [
+            _chunk({"role": "assistant", "content": "b" * 20}),
+            _chunk({"content": "b" * 20}),
+        ]
+    )
+    rate_limiter = MagicMock()
+    llm = OpenAILLM(
+        openai_token="test-token", model="test-model", rate_limiter=rate_limiter
+    )
+
+    res = llm.predict(
+        messages=[Message(message="a" * 40, role=MessageRole.user)],
+        max_tokens=100,
+        stream=stream,
+    )
+    rate_limiter.acquire.assert_called_once_with(114)
+    rate_limiter.reconcile.assert_not_called()
+
+    list(res)
+    rate_limiter.reconcile.assert_called_once_with(114, 14 + 10)
+
+
+@patch("declarai.operators.retry.time.sleep")
+@patch("openai.ChatCompletion.create")
+def test_openai_llm_retry_policy(mocked_create, mocked_sleep):
+    mocked_create.side_effect = [
+        openai.error.RateLimitError("rate limited"),
+        _completion("result"),
+    ]
+    llm = OpenAILLM(
+        openai_token="test-token",
+        model="test-model",
+        retry_policy=RetryPolicy(max_attempts=2),
+    )
+
+    res = llm.predict(messages=[Message(message="hello", role=MessageRole.user)])
+    assert res.response == "result"
+    assert mocked_create.call_count == 2
+    mocked_sleep.assert_called_once()
+
+
+@patch("declarai.operators.retry.time.sleep")
+@patch("openai.ChatCompletion.create")
+def test_openai_llm_rate_limiter_reserves_once_per_call(mocked_create, mocked_sleep):
+    mocked_create.side_effect = [
+        openai.error.RateLimitError("rate limited"),
+        _completion("result"),
+    ]
+    rate_limiter = MagicMock()
+    llm = OpenAILLM(
+        openai_token="test-token",
+        model="test-model",
+        rate_limiter=rate_limiter,
+        retry_policy=RetryPolicy(max_attempts=2),
+    )
+    messages = [Message(message="a" * 40, role=MessageRole.user)]
+
+    llm.predict(messages=messages, max_tokens=100)
+    rate_limiter.acquire.assert_called_once_with(114)
+    rate_limiter.reconcile.assert_called_once_with(114, 3)
+
+    rate_limiter.reset_mock()
+    mocked_create.side_effect = openai.error.RateLimitError("rate limited")
+    with pytest.raises(openai.error.RateLimitError):
+        llm.predict(messages=messages, max_tokens=100)
+    rate_limiter.acquire.assert_called_once_with(114)
+    rate_limiter.reconcile.assert_called_once_with(114, 0)
@@ -1,3 +1,5 @@
+from unittest.mock import MagicMock, patch
+
 from declarai.operators import OpenAILLM, OpenAITaskOperator
 from declarai.python_parser.parser import PythonParser
 
@@ -40,3 +42,60 @@ def test_openai_operator():
     assert len(messages) == 1
     assert messages[0].message == "\n\n"
     assert messages[0].role == "user"
+
+
+def test_openai_operator_compiles_template_once():
+    llm = OpenAILLM(
+        openai_token="test-token",
+        model="test-model",
+    )
+
+    def openai_task(argument: str) -> str:
+        """
+        This is a test task
+        :param argument: this is a test argument
+        """
+
+    openai_operator_instance = OpenAITaskOperator(
+        parsed=PythonParser(openai_task), llm=llm
+    )
+    with patch.object(
+        OpenAITaskOperator,
+        "compile_template",
+        wraps=openai_operator_instance.compile_template,
+    ) as compile_template:
+        first = openai_operator_instance.compile(argument="first")["messages"]
+        second = openai_operator_instance.compile(argument="second")["messages"]
+        template = openai_operator_instance.compile()["messages"]
+
+    compile_template.assert_called_once()
+    assert first[-1].message == "This is a test task\nInputs:\nargument: first\n\n"
+    assert second[-1].message == "This is a test task\nInputs:\nargument: second\n\n"
+    assert (
+        template[-1].message == "This is a test task\nInputs:\nargument: {argument}\n\n"
+    )
+
+
+def test_openai_operator_does_not_mutate_llm_params():
+    llm = MagicMock()
+    llm.streaming = False
+
+    def openai_task() -> str:
+        """
+        This is a test task
+        """
+
+    llm_params = {"temperature": 0.5}
+    operator = OpenAITaskOperator(
+        parsed=PythonParser(openai_task),
+        llm=llm,
+        llm_params=llm_params,
+        streaming=True,
+    )
+    runtime_llm_params = {"temperature": 0.7}
+    operator.predict(llm_params=runtime_llm_params)
+
+    assert llm.predict.call_args.kwargs["stream"] is True
+    assert llm.predict.call_args.kwargs["temperature"] == 0.7
+    assert runtime_llm_params == {"temperature": 0.7}
+    assert operator.llm_params == {"temperature": 0.5}
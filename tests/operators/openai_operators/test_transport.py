@@ -0,0 +1,127 @@
+import asyncio
+from unittest.mock import patch
+
+import openai
+from openai import api_requestor
+
+from declarai.operators import HTTPTransport, Message, MessageRole, OpenAILLM
+from declarai.operators.openai_operators.openai_llm import BaseOpenAILLM
+
+from .test_openai_llm import _completion
+
+
+def test_transport_bind_restores_thread_session():
+    transport = HTTPTransport(pool_size=4)
+    previous = getattr(api_requestor._thread_context, "session", None)
+
+    with transport.bind() as session:
+        assert api_requestor._thread_context.session is session
+        assert session is transport.session
+        adapter = session.get_adapter("https://api.openai.com")
+        assert adapter._pool_maxsize == 4
+
+    assert getattr(api_requestor._thread_context, "session", None) is previous
+    transport.close()
+
+
+def test_transport_request_timeout():
+    assert HTTPTransport().request_timeout is None
+    assert HTTPTransport(connect_timeout=2, read_timeout=30).request_timeout == (2, 30)
+
+    llm = OpenAILLM(
+        openai_token="test-token",
+        model="test-model",
+        transport=HTTPTransport(connect_timeout=2, read_timeout=30),
+    )
+    assert llm._kwargs["request_timeout"] == (2, 30)
+    assert BaseOpenAILLM._with_deadline(llm._kwargs, 10)["request_timeout"] == (2, 10)
+
+
+def test_openai_llm_predict_reuses_transport_session():
+    transport = HTTPTransport()
+    llm = OpenAILLM(openai_token="test-token", model="test-model", transport=transport)
+    sessions = []
+
+    def create(**kwargs):
+        sessions.append(api_requestor._thread_context.session)
+        return _completion("result")
+
+    with patch("openai.ChatCompletion.create", side_effect=create):
+        for _ in range(2):
+            llm.predict(messages=[Message(message="hello", role=MessageRole.user)])
+
+    assert sessions == [transport.session, transport.session]
+    transport.close()
+
+
+def test_openai_llm_apredict_reuses_transport_session():
+    transport = HTTPTransport()
+    llm = OpenAILLM(openai_token="test-token", model="test-model", transport=transport)
+    sessions = []
+
+    async def acreate(**kwargs):
+        sessions.append(openai.aiosession.get())
+        return _completion("result")
+
+    async def run():
+        with patch("openai.ChatCompletion.acreate", side_effect=acreate):
+            await asyncio.gather(
+                *[
+                    llm.apredict(
+                        messages=[Message(message="hello", role=MessageRole.user)]
+                    )
+                    for _ in range(3)
+                ]
+            )
+        assert openai.aiosession.get() is None
+        await transport.aclose()
+
+    asyncio.run(run())
+    assert len(sessions) == 3
+    assert sessions[0] is not None
+    assert all(session is sessions[0] for session in sessions)
+
+
+def test_openai_llm_default_transport():
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+    assert isinstance(llm.transport, HTTPTransport)
+
+    llm = OpenAILLM(openai_token="test-token", model="test-model", transport=False)
+    assert llm.transport is None
+
+
+def test_openai_llm_close_releases_sessions_of_every_loop():
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+    sessions = []
+
+    async def acreate(**kwargs):
+        sessions.append(openai.aiosession.get())
+        return _completion("result")
+
+    with patch("openai.ChatCompletion.acreate", side_effect=acreate):
+        for _ in range(2):
+            asyncio.run(
+                llm.apredict(messages=[Message(message="hello", role=MessageRole.user)])
+            )
+    assert sessions[0] is not sessions[1]
+    # The session of the first loop is closed once the transport is used by the next loop
+    assert sessions[0].closed
+
+    blocking_session = llm.transport.session
+    llm.close()
+    assert sessions[1].closed
+    assert llm.transport._session is None
+    assert llm.transport.session is not blocking_session
+    llm.close()
+
+
+def test_openai_llm_aclose():
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+
+    async def run():
+        async with llm.transport.abind() as session:
+            pass
+        await llm.aclose()
+        return session
+
+    assert asyncio.run(run()).closed
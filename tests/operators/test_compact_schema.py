@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from declarai.evals.schema_tokens import measure_schema_tokens
+from declarai.operators import OpenAILLM
+from declarai.python_parser.type_annotation_to_schema import (
+    type_annotation_to_compact_str_schema,
+)
+from declarai.task import TaskDecorator
+
+
+class Address(BaseModel):
+    city: str
+    zip_code: Optional[int] = Field(description="The zip code")
+
+
+class Person(BaseModel):
+    name: str
+    home: Address
+    work: Address
+    tags: Dict[str, int]
+
+
+def test_compact_str_schema():
+    assert type_annotation_to_compact_str_schema(int) == "int"
+    assert type_annotation_to_compact_str_schema(List[str]) == "List[str]"
+    assert type_annotation_to_compact_str_schema(List[Address]) == (
+        'List[{{"city":str,"zip_code":int - The zip code}}]'
+    )
+    assert type_annotation_to_compact_str_schema(Person) == (
+        '{{"name":str,"home":Address,"work":Address,"tags":{{str:int}}}} '
+        'where Address={{"city":str,"zip_code":int - The zip code}}'
+    )
+
+
+def people() -> List[Person]:
+    """
+    List people
+    """
+
+
+def test_compact_schema_selection():
+    llm = OpenAILLM(openai_token="test-token", model="test-model")
+    compact_task = TaskDecorator(llm, compact_schema=True).task
+    verbose_task = TaskDecorator(llm).task
+
+    compact_prompt = compact_task(people).compile()["messages"][0].message
+    assert "where Address=" in compact_prompt
+    assert compact_task(compact_schema=False)(people).compile() == (
+        verbose_task(people).compile()
+    )
+    assert verbose_task(compact_schema=True)(people).compile() == (
+        compact_task(people).compile()
+    )
+    assert len(compact_prompt) < len(
+        verbose_task(people).compile()["messages"][0].message
+    )
+
+
+def test_compact_schema_saves_tokens_on_evals():
+    results = measure_schema_tokens()
+
+    assert all(result.compact_tokens <= result.verbose_tokens for result in results)
+    assert sum(result.compact_tokens for result in results) < sum(
+        result.verbose_tokens for result in results
+    )
@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+from declarai.operators.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_requests_per_minute():
+    clock = FakeClock()
+    with patch("declarai.operators.rate_limiter.time", clock):
+        limiter = RateLimiter(requests_per_minute=2)
+        limiter.acquire()
+        limiter.acquire()
+        assert clock.sleeps == []
+
+        limiter.acquire()  # the bucket refills a request every 30 seconds
+        assert clock.now == 30
+
+
+def test_rate_limiter_tokens_per_minute_reconcile():
+    clock = FakeClock()
+    with patch("declarai.operators.rate_limiter.time", clock):
+        limiter = RateLimiter(tokens_per_minute=600)
+        reserved = limiter.acquire(500)
+        limiter.reconcile(reserved, used_tokens=100)  # 500 tokens are available again
+
+        limiter.acquire(500)
+        assert clock.sleeps == []
+
+        limiter.acquire(200)  # the bucket is empty, 10 tokens refill every second
+        assert clock.now == 20
@@ -0,0 +1,96 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from declarai.operators import RetryPolicy
+
+
+class TransientError(Exception):
+    def __init__(self, http_status=None, headers=None):
+        super().__init__("transient")
+        self.http_status = http_status
+        self.headers = headers or {}
+
+
+@patch("declarai.operators.retry.time.sleep")
+def test_retry_policy_retries_transient_errors(mocked_sleep):
+    func = MagicMock(side_effect=[TransientError(http_status=503), "result"])
+    policy = RetryPolicy(max_attempts=3, initial_backoff=1, jitter=False)
+
+    assert policy.call(func) == "result"
+    assert func.call_count == 2
+    mocked_sleep.assert_called_once_with(1)
+
+
+@patch("declarai.operators.retry.time.sleep")
+def test_retry_policy_max_attempts(mocked_sleep):
+    func = MagicMock(side_effect=TransientError(http_status=429))
+    policy = RetryPolicy(max_attempts=3, initial_backoff=1, jitter=False)
+
+    with pytest.raises(TransientError):
+        policy.call(func)
+    assert func.call_count == 3
+    assert [c.args[0] for c in mocked_sleep.call_args_list] == [1, 2]
+
+
+def test_retry_policy_non_retryable_error():
+    func = MagicMock(side_effect=ValueError("bad request"))
+    with pytest.raises(ValueError):
+        RetryPolicy().call(func)
+    assert func.call_count == 1
+
+    func = MagicMock(side_effect=[ValueError("retry me"), "result"])
+    with patch("declarai.operators.retry.time.sleep"):
+        assert RetryPolicy().call(func, retry_on=(ValueError,)) == "result"
+
+
+@patch("declarai.operators.retry.time.sleep")
+def test_retry_policy_retry_after(mocked_sleep):
+    error = TransientError(http_status=429, headers={"retry-after": "7"})
+    func = MagicMock(side_effect=[error, "result"])
+
+    assert RetryPolicy().call(func) == "result"
+    mocked_sleep.assert_called_once_with(7.0)
+
+
+@pytest.mark.parametrize(
+    "retry_after, expected_delay",
+    [("60", 60.0), ("0.1", 1)],
+)
+@patch("declarai.operators.retry.time.sleep")
+def test_retry_policy_retry_after_is_a_lower_bound(
+    mocked_sleep, retry_after, expected_delay
+):
+    error = TransientError(http_status=429, headers={"retry-after": retry_after})
+    func = MagicMock(side_effect=[error, "result"])
+    policy = RetryPolicy(initial_backoff=1, max_backoff=30, jitter=False)
+
+    assert policy.call(func) == "result"
+    mocked_sleep.assert_called_once_with(expected_delay)
+
+
+@patch("declarai.operators.retry.time")
+def test_retry_policy_deadline(mocked_time):
+    mocked_time.monotonic.return_value = 100
+    func = MagicMock(side_effect=TransientError(http_status=503))
+    policy = RetryPolicy(max_attempts=10, initial_backoff=5, jitter=False, deadline=3)
+
+    with pytest.raises(TransientError):
+        policy.call(func)
+    func.assert_called_once_with(3)  # the remaining time is passed to the attempt
+    mocked_time.sleep.assert_not_called()
+
+
+def test_retry_policy_async():
+    calls = []
+
+    async def func(remaining_time):
+        calls.append(remaining_time)
+        if len(calls) == 1:
+            raise TransientError(http_status=500)
+        return "result"
+
+    policy = RetryPolicy(initial_backoff=0.001)
+    assert asyncio.run(policy.acall(func)) == "result"
+    assert calls == [None, None]
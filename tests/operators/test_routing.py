@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from declarai.chat import ChatDecorator
+from declarai.operators import (
+    AzureOpenAILLM,
+    ContextWindowExceededError,
+    LLMResponse,
+    Message,
+    MessageRole,
+    ModelLadder,
+    OpenAILLM,
+)
+from declarai.task import TaskDecorator
+
+from .openai_operators.test_openai_llm import _completion
+
+LADDER = ["gpt-3.5-turbo", "gpt-3.5-turbo-16k", "gpt-4-32k"]
+
+
+def _llm() -> OpenAILLM:
+    llm = OpenAILLM(openai_token="test-token", model="gpt-3.5-turbo-16k")
+    llm.predict = MagicMock(return_value=LLMResponse(response="result"))
+    return llm
+
+
+def test_model_ladder_select():
+    llm = _llm()
+    ladder = ModelLadder(LADDER, expected_output_tokens=100)
+
+    assert ladder.select(llm, 1000) == ("gpt-3.5-turbo", 4096)
+    assert ladder.select(llm, 4000) == ("gpt-3.5-turbo-16k", 16384)
+    assert ladder.select(llm, 1000, max_tokens=4000) == ("gpt-3.5-turbo-16k", 16384)
+    assert ladder.select(llm, 20000) == ("gpt-4-32k", 32768)
+    assert ladder.select(llm, 40000) == ("gpt-4-32k", 32768)
+
+
+def test_model_ladder_unknown_models():
+    llm = _llm()
+    ladder = ModelLadder(["small-deployment", "gpt-3.5-turbo-16k"])
+    assert ladder.select(llm, 100)[0] == "gpt-3.5-turbo-16k"
+
+    ladder = ModelLadder(
+        ["small-deployment", "gpt-3.5-turbo-16k"],
+        context_windows={"small-deployment": 2048},
+    )
+    assert ladder.select(llm, 100) == ("small-deployment", 2048)
+
+    with pytest.raises(ValueError):
+        ModelLadder([])
+
+
+def test_task_routes_by_prompt_size():
+    llm = _llm()
+    task = TaskDecorator(llm).task(model_ladder=LADDER)
+
+    @task
+    def summarize(text: str):
+        """
+        Summarize the text
+        :param text: the text
+        """
+
+    summarize(text="short")
+    kwargs = llm.predict.call_args.kwargs
+    assert kwargs["model"] == "gpt-3.5-turbo"
+    assert "max_tokens" not in kwargs
+
+    summarize(text="long " * 4000)
+    assert llm.predict.call_args.kwargs["model"] == "gpt-3.5-turbo-16k"
+
+    with pytest.raises(ContextWindowExceededError):
+        summarize(text="longest " * 20000)
+
+
+def test_chat_routes_by_conversation_size():
+    llm = _llm()
+    chat = ChatDecorator(llm).chat(model_ladder=ModelLadder(LADDER))
+
+    @chat
+    class Assistant:
+        """
+        You are a helpful assistant
+        """
+
+    assistant = Assistant()
+    assistant.send("hello")
+    assert llm.predict.call_args.kwargs["model"] == "gpt-3.5-turbo"
+    assert llm.predict.call_args.kwargs["messages"][-1] == Message(
+        message="hello", role=MessageRole.user
+    )
+
+
+@patch("openai.ChatCompletion.create")
+def test_azure_routes_by_deployment(mocked_create):
+    mocked_create.return_value = _completion("result")
+    llm = AzureOpenAILLM(
+        azure_openai_key="test-key",
+        azure_openai_api_base="https://test.openai.azure.com",
+        model="small-deployment",
+    )
+    ladder = ModelLadder(
+        ["small-deployment", "large-deployment"],
+        context_windows={"small-deployment": 4096, "large-deployment": 16384},
+    )
+    task = TaskDecorator(llm).task(model_ladder=ladder)
+
+    @task
+    def summarize(text: str):
+        """
+        Summarize the text
+        :param text: the text
+        """
+
+    summarize(text="short")
+    assert mocked_create.call_args.kwargs["engine"] == "small-deployment"
+
+    summarize(text="long " * 4000)
+    kwargs = mocked_create.call_args.kwargs
+    assert kwargs["engine"] == "large-deployment"
+    assert kwargs["model"] == "large-deployment"
@@ -0,0 +1,143 @@
+import base64
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from declarai.operators import (
+    BPETokenCounter,
+    CharacterTokenCounter,
+    ContextWindowExceededError,
+    LLMResponse,
+    Message,
+    MessageRole,
+    OpenAILLM,
+)
+from declarai.operators.openai_operators.openai_llm import openai_context_window
+from declarai.operators.operator import BaseOperator
+from declarai.operators.tokens import truncate_messages
+
+from .openai_operators.test_openai_llm import _completion
+
+
+def _ranks(*merges: bytes) -> dict:
+    ranks = {bytes([i]): i for i in range(256)}
+    for merge in merges:
+        ranks[merge] = len(ranks)
+    return ranks
+
+
+def _messages(*texts: str) -> list:
+    return [Message(message="s" * 40, role=MessageRole.system)] + [
+        Message(message=text, role=MessageRole.user) for text in texts
+    ]
+
+
+def test_character_token_counter():
+    messages = _messages("a" * 40, "b" * 8)
+    assert CharacterTokenCounter().count_messages(messages) == (
+        (10 + 4) + (10 + 4) + (2 + 4)
+    )
+
+
+def test_bpe_token_counter():
+    counter = BPETokenCounter(_ranks(b"he", b"ll", b"hell", b"hello", b" w"))
+    assert counter.count("hello") == 1
+    assert counter.count("help") == 3  # he, l, p
+    assert counter.count("hello world") == 1 + 5  # hello, " w", o, r, l, d
+    assert counter.count("") == 0
+
+
+def test_bpe_token_counter_from_file(tmp_path):
+    ranks = _ranks(b"ab", b"abc")
+    ranks_file = tmp_path / "test.tiktoken"
+    ranks_file.write_text(
+        "\n".join(
+            f"{base64.b64encode(token).decode()} {rank}"
+            for token, rank in ranks.items()
+        )
+    )
+
+    counter = BPETokenCounter.from_file(str(ranks_file))
+    assert counter.mergeable_ranks == ranks
+    assert counter.count("abcab") == 2
+
+
+def test_openai_context_window():
+    assert openai_context_window("gpt-4") == 8192
+    assert openai_context_window("gpt-3.5-turbo-0613") == 4096
+    assert openai_context_window("gpt-3.5-turbo-16k-0613") == 16384
+    assert openai_context_window("my-deployment") is None
+
+
+def test_truncate_messages():
+    counter = CharacterTokenCounter()
+    messages = _messages("a" * 40, "b" * 40, "c" * 40)
+
+    truncated = truncate_messages(messages, counter, 42)
+    assert [m.message[0] for m in truncated] == ["s", "b", "c"]
+
+    truncated = truncate_messages(messages, counter, 25)
+    assert [m.message[0] for m in truncated] == ["s", "c"]
+    assert counter.count_messages(truncated) <= 25
+
+    with pytest.raises(ContextWindowExceededError):
+        truncate_messages(messages, counter, 10)
+
+
+def _operator(context_window: int, **kwargs) -> BaseOperator:
+    llm = OpenAILLM(
+        openai_token="test-token", model="test-model", context_window=context_window
+    )
+    llm.predict = MagicMock(return_value=LLMResponse(response="result"))
+    return BaseOperator(llm=llm, parsed=MagicMock(), **kwargs)
+
+
+def test_operator_lowers_max_tokens_to_fit():
+    operator = _operator(100)
+    compiled = {"messages": _messages("a" * 40)}  # 28 tokens
+
+    operator.predict_compiled(compiled)
+    assert "max_tokens" not in operator.llm.predict.call_args.kwargs
+
+    operator.predict_compiled(compiled, llm_params={"max_tokens": 10})
+    assert operator.llm.predict.call_args.kwargs["max_tokens"] == 10
+
+    operator.predict_compiled(compiled, llm_params={"max_tokens": 1000})
+    assert operator.llm.predict.call_args.kwargs["max_tokens"] == 72
+
+
+def test_operator_rejects_oversized_prompt():
+    operator = _operator(20)
+    with pytest.raises(ContextWindowExceededError) as error:
+        operator.predict_compiled({"messages": _messages("a" * 40)})
+
+    assert error.value.prompt_tokens == 28
+    operator.llm.predict.assert_not_called()
+
+
+def test_operator_truncates_oversized_prompt():
+    operator = _operator(40, context_overflow="truncate")
+    operator.predict_compiled(
+        {"messages": _messages("a" * 40, "b" * 40)}, llm_params={"max_tokens": 10}
+    )
+
+    kwargs = operator.llm.predict.call_args.kwargs
+    assert [m.message[0] for m in kwargs["messages"]] == ["s", "b"]
+    assert kwargs["max_tokens"] == 10
+
+
+@patch("openai.ChatCompletion.create")
+def test_openai_llm_max_tokens(mocked_create):
+    mocked_create.return_value = _completion("result")
+    messages = [Message(message="a" * 40, role=MessageRole.user)]
+
+    OpenAILLM(openai_token="test-token", model="test-model").predict(messages)
+    assert "max_tokens" not in mocked_create.call_args.kwargs
+
+    OpenAILLM(openai_token="test-token", model="gpt-3.5-turbo").predict(messages)
+    assert "max_tokens" not in mocked_create.call_args.kwargs
+
+    OpenAILLM(openai_token="test-token", model="gpt-3.5-turbo").predict(
+        messages, max_tokens=100
+    )
+    assert mocked_create.call_args.kwargs["max_tokens"] == 100
@@ -1,4 +1,10 @@
-from declarai.operators.utils import can_be_jinja, format_prompt_msg
+from declarai.operators import Message, MessageRole
+from declarai.operators.utils import (
+    PreparedTemplate,
+    PromptFormatter,
+    can_be_jinja,
+    format_prompt_msg,
+)
 
 
 # Tests for can_be_jinja function
@@ -29,3 +35,25 @@ def test_format_prompt_msg_python_format():
 
 def test_format_prompt_msg_no_format():
     assert format_prompt_msg("Hello name") == "Hello name"
+
+
+# Tests for the pre-parsed templates
+def test_prompt_formatter():
+    assert PromptFormatter("Hello {{ name }}").format(name="John") == "Hello John"
+    assert PromptFormatter("Hello {name}").format(name="John") == "Hello John"
+    assert PromptFormatter("Hello {{ name").format(name="John") == "Hello { name"
+
+
+def test_prepared_template_populate():
+    system = Message(message="system message", role=MessageRole.system)
+    user = Message(message="Hello {name}", role=MessageRole.user)
+    template = PreparedTemplate([system, user])
+
+    populated = template.populate(name="John")
+    assert populated == [
+        system,
+        Message(message="Hello John", role=MessageRole.user),
+    ]
+    assert populated[0] is system
+    assert template.messages == [system, user]
+    assert template.populate() == [system, user]
@@ -29,3 +29,112 @@
 #     assert future_llm_task.compiled_template == compiled_template
 #
 #     assert future_llm_task.task_kwargs == kwargs
+import threading
+from unittest.mock import MagicMock
+
+import declarai
+from declarai.middleware.base import TaskMiddleware
+from declarai.task import FutureTask, Task
+
+
+def test_future_task():
+    exec_func = MagicMock()
+    exec_func.return_value = "output-value"
+    kwargs = {"input": "input-value"}
+    compiled_template = MagicMock(return_value="{input}")
+
+    future_task = FutureTask(
+        exec_func=exec_func,
+        kwargs=kwargs,
+        compiled_template=compiled_template,
+        populated_prompt="input-value",
+    )
+    assert future_task.populated_prompt == "input-value"
+    assert future_task.task_kwargs == kwargs
+    compiled_template.assert_not_called()
+    assert future_task.compiled_template == "{input}"
+    assert future_task.compiled_template == "{input}"
+    compiled_template.assert_called_once()
+
+    assert not future_task.done()
+    assert future_task.submit().result(timeout=1) == "output-value"
+    assert future_task.done()
+    assert future_task() == "output-value"
+    exec_func.assert_called_once()
+
+
+def test_task_plan_compiles_once():
+    operator = MagicMock()
+    operator.streaming = False
+    operator.llm_params = {}
+    operator.compile.return_value = "populated-prompt"
+    llm_response = MagicMock()
+    llm_response.response = "predicted_result"
+    operator.predict_compiled.return_value = llm_response
+    operator.parse_output.return_value = "parsed_result"
+
+    task = Task(operator)
+    plan = task.plan(input="input-value", llm_params={"temperature": 0.5})
+    assert plan.populated_prompt == "populated-prompt"
+    assert plan() == "parsed_result"
+
+    operator.compile.assert_called_once_with(input="input-value")
+    operator.predict.assert_not_called()
+    operator.predict_compiled.assert_called_once_with(
+        "populated-prompt", llm_params={"temperature": 0.5}
+    )
+
+
+class RecordingMiddleware(TaskMiddleware):
+    calls = []
+
+    def before(self, task):
+        self.calls.append("before")
+
+    def after(self, task):
+        self.calls.append("after")
+
+
+def test_task_plan_with_middlewares_compiles_once():
+    operator = MagicMock()
+    operator.streaming = False
+    operator.llm_params = {}
+    operator.compile.return_value = "populated-prompt"
+    operator.predict_compiled.return_value = MagicMock(response="predicted_result")
+    operator.parse_output.return_value = "parsed_result"
+
+    task = Task(operator, middlewares=[RecordingMiddleware])
+    plan = task.plan(input="input-value")
+    assert plan() == "parsed_result"
+
+    assert RecordingMiddleware.calls == ["before", "after"]
+    operator.compile.assert_called_once_with(input="input-value")
+    operator.predict.assert_not_called()
+    operator.predict_compiled.assert_called_once_with(
+        "populated-prompt", llm_params=None
+    )
+
+
+def test_gather():
+    barrier = threading.Barrier(3, timeout=1)
+
+    def exec_func(value):
+        barrier.wait()  # only passes if all three futures run concurrently
+        if value == "fail":
+            raise RuntimeError(value)
+        return value
+
+    futures = [
+        FutureTask(
+            exec_func=lambda value=value: exec_func(value),
+            kwargs={},
+            compiled_template="",
+            populated_prompt="",
+        )
+        for value in ("a", "fail", "c")
+    ]
+    results = declarai.gather(*futures, return_exceptions=True)
+    assert results[0] == "a"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "c"
+    assert all(future.done() for future in futures)
@@ -1,5 +1,11 @@
-from unittest.mock import MagicMock
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
 
+from declarai.operators import LLMDelta, LLMResponse, LLMStream
+from declarai.middleware import LoggingMiddleware
+from declarai.middleware.base import TaskMiddleware
 from declarai.python_parser.parser import PythonParser
 from declarai.task import Task
 
@@ -51,3 +57,333 @@ def test_task_streaming():
 
     task = Task(instantiated_operator)
     assert list(task()) == [llm_response]
+
+
+def test_task_acall():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = False
+
+    llm_response = MagicMock()
+    llm_response.response = "predicted_result"
+    instantiated_operator.apredict = AsyncMock(return_value=llm_response)
+    instantiated_operator.parse_output.return_value = "parsed_result"
+
+    task = Task(instantiated_operator)
+    res = asyncio.run(task.acall(llm_params={"temperature": 0.5}))
+    assert res == "parsed_result"
+    assert task.llm_response == llm_response
+    instantiated_operator.apredict.assert_awaited_with(llm_params={"temperature": 0.5})
+    instantiated_operator.predict.assert_not_called()
+
+
+def test_task_acall_streaming():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = True
+
+    llm_response = MagicMock()
+    llm_response.response = "predicted_result"
+
+    async def stream():
+        yield llm_response
+
+    instantiated_operator.apredict = AsyncMock(return_value=stream())
+
+    task = Task(instantiated_operator)
+
+    async def consume():
+        return [chunk async for chunk in await task.acall()]
+
+    assert asyncio.run(consume()) == [llm_response]
+    assert task.llm_response == llm_response
+
+
+def test_task_streaming_deltas():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = "deltas"
+    instantiated_operator.predict.return_value = LLMStream(
+        iter(
+            [
+                LLMDelta(content="predicted", role="assistant"),
+                LLMDelta(content="_result"),
+            ]
+        )
+    )
+
+    task = Task(instantiated_operator)
+    deltas = list(task())
+
+    assert [delta.content for delta in deltas] == ["predicted", "_result"]
+    assert task.llm_response.response == "predicted_result"
+
+
+def test_task_stream_buffer():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = True
+    chunks = [LLMResponse(response="a" * size) for size in range(1, 6)]
+    instantiated_operator.predict.side_effect = lambda **kwargs: iter(chunks)
+
+    task = Task(instantiated_operator)
+    assert list(task()) == chunks
+    assert task.llm_response == chunks[-1]
+    assert task.stream_buffer is None
+
+    task.stream_buffer_size = 2
+    assert list(task()) == chunks
+    assert list(task.stream_buffer) == chunks[-2:]
+
+
+def test_task_interleaved_streams_keep_their_own_buffer():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = True
+    instantiated_operator.predict.side_effect = lambda **kwargs: iter(
+        [LLMResponse(response=kwargs["value"] * size) for size in range(1, 4)]
+    )
+
+    task = Task(instantiated_operator)
+    task.stream_buffer_size = 2
+    first, second = task.invoke(value="a"), task.invoke(value="b")
+    for first_chunk, second_chunk in zip(first.result, second.result):
+        pass
+
+    assert [chunk.response for chunk in first.stream_buffer] == ["aa", "aaa"]
+    assert [chunk.response for chunk in second.stream_buffer] == ["bb", "bbb"]
+
+
+def test_task_empty_stream():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = True
+    instantiated_operator.predict.return_value = iter([])
+
+    task = Task(instantiated_operator)
+    assert list(task()) == []
+
+
+def test_task_concurrent_calls_keep_their_own_response():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = False
+    barrier = threading.Barrier(2)
+
+    def predict(**kwargs):
+        barrier.wait(timeout=5)
+        return LLMResponse(response=kwargs["value"])
+
+    instantiated_operator.predict.side_effect = predict
+    instantiated_operator.parse_output.side_effect = lambda output: output
+    seen_by_middleware = []
+
+    class RecordingMiddleware(TaskMiddleware):
+        def before(self, task):
+            pass
+
+        def after(self, task):
+            seen_by_middleware.append(
+                (self._kwargs["value"], task.llm_response.response)
+            )
+
+    task = Task(instantiated_operator, middlewares=[RecordingMiddleware])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        contexts = list(
+            executor.map(lambda value: task.invoke(value=value), ["first", "second"])
+        )
+
+    assert [context.result for context in contexts] == ["first", "second"]
+    assert [context.llm_response.response for context in contexts] == [
+        "first",
+        "second",
+    ]
+    assert sorted(seen_by_middleware) == [("first", "first"), ("second", "second")]
+    assert task.llm_response.response in ("first", "second")
+
+
+def test_task_invoke_streaming_context():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = True
+    chunks = [LLMResponse(response="a"), LLMResponse(response="ab")]
+    instantiated_operator.predict.return_value = iter(chunks)
+
+    task = Task(instantiated_operator)
+    context = task.invoke()
+    assert context.llm_response is None
+    assert list(context.result) == chunks
+    assert context.llm_response == chunks[-1]
+
+
+def _recording_middleware(name, events):
+    class RecordingMiddleware(TaskMiddleware):
+        def before(self, task):
+            events.append(f"{name}:before")
+
+        def after(self, task):
+            events.append(f"{name}:after")
+
+    return RecordingMiddleware
+
+
+def test_task_middlewares_chain():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = False
+    events = []
+
+    def predict(**kwargs):
+        events.append("predict")
+        return LLMResponse(response="predicted_result")
+
+    instantiated_operator.predict.side_effect = predict
+    instantiated_operator.apredict = AsyncMock(side_effect=predict)
+    instantiated_operator.parse_output.side_effect = lambda output: output
+
+    task = Task(
+        instantiated_operator,
+        middlewares=[
+            _recording_middleware("outer", events),
+            _recording_middleware("inner", events),
+        ],
+    )
+    assert task() == "predicted_result"
+    assert events == [
+        "outer:before",
+        "inner:before",
+        "predict",
+        "inner:after",
+        "outer:after",
+    ]
+
+    events.clear()
+    assert asyncio.run(task.acall()) == "predicted_result"
+    assert events == [
+        "outer:before",
+        "inner:before",
+        "predict",
+        "inner:after",
+        "outer:after",
+    ]
+
+
+def test_task_middlewares_chain_streaming():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = True
+    chunks = [LLMResponse(response="a"), LLMResponse(response="ab")]
+    instantiated_operator.predict.return_value = iter(chunks)
+    events = []
+
+    task = Task(
+        instantiated_operator,
+        middlewares=[
+            _recording_middleware("outer", events),
+            _recording_middleware("inner", events),
+        ],
+    )
+    stream = task()
+    assert events == ["outer:before", "inner:before"]
+    assert list(stream) == chunks
+    assert events == ["outer:before", "inner:before", "inner:after", "outer:after"]
+
+
+def test_task_middleware_short_circuit():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = False
+    events = []
+
+    class CachedMiddleware(TaskMiddleware):
+        def handle(self, call_next):
+            return "cached_result"
+
+        async def ahandle(self, call_next):
+            return "cached_result"
+
+        def before(self, task):
+            pass
+
+        def after(self, task):
+            pass
+
+    task = Task(
+        instantiated_operator,
+        middlewares=[_recording_middleware("outer", events), CachedMiddleware],
+    )
+    assert task() == "cached_result"
+    assert asyncio.run(task.acall()) == "cached_result"
+    instantiated_operator.predict.assert_not_called()
+    instantiated_operator.apredict.assert_not_called()
+    # There is no response from the LLM, so the after hooks of the outer middlewares are skipped
+    assert events == ["outer:before"] * 2
+
+
+def test_task_logging_middleware_short_circuit():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = False
+    instantiated_operator.compile.return_value = "compiled"
+    cached_response = LLMResponse(response="cached_result", model="test-model")
+
+    class CachedMiddleware(TaskMiddleware):
+        def handle(self, call_next):
+            self._task.llm_response = cached_response
+            return cached_response.response
+
+        def before(self, task):
+            pass
+
+        def after(self, task):
+            pass
+
+    task = Task(
+        instantiated_operator, middlewares=[LoggingMiddleware, CachedMiddleware]
+    )
+    task.__name__ = "cached_task"
+    with patch("declarai.middleware.internal.log_middleware.logger") as logger:
+        assert task() == "cached_result"
+    assert logger.info.call_args.args[0]["result"] == "cached_result"
+
+    task = Task(
+        instantiated_operator,
+        middlewares=[LoggingMiddleware, _short_circuit_middleware()],
+    )
+    task.__name__ = "short_circuit_task"
+    assert task() == "cached_result"
+    instantiated_operator.predict.assert_not_called()
+
+
+def _short_circuit_middleware():
+    class ShortCircuitMiddleware(TaskMiddleware):
+        def handle(self, call_next):
+            return "cached_result"
+
+        def before(self, task):
+            pass
+
+        def after(self, task):
+            pass
+
+    return ShortCircuitMiddleware
+
+
+def test_task_batch():
+    instantiated_operator = MagicMock()
+    instantiated_operator.streaming = False
+    instantiated_operator.compile.side_effect = lambda **kwargs: {
+        "messages": kwargs["value"]
+    }
+
+    def predict_compiled(compiled, llm_params):
+        if compiled["messages"] == "fail":
+            raise RuntimeError("llm failure")
+        llm_response = MagicMock()
+        llm_response.response = compiled["messages"]
+        return llm_response
+
+    instantiated_operator.predict_compiled.side_effect = predict_compiled
+    instantiated_operator.parse_output.side_effect = lambda output: output.upper()
+
+    task = Task(instantiated_operator)
+    inputs = [{"value": "a"}, {"value": "fail"}, {"value": "c"}]
+    res = task.batch(inputs, llm_params={"temperature": 0.5}, max_concurrency=2)
+
+    assert res[0] == "A"
+    assert isinstance(res[1], RuntimeError)
+    assert res[2] == "C"
+    assert instantiated_operator.compile.call_count == 3
+    instantiated_operator.predict_compiled.assert_any_call(
+        {"messages": "c"}, llm_params={"temperature": 0.5}
+    )
+    instantiated_operator.predict.assert_not_called()
@@ -0,0 +1,53 @@
+import os
+import pickle
+
+import pytest
+
+from declarai.operators import LLMResponse, OpenAILLM
+from declarai.task import TaskDecorator
+
+
+class ProcessIdLLM(OpenAILLM):
+    def predict(self, messages, **kwargs) -> LLMResponse:
+        return LLMResponse(response=str(os.getpid()))
+
+
+task = TaskDecorator(ProcessIdLLM(openai_token="test-token", model="test-model")).task
+
+
+@task
+def process_id(value: int) -> int:
+    """
+    Returns the id of the process that executed the task
+    :param value: any value
+    """
+
+
+def test_task_pickles_by_reference():
+    assert pickle.loads(pickle.dumps(process_id)) is process_id
+
+
+def test_local_task_is_not_picklable():
+    @task
+    def local_task() -> int:
+        """
+        A task that is not defined at the top level of a module
+        """
+
+    with pytest.raises(pickle.PicklingError):
+        pickle.dumps(local_task)
+
+
+def test_task_batch_process_executor():
+    results = process_id.batch(
+        [{"value": value} for value in range(4)], max_concurrency=2, executor="process"
+    )
+
+    assert len(results) == 4
+    assert all(isinstance(result, int) for result in results)
+    assert os.getpid() not in results
+
+
+def test_task_batch_invalid_executor():
+    with pytest.raises(ValueError):
+        process_id.batch([{"value": 1}], executor="gpu")
@@ -1,8 +1,11 @@
-from typing import Any, Dict, List
+import sys
+from typing import Any, Dict, List, Optional, Tuple, Union
+from unittest.mock import patch
 
 import pytest
 from pydantic import BaseModel, Field
 
+from declarai.python_parser import type_annotation_to_schema
 from declarai.python_parser.type_annotation_to_schema import (
     type_annotation_to_str_schema,
 )
@@ -75,3 +78,57 @@ class MockComplexModelDict(BaseModel):
 )
 def test_type_hint_resolver(type_: Any, result: str):
     assert type_annotation_to_str_schema(type_) == result
+
+
+@pytest.mark.parametrize(
+    "type_, result",
+    [
+        (Union[int, str, bool], "Union[integer, string, boolean]"),
+        (Optional[int], "Union[integer, null]"),
+        (Tuple[int, ...], "Tuple[integer, ...]"),
+        (
+            Dict[str, List[MockSimpleModel]],
+            "Dict[string, List[{{'name': 'string', 'numbers': ['integer']}}]]",
+        ),
+        (
+            List[Union[MockSimpleModel, List[int]]],
+            "List[Union[{{'name': 'string', 'numbers': ['integer']}}, List[integer]]]",
+        ),
+    ],
+)
+def test_type_hint_resolver_generic_arguments(type_: Any, result: str):
+    assert type_annotation_to_str_schema(type_) == result
+
+
+def test_type_hint_resolver_union_order():
+    assert Union[int, str] == Union[str, int]
+    assert type_annotation_to_str_schema(Union[int, str]) == "Union[integer, string]"
+    assert type_annotation_to_str_schema(Union[str, int]) == "Union[string, integer]"
+    assert type_annotation_to_str_schema(List[Union[str, int]]) == (
+        "List[Union[string, integer]]"
+    )
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="Requires python 3.10")
+def test_type_hint_resolver_builtin_generics():
+    assert type_annotation_to_str_schema(list[int]) == "List[integer]"
+    assert type_annotation_to_str_schema(dict[str, int | str]) == (
+        "Dict[string, Union[integer, string]]"
+    )
+
+
+def test_schema_is_resolved_once_per_type():
+    type_annotation_to_schema.resolve_type_schema.cache_clear()
+    type_annotation_to_str_schema.cache_clear()
+    with patch.object(
+        type_annotation_to_schema,
+        "resolve_to_json_schema",
+        wraps=type_annotation_to_schema.resolve_to_json_schema,
+    ) as resolve:
+        for _ in range(3):
+            type_annotation_to_str_schema(MockComplexModelArray)
+            type_annotation_to_str_schema(List[MockSimpleModel])
+            type_annotation_to_str_schema(Dict[str, MockSimpleModel])
+
+    # MockComplexModelArray, MockSimpleModel and str
+    assert resolve.call_count == 3
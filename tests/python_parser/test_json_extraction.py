@@ -0,0 +1,57 @@
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from declarai.python_parser.json_extraction import extract_json_object
+from declarai.python_parser.parser import OutputParsingError, PythonParser
+
+
+class Movie(BaseModel):
+    name: str
+    year: int
+
+
+def movies() -> List[Movie]:
+    """
+    List movies
+    """
+
+
+@pytest.mark.parametrize(
+    "raw_result",
+    [
+        '{"declarai_result": [{"name": "Alien", "year": 1979}]}',
+        '```json\n{"declarai_result": [{"name": "Alien", "year": 1979}]}\n```',
+        'Sure! Here are the movies {as requested}:\n\n{"declarai_result": '
+        '[{"name": "Alien", "year": 1979}]}\nLet me know if you need "more".',
+        '{"declarai_result": [{"name": "Alien", "year": 1979,},],}',
+        '{"other": 1} {"declarai_result": [{"name": "Alien", "year": 1979}]}',
+    ],
+)
+def test_parse_noisy_output(raw_result):
+    assert PythonParser(movies).parse(raw_result) == [Movie(name="Alien", year=1979)]
+
+
+def test_extract_json_object_keeps_strings():
+    text = 'Result: {"text": "a {tricky}, \\"quoted\\" string,]", "items": [1, 2,]}'
+    assert extract_json_object(text) == {
+        "text": 'a {tricky}, "quoted" string,]',
+        "items": [1, 2],
+    }
+
+
+def test_extract_json_object_falls_back_to_first_object():
+    assert extract_json_object('{"a": 1} and {"b": 2}', key="c") == {"a": 1}
+    assert extract_json_object("no json here", key="c") is None
+
+
+def test_parse_output_without_json():
+    with pytest.raises(OutputParsingError):
+        PythonParser(movies).parse("I could not find any movies")
+
+
+@pytest.mark.parametrize("raw_result", ['{"other": 1}', "[1, 2]"])
+def test_parse_output_without_root_key(raw_result):
+    with pytest.raises(OutputParsingError):
+        PythonParser(movies).parse(raw_result)
@@ -0,0 +1,143 @@
+import json
+import os
+import subprocess
+import sys
+from typing import List
+from unittest.mock import patch
+
+import pytest
+from pydantic import BaseModel, create_model
+
+from declarai.declarai import magic
+from declarai.operators import OpenAILLM
+from declarai.python_parser import parser as parser_module
+from declarai.python_parser.manifest import (
+    TaskManifest,
+    load_manifest,
+    record_manifest,
+    set_manifest,
+    source_hash,
+)
+from declarai.python_parser.parser import PythonParser
+from declarai.task import TaskDecorator
+
+
+class Movie(BaseModel):
+    name: str
+    year: int
+
+
+def recommend_movies(genre: str) -> List[Movie]:
+    """
+    Recommends movies of the given genre
+    :param genre: The genre of the movies
+    :return: The recommended movies
+    """
+    return magic("movies", genre)
+
+
+recommend_movies_task = TaskDecorator(
+    OpenAILLM(openai_token="test-token", model="test-model")
+).task(recommend_movies)
+
+
+@pytest.fixture(autouse=True)
+def no_manifest():
+    set_manifest(None)
+    yield
+    set_manifest(None)
+
+
+def test_parse_from_manifest(tmp_path):
+    with record_manifest() as manifest:
+        parsed = PythonParser(recommend_movies)
+    assert len(manifest) == 1
+    manifest.save(tmp_path / "manifest.json")
+
+    load_manifest(tmp_path / "manifest.json")
+    with patch.object(
+        parser_module.inspect, "getsource", side_effect=OSError
+    ), patch.object(
+        parser_module, "type_annotation_to_str_schema", side_effect=AssertionError
+    ):
+        compiled = PythonParser(recommend_movies)
+
+    assert compiled.spec._replace(
+        magic=None, signature_return=None
+    ) == parsed.spec._replace(magic=None, signature_return=None)
+    assert vars(compiled.signature_return) == vars(parsed.signature_return)
+    assert vars(compiled.magic) == vars(parsed.magic)
+    assert compiled.return_name == "movies"
+
+
+def _recommend_movies(movie_type):
+    def recommend_movies(genre: str) -> List[movie_type]:
+        """
+        Recommends movies of the given genre
+        """
+
+    return recommend_movies
+
+
+def test_source_hash_changes_with_the_task():
+    movie = create_model("Movie", __module__=__name__, name=(str, ...))
+    original = source_hash(_recommend_movies(movie))
+    assert source_hash(_recommend_movies(movie)) == original
+
+    changed_docstring = _recommend_movies(movie)
+    changed_docstring.__doc__ = "Recommends a movie of the given genre"
+    assert source_hash(changed_docstring) != original
+
+    changed_model = create_model(
+        "Movie", __module__=__name__, name=(str, ...), year=(int, ...)
+    )
+    assert repr(List[changed_model]) == repr(List[movie])
+    assert source_hash(_recommend_movies(changed_model)) != original
+
+
+def _is_classic(genre: str) -> bool:
+    return genre in {"western", "noir", "musical", "epic", "silent"}
+
+
+def test_source_hash_ignores_the_hash_seed():
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    hashes = {
+        subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "from declarai.python_parser.manifest import source_hash; "
+                "from tests.python_parser.test_manifest import _is_classic; "
+                "print(source_hash(_is_classic))",
+            ],
+            env={**env, "PYTHONHASHSEED": seed},
+            text=True,
+        ).strip()
+        for seed in ("1", "2", "3")
+    }
+    assert hashes == {source_hash(_is_classic)}
+
+
+def test_stale_manifest_falls_back_to_source():
+    set_manifest(TaskManifest({}))
+    assert PythonParser(recommend_movies).return_name == "movies"
+
+
+def test_compile_command(tmp_path):
+    output = tmp_path / "manifest.json"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    subprocess.check_call(
+        [
+            sys.executable,
+            "-m",
+            "declarai",
+            "compile",
+            "tests.python_parser.test_manifest",
+            "--output",
+            str(output),
+        ],
+        env=env,
+    )
+
+    specs = json.loads(output.read_text())["specs"]
+    assert specs[source_hash(recommend_movies)]["magic"]["return_name"] == "movies"
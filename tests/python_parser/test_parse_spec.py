@@ -0,0 +1,81 @@
+import gc
+import inspect
+import time
+import weakref
+from typing import List
+from unittest.mock import patch
+
+import pytest
+from pydantic import BaseModel
+
+from declarai.operators import OpenAILLM
+from declarai.python_parser import parser as parser_module
+from declarai.python_parser.parser import PythonParser
+from declarai.task import TaskDecorator
+
+TASK_COUNT = 300
+
+
+class Movie(BaseModel):
+    name: str
+    year: int
+
+
+def _make_function(index: int):
+    def recommend_movies(genre: str, count: int) -> List[Movie]:
+        """
+        Recommends movies of the given genre
+        :param genre: The genre of the movies
+        :param count: The number of movies to recommend
+        :return: The recommended movies
+        """
+
+    recommend_movies.__name__ = f"recommend_movies_{index}"
+    return recommend_movies
+
+
+def test_parse_spec_is_immutable():
+    parsed = PythonParser(_make_function(0))
+
+    assert parsed.spec.name == "recommend_movies_0"
+    with pytest.raises(AttributeError):
+        parsed.spec.name = "other"
+    with pytest.raises(TypeError):
+        parsed.signature_kwargs["genre"] = int
+
+
+def test_parser_is_not_pinned_in_memory():
+    parsed = PythonParser(_make_function(0))
+    assert parsed.has_structured_return_type
+    reference = weakref.ref(parsed)
+
+    del parsed
+    gc.collect()
+    assert reference() is None
+
+
+def test_parse_spec_computed_once_per_task():
+    task = TaskDecorator(OpenAILLM(openai_token="test-token", model="test-model")).task
+
+    with patch.object(
+        parser_module.inspect, "getsource", wraps=inspect.getsource
+    ) as getsource, patch.object(
+        parser_module,
+        "type_annotation_to_str_schema",
+        wraps=parser_module.type_annotation_to_str_schema,
+    ) as to_schema:
+        start = time.perf_counter()
+        tasks = [task(_make_function(index)) for index in range(TASK_COUNT)]
+        # Interleaves the access to the metadata of the tasks
+        for _ in range(3):
+            for decorated in tasks:
+                decorated.compile(genre="sci-fi", count=3)
+                parsed = decorated.operator.parsed
+                assert parsed.magic.return_name is None
+                assert parsed.has_structured_return_type
+                assert parsed.signature_return.str_schema
+        elapsed = time.perf_counter() - start
+
+    assert getsource.call_count == TASK_COUNT
+    assert to_schema.call_count == TASK_COUNT
+    print(f"Decorated and compiled {TASK_COUNT} tasks 3 times in {elapsed:.3f}s")
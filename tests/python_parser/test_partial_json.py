@@ -0,0 +1,203 @@
+from typing import List, Optional
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import BaseModel
+
+from declarai.operators import LLMDelta, LLMResponse
+from declarai.operators.operator import BaseOperator
+from declarai.python_parser.parser import OutputParsingError, PythonParser
+from declarai.python_parser.partial_json import PartialJSONParser
+
+DOCUMENT = (
+    "```json\n"
+    '{"declarai_result": [{"name": "Alien", "year": 1979}, '
+    '{"name": "Her \\"2\\"", "year": 2013}]}\n'
+    "```"
+)
+
+
+def _chunks(text: str, size: int) -> List[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8, len(DOCUMENT)])
+def test_partial_json_parser_items(chunk_size):
+    parser = PartialJSONParser(items_key="declarai_result")
+    items = []
+    for chunk in _chunks(DOCUMENT, chunk_size):
+        parser.feed(chunk)
+        items.extend(parser.pop_items())
+
+    assert items == [
+        {"name": "Alien", "year": 1979},
+        {"name": 'Her "2"', "year": 2013},
+    ]
+    assert parser.closed
+
+
+def test_partial_json_parser_snapshot():
+    parser = PartialJSONParser()
+    assert parser.snapshot() is None
+
+    parser.feed('Here you go: {"title": "Ali')
+    assert parser.snapshot() == {"title": "Ali"}
+
+    parser.feed('en", "year": 19')
+    assert parser.snapshot() == {"title": "Alien"}
+
+    parser.feed('79, "tags": ["sci-fi", tr')
+    assert parser.snapshot() == {"title": "Alien", "year": 1979, "tags": ["sci-fi"]}
+
+    parser.feed("ue]}")
+    assert parser.snapshot() == {
+        "title": "Alien",
+        "year": 1979,
+        "tags": ["sci-fi", True],
+    }
+
+
+class Movie(BaseModel):
+    name: str
+    year: Optional[int]
+
+
+def movies() -> List[Movie]:
+    """
+    List movies
+    """
+
+
+def test_stream_parser_items():
+    stream_parser = PythonParser(movies).stream_parser(items=True)
+    parsed = []
+    for chunk in _chunks(DOCUMENT, 5):
+        parsed.extend(stream_parser.feed(chunk))
+
+    assert parsed == [Movie(name="Alien", year=1979), Movie(name='Her "2"', year=2013)]
+    assert stream_parser.close() == []
+
+
+def test_stream_parser_partial_results():
+    stream_parser = PythonParser(movies).stream_parser()
+    document = '{"declarai_result": [{"name": "Alien", "year": 1979}]}'
+    results = []
+    for chunk in _chunks(document, 4):
+        results.extend(stream_parser.feed(chunk))
+    results.extend(stream_parser.close())
+
+    assert results == [
+        [],
+        [Movie(name="A", year=None)],
+        [Movie(name="Alien", year=None)],
+        [Movie(name="Alien", year=1979)],
+    ]
+
+
+def test_stream_parser_requires_structured_return_type():
+    def say() -> str:
+        """
+        Say something
+        """
+
+    with pytest.raises(ValueError):
+        PythonParser(say).stream_parser()
+
+    def movie() -> Movie:
+        """
+        A movie
+        """
+
+    with pytest.raises(ValueError):
+        PythonParser(movie).stream_parser(items=True)
+
+
+def test_operator_parse_output_stream():
+    operator = BaseOperator(llm=MagicMock(), parsed=PythonParser(movies))
+    document = '{"declarai_result": [{"name": "Alien", "year": 1979}, {"name": "Her"}]}'
+
+    accumulated = [
+        LLMResponse(response=document[:end]) for end in range(10, len(document) + 1, 10)
+    ]
+    accumulated.append(LLMResponse(response=document))
+    assert list(operator.parse_output_stream(accumulated, items=True)) == [
+        Movie(name="Alien", year=1979),
+        Movie(name="Her"),
+    ]
+
+    deltas = [LLMDelta(content=chunk) for chunk in _chunks(document, 10)]
+    results = list(operator.parse_output_stream(deltas))
+    assert results[-1] == [Movie(name="Alien", year=1979), Movie(name="Her")]
+
+
+class Review(BaseModel):
+    title: str
+    score: int
+    movie: Movie
+
+
+def review() -> Review:
+    """
+    Review a movie
+    """
+
+
+def test_stream_parser_partial_models():
+    stream_parser = PythonParser(review).stream_parser()
+    document = (
+        '{"declarai_result": {"title": "Great", "score": 9, '
+        '"movie": {"name": "Alien", "year": 1979}}}'
+    )
+    results = []
+    for chunk in _chunks(document, 6):
+        results.extend(stream_parser.feed(chunk))
+    results.extend(stream_parser.close())
+
+    assert len(results) > 3
+    assert all(isinstance(result, Review) for result in results)
+    assert results[0].__fields_set__ == {"title"}
+    assert any(
+        "movie" in result.__fields_set__ and result.movie.name == "Alien"
+        for result in results[:-1]
+    )
+    assert results[-1] == Review(
+        title="Great", score=9, movie=Movie(name="Alien", year=1979)
+    )
+
+
+def test_stream_parser_partial_list_item():
+    stream_parser = PythonParser(movies).stream_parser()
+    stream_parser.feed(
+        '{"declarai_result": [{"name": "Alien", "year": 1979}, {"name": "He'
+    )
+    assert stream_parser.feed('r"') == [
+        [Movie(name="Alien", year=1979), Movie.construct(name="Her")]
+    ]
+
+
+def test_stream_parser_throttles_snapshots_of_long_outputs():
+    stream_parser = PythonParser(movies).stream_parser()
+    item = '{"name": "Alien", "year": 1979}, '
+    document = '{"declarai_result": [' + item * 2000 + '{"name": "Her"}]}'
+
+    with patch.object(
+        PartialJSONParser,
+        "snapshot",
+        autospec=True,
+        side_effect=PartialJSONParser.snapshot,
+    ) as snapshot:
+        for chunk in _chunks(document, 10):
+            stream_parser.feed(chunk)
+        result = stream_parser.close()
+
+    assert len(result[0]) == 2001
+    assert snapshot.call_count < len(document) // 100
+
+
+def test_stream_parser_malformed_item():
+    stream_parser = PythonParser(movies).stream_parser(items=True)
+    assert stream_parser.feed(
+        '{"declarai_result": [{"name": "Alien", "year": 1979}, '
+    ) == [Movie(name="Alien", year=1979)]
+    with pytest.raises(OutputParsingError):
+        stream_parser.feed('{"name": Her}]}')
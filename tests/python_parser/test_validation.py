@@ -0,0 +1,76 @@
+import json
+from typing import List, Union
+from unittest.mock import patch
+
+import pytest
+from pydantic import BaseModel
+
+from declarai.python_parser import validation
+from declarai.python_parser.parser import OutputParsingError, PythonParser
+from declarai.python_parser.validation import validator_for
+
+
+class Movie(BaseModel):
+    name: str
+    year: int
+
+
+def movies() -> List[Movie]:
+    """
+    List movies
+    """
+
+
+def other_movies() -> List[Movie]:
+    """
+    List other movies
+    """
+
+
+def test_validator_is_shared_per_type():
+    assert validator_for(List[Movie]) is validator_for(List[Movie])
+    assert PythonParser(movies)._validator is PythonParser(other_movies)._validator
+    assert validator_for(int).validate("1") == 1
+
+
+def test_validator_is_not_shared_between_union_orders():
+    assert validator_for(Union[int, str]).validate("1") == 1
+    assert validator_for(Union[str, int]).validate("1") == "1"
+
+
+def test_parse_many():
+    parser = PythonParser(movies)
+    raw_results = [
+        json.dumps({"declarai_result": [{"name": "Alien", "year": year}]})
+        for year in range(1979, 1989)
+    ]
+
+    with patch("declarai.python_parser.validation.TypeValidator") as type_validator:
+        results = parser.parse_many(raw_results)
+    type_validator.assert_not_called()
+
+    assert results == [[Movie(name="Alien", year=year)] for year in range(1979, 1989)]
+
+
+def test_parse_many_return_exceptions():
+    parser = PythonParser(movies)
+    raw_results = [
+        '{"declarai_result": [{"name": "Alien", "year": 1979}]}',
+        '{"declarai_result": [{"name": "Alien"}]}',
+        "not json",
+        '{"other": 1}',
+    ]
+
+    with pytest.raises(OutputParsingError):
+        parser.parse_many(raw_results)
+
+    results = parser.parse_many(raw_results, return_exceptions=True)
+    assert results[0] == [Movie(name="Alien", year=1979)]
+    assert isinstance(results[1], OutputParsingError)
+    assert isinstance(results[2], OutputParsingError)
+    assert isinstance(results[3], OutputParsingError)
+
+
+def test_json_decoder_falls_back_to_json():
+    with patch.object(validation, "orjson", None):
+        assert validation._select_loads() is json.loads
@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from declarai import Declarai
+from declarai.memory import SlidingWindowMemory
+from declarai.operators import (
+    CharacterTokenCounter,
+    LLMResponse,
+    Message,
+    MessageRole,
+)
+
+
+def _message(text: str, role: MessageRole = MessageRole.user) -> Message:
+    return Message(message=text, role=role)
+
+
+def test_sliding_window_max_messages():
+    policy = SlidingWindowMemory(max_messages=2)
+    history = [_message(str(i)) for i in range(5)]
+    assert [m.message for m in policy.select(history)] == ["3", "4"]
+    assert [m.message for m in policy.select(history, pinned=1)] == ["0", "3", "4"]
+
+
+def test_sliding_window_max_tokens():
+    # Every message of 40 characters is 14 tokens
+    policy = SlidingWindowMemory(max_tokens=30)
+    history = [_message(c * 40) for c in "abc"]
+    assert [m.message[0] for m in policy.select(history)] == ["b", "c"]
+
+    history.append(_message("d" * 40))
+    assert [m.message[0] for m in policy.select(history)] == ["c", "d"]
+    assert [m.message[0] for m in policy.select(history, pinned=1)] == ["a", "d"]
+
+    history.append(_message("e" * 400))
+    assert [m.message[0] for m in policy.select(history)] == ["e"]
+
+
+def test_sliding_window_counts_every_message_once():
+    token_counter = CharacterTokenCounter()
+    token_counter.count_messages = MagicMock(side_effect=lambda messages: 14)
+    policy = SlidingWindowMemory(max_tokens=30, token_counter=token_counter)
+
+    history = []
+    for i in range(10):
+        history.append(_message(str(i)))
+        assert len(policy.select(history)) == min(len(history), 2)
+    assert token_counter.count_messages.call_count == 10
+
+    history = [_message("new")]
+    assert policy.select(history) == history
+    assert token_counter.count_messages.call_count == 11
+
+
+def test_sliding_window_requires_a_limit():
+    with pytest.raises(ValueError):
+        SlidingWindowMemory()
+
+
+@patch("declarai.declarai.resolve_llm")
+def test_chat_memory_policy(mock_resolve_llm):
+    llm = MagicMock()
+    llm.provider = "openai"
+    llm.streaming = False
+    llm.token_counter = CharacterTokenCounter()
+    llm.predict.return_value = LLMResponse(response="r" * 40)
+    mock_resolve_llm.return_value = llm
+
+    declarai = Declarai(provider="openai", model="gpt-3.5-turbo")
+
+    @declarai.experimental.chat(memory_policy=SlidingWindowMemory(max_messages=2))
+    class MyChat:
+        """
+        This is a test chat.
+        """
+
+        greeting = "This is a greeting message"
+
+    chat = MyChat()
+    for i in range(3):
+        chat.send(f"message {i}")
+
+    sent = llm.predict.call_args.kwargs["messages"]
+    assert [m.message for m in sent] == [
+        "This is a test chat.",
+        "This is a greeting message",
+        "r" * 40,
+        "message 2",
+    ]
+    assert len(chat.conversation) == 7
@@ -1,5 +1,6 @@
+import asyncio
 from typing import List
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from declarai import Declarai
 from declarai.operators import Message, LLMResponse
@@ -57,3 +58,64 @@ def test_chat_jinja_system(mock_resolve_llm):
 
     chat = MyJinjaChat(topic="jinja2")
     chat.system = "This is a test chat about jinja2."
+
+
+@patch("declarai.declarai.resolve_llm")
+def test_chat_asend(mock_resolve_llm):
+    llm = MagicMock()
+    llm.provider = "openai"
+    llm.streaming = False
+    llm.apredict = AsyncMock(
+        return_value=LLMResponse(response='{"declarai_result": ["1", "2"]}')
+    )
+    mock_resolve_llm.return_value = llm
+
+    declarai = Declarai(provider="openai", model="gpt-3.5-turbo")
+
+    @declarai.experimental.chat
+    class MyAsyncChat:
+        """
+        This is a test chat.
+        """
+
+        def send(self) -> List[str]:
+            ...
+
+    chat = MyAsyncChat()
+    assert asyncio.run(chat.asend("return two string numbers in a list")) == ["1", "2"]
+    llm.predict.assert_not_called()
+    assert chat.conversation[-1] == Message(
+        message='{"declarai_result": ["1", "2"]}', role="assistant"
+    )
+
+
+@patch("declarai.declarai.resolve_llm")
+def test_chat_invoke(mock_resolve_llm):
+    llm = MagicMock()
+    llm.provider = "openai"
+    llm.streaming = False
+    response = LLMResponse(response='{"declarai_result": ["1", "2"]}')
+    llm.predict.return_value = response
+    llm.apredict = AsyncMock(return_value=response)
+    mock_resolve_llm.return_value = llm
+
+    declarai = Declarai(provider="openai", model="gpt-3.5-turbo")
+
+    @declarai.experimental.chat
+    class MyChat:
+        """
+        This is a test chat.
+        """
+
+        def send(self) -> List[str]:
+            ...
+
+    chat = MyChat()
+    messages = [Message(message="return two string numbers in a list", role="user")]
+    context = chat.invoke(messages=messages)
+    assert context.result == ["1", "2"]
+    assert context.llm_response == response
+
+    context = asyncio.run(chat.ainvoke(messages=messages))
+    assert context.result == ["1", "2"]
+    assert context.llm_response == response
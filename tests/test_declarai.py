@@ -86,3 +86,19 @@ def test_declarai_azure_openai():
     assert declarai.llm.api_key == "123"
     assert declarai.llm._kwargs["api_base"] == "456"
     assert declarai.llm._kwargs["api_version"] == "789"
+
+
+def test_declarai_openai_back_compat_forwards_options():
+    from declarai import Declarai
+    from declarai.operators import RetryPolicy
+
+    retry_policy = RetryPolicy()
+    declarai = Declarai.openai(
+        model="davinci",
+        openai_token="test_token",
+        retry_policy=retry_policy,
+        context_window=1000,
+    )
+
+    assert declarai.llm.retry_policy is retry_policy
+    assert declarai.llm.context_window == 1000
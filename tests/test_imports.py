@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+LAZY_MODULES = [
+    "openai",
+    "aiohttp",
+    "requests",
+    "jinja2",
+    "jsonref",
+    "sqlite3",
+    "declarai.operators.openai_operators",
+    "declarai.memory.file",
+    "declarai.memory.mongodb",
+    "declarai.memory.postgres",
+    "declarai.memory.redis",
+]
+
+IMPORT_TIME_BUDGET = 1.0
+"""Seconds. Generous, importing declarai takes a fraction of it when nothing is loaded eagerly."""
+
+
+def _run(code: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    return json.loads(output)
+
+
+def test_import_declarai_is_lazy():
+    result = _run(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import declarai\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [name for name in {LAZY_MODULES!r} if name in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'loaded': loaded}))"
+    )
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize(
+    "code, module",
+    [
+        (
+            "declarai.openai(model='gpt-4', openai_token='test-token')",
+            "declarai.operators.openai_operators",
+        ),
+        ("from declarai.operators import OpenAILLM", "openai"),
+        ("from declarai.memory import FileMessageHistory", "declarai.memory.file"),
+    ],
+)
+def test_lazy_modules_load_on_first_use(code, module):
+    result = _run(
+        "import json, sys\n"
+        "import declarai\n"
+        f"{code}\n"
+        f"print(json.dumps({{'loaded': {module!r} in sys.modules}}))"
+    )
+    assert result["loaded"]